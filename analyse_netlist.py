@@ -16,47 +16,42 @@ The arguments for the A* are pop=0, gate_space=2, sorting_algorithm=(sort_length
 See the README on Github of or the description in A_star.py for an explanation of what those parameters represent.
 It could very well be that this set of parameters can't find a solution while another set can, but
 it takes way too long to test a large set of netlists with all different combinations.
+
+To study the solvability of a large number of random netlists, a batch mode is available. In this mode the random
+netlists are generated in memory instead of being written to the data directory. All cheap checks are done first,
+and only the netlists that pass them are solved by A*, in parallel worker processes. The results of all netlists
+are streamed into a single CSV file as soon as they are finished.
 """
 
 
 import csv
+import os
+import sys
 import argparse
-from copy import deepcopy
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 import numpy as np
 import make_netlists as make
 import code.algorithms.A_star as a_star
 import code.algorithms.sorting as sort
 import code.classes.grid as grid
+from code.classes import loader
+from code.seeding import make_seed_sequence, spawn_rngs
 
 
 def load_nets(netlist, chip, randomized):
     """
-    Reads requested file containing the requested nets,
-    and extracts their starting and ending coordinates.
-    Creates gate object for each row.
+    Loads the requested nets, and returns them as a set of
+    (start_gate_id, end_gate_id) tuples, with the gate id's as strings.
     """
 
-    # Ensure correct netlist is loaded
-    if randomized:
-        add = "random/"
-    else:
-        add = ""
-
-    # Extract information from CSV
-    nets = set()
-    with open(f"data/chip_{chip}/{add}netlist_{netlist}.csv") as file:
-        reader = csv.DictReader(file)
-        for row in reader:
-            nets.add((row['chip_a'], row['chip_b']))
-
-    return nets
+    return {(str(start), str(end)) for start, end in loader.load_netlist(chip, netlist, randomized)}
 
 
 def load_gates(chip):
     """
-    Reads requested file containing the location of the gates,
-    and extracts their id's and coordinates.
-    Creates gate object for each row.
+    Loads the location of the gates, and extracts their id's and coordinates.
+    Returns a dictionary where the number of connections per gate will be stored,
+    and a dictionary containing the coordinates per gate id.
     """
 
     # Dictionary where number of connections per gate will be stored
@@ -65,12 +60,10 @@ def load_gates(chip):
     # Dictionary where gate_id with its coordinates will be stored
     coordinates = {}
 
-    with open(f"data/chip_{chip}/print_{chip}.csv", 'r') as file:
-        reader = csv.DictReader(file)
-        for row in reader:
-            gate = (row['chip'])
-            gates[gate] = 0
-            coordinates[gate] = (int(row['x']), int(row['y']))
+    for uid, x, y in loader.load_print(chip):
+        gate = str(uid)
+        gates[gate] = 0
+        coordinates[gate] = (x, y)
     return gates, coordinates
 
 
@@ -118,13 +111,11 @@ def check_intersections(net_coordinates, display):
     # Run over all nets
     for net in net_coordinates:
 
-        # Make new dictionary of nets excluding the examined one
-        other_nets = deepcopy(net_coordinates)
-        del other_nets[net]
+        # Run over all other nets
+        other_nets = [coordinates for other, coordinates in net_coordinates.items() if other != net]
         net = net_coordinates[net]
 
-        # Run over all other nets
-        for other_net in other_nets.values():
+        for other_net in other_nets:
 
             # Calculate relevant factors accoring to formulas
 
@@ -195,7 +186,7 @@ def check_density(net_coordinates, display):
     # Convert list to numpy array, and calculate total number of segments and corresponding density
     minimal_lengths = np.array(minimal_lengths)
     total_segments = np.sum(minimal_lengths)
-    density = total_segments / (size[0]*(size[1] - 1) + size[1]*(size[0] - 1))
+    density = total_segments / (size[0] * (size[1] - 1) + size[1] * (size[0] - 1))
 
     # Print results if requested
     if display:
@@ -205,7 +196,7 @@ def check_density(net_coordinates, display):
         print(f"In total, at least {total_segments} segments are required. ")
         print(f"This results in {round(100 * density, 2)} % of the grid to be filled assuming only 1 layer.")
 
-    return(density)
+    return (density)
 
 
 def main(netlist, randomized, display):
@@ -216,9 +207,10 @@ def main(netlist, randomized, display):
     - Average pathlength of all nets if a greedy algorithm solves the netlist without preventing collisions or intersections
     - Sum of all pathlengths if all paths are solved with a greedy algorithm without preventing collisions or intersecionts
     - Density of the lowest layer if sum of all pathlengths are stored in the lowest layer
-    - Estimated number of intersections, calculated by drawing straight lines for all nets and keeping count of the intersections
+    - Estimated number of intersections, calculated by drawing straight lines for all nets and keeping count of the
+      intersections
     - Average number of intersections per net
-    
+
     A gate can host no more than 5 connections, so a solution cannot be found and hence will not be searched for
     if a gate has to make 6 connections or more. Otherwise, a solution will be searched for using an A* algorithm.
     The arguments for the A* are pop=0, gate_space=2, sorting_algorithm=(sort_length, acending).
@@ -228,7 +220,7 @@ def main(netlist, randomized, display):
     """
 
     # Calculate chip number from netlist number
-    chip = int((netlist - 1) / 3) 
+    chip = loader.chip_of(netlist)
     overflow = False
     solved = False
     cost = 0
@@ -277,16 +269,123 @@ def main(netlist, randomized, display):
     return cost, density, intersections, overflow, solved
 
 
+def solve_connections(chip, netlist, connections):
+    """
+    Solves a netlist given as a list of (start_gate_id, end_gate_id) tuples with A*, using the same
+    arguments as main(). Runs in a worker process. Returns the costs and whether the netlist was solved.
+    """
+
+    solvegrid = grid.Grid.from_arrays(loader.load_print(chip), connections, chip, netlist)
+    solve = a_star.A_Star(solvegrid, [sort.sort_length, False], 0, 2)
+
+    if not solve.run():
+        return 0, False
+
+    solvegrid.compute_costs()
+    return solvegrid.cost, True
+
+
+def batch(netlist, N, workers, seed_sequence, max_density=None, max_intersections=None):
+    """
+    Generates N random netlists equivalent to the given netlist in memory, and analyses them.
+    A netlist is only solved if it passes the cheap checks: no gate overflow, and a density and number
+    of expected intersections below the given maxima. Netlists that pass are solved in a pool of worker processes.
+    The results are written to a single CSV file as soon as they are finished.
+    """
+
+    # Calculate chip number from netlist number
+    chip = loader.chip_of(netlist)
+
+    gates, coordinates = load_gates(chip)
+    num_nets = make.load_nets(netlist, chip)
+    rngs = spawn_rngs(seed_sequence, N)
+    workers = workers or os.cpu_count()
+
+    with open(f"results/netlist_batch{netlist}.csv", "w", newline="") as csvfile:
+
+        fieldnames = ["simulation", "nets", "cost", "density", "intersections", "occupation overflow", "screened", "solved"]
+
+        # Set up wiriter and write the header
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        writer.writeheader()
+
+        def write(row):
+            writer.writerow(row)
+            csvfile.flush()
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            running = {}
+
+            for n in range(1, N + 1):
+                connections = make.random_netlist(len(gates), num_nets, rngs[n - 1])
+
+                # Cheap checks use the gate ids as strings, as they are read from the CSV files
+                nets = [(str(start), str(end)) for start, end in connections]
+                net_coordinates = {net: (coordinates[net[0]], coordinates[net[1]]) for net in nets}
+
+                overflow = check_gate_occupation(nets, dict(gates), False) == "impossible"
+                density = check_density(net_coordinates, False)
+                intersections = check_intersections(net_coordinates, False)
+
+                row = {
+                    "simulation": n,
+                    "nets": ";".join(f"{start}-{end}" for start, end in connections),
+                    "cost": 0,
+                    "density": density,
+                    "intersections": intersections,
+                    "occupation overflow": overflow,
+                    "screened": True,
+                    "solved": False,
+                }
+
+                # Only solve netlists that pass all cheap checks
+                if overflow or (max_density is not None and density > max_density) or \
+                        (max_intersections is not None and intersections > max_intersections):
+                    write(row)
+                    continue
+
+                row["screened"] = False
+                running[executor.submit(solve_connections, chip, netlist, connections)] = row
+
+                # Limit the number of netlists waiting in memory
+                if len(running) >= 4 * workers:
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        row = running.pop(future)
+                        row["cost"], row["solved"] = future.result()
+                        write(row)
+
+            # Write the remaining results
+            for future in wait(running).done:
+                row = running[future]
+                row["cost"], row["solved"] = future.result()
+                write(row)
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Analyse a netlist')
     parser.add_argument("netlist", type=int, help="Netlist to be inspected")
     parser.add_argument("-random", "--randomized", action='store_true', help="Choose randomly generated netlists.")
     parser.add_argument("-n", type=int, default=1, dest="N", help="number of solutions analyzed")
     parser.add_argument("-print", "--display", action='store_true', help="Prints the calculated data.")
+    parser.add_argument("-seed", type=int, default=None, dest="seed", help="Seed of the random number generators.")
+    parser.add_argument("-batch", action='store_true', help="Analyse random netlists in memory, and solve them in parallel.")
+    parser.add_argument("-workers", type=int, default=None, dest="workers",
+                        help="Number of worker processes used in batch mode.")
+    parser.add_argument("-max_density", type=float, default=None, dest="max_density",
+                        help="Netlists with a higher density are not solved in batch mode.")
+    parser.add_argument("-max_intersections", type=int, default=None, dest="max_intersections",
+                        help="Netlists with more expected intersections are not solved in batch mode.")
 
     # Parse the command line arguments
     args = parser.parse_args()
 
+    if args.batch:
+        seed_sequence = make_seed_sequence(args.seed)
+        print(f"Seed: {seed_sequence.entropy}")
+        batch(args.netlist, args.N, args.workers, seed_sequence, args.max_density, args.max_intersections)
+        sys.exit()
+
     with open(f"results/netlist_test{args.netlist}.csv", "w", newline="") as csvfile:
 
         fieldnames = ["simulation", "cost", "density", "intersections", "occupation overflow", "solved"]
@@ -294,8 +393,14 @@ if __name__ == "__main__":
         # Set up wiriter and write the header
         writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
         writer.writeheader()
+
+        # Every random netlist is made with its own random number generator
+        seed_sequence = make_seed_sequence(args.seed)
+        print(f"Seed: {seed_sequence.entropy}")
+        rngs = spawn_rngs(seed_sequence, args.N)
+
         for n in range(1, args.N + 1):
-            make.main(args.netlist)
+            make.main(args.netlist, rngs[n - 1])
             answers = main(args.netlist, args.randomized, args.display)
             writer.writerow({
                 "simulation": n,
@@ -304,4 +409,4 @@ if __name__ == "__main__":
                 "intersections": answers[2],
                 "occupation overflow": answers[3],
                 "solved": answers[4],
-                })
+            })
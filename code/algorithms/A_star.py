@@ -29,16 +29,62 @@ The algorithm will always choose the option corresponding to the LOWEST priority
 A situation could occur where the algorithm is unable to create a valid solution, because a
 net cannot reach it's destination. The algorithm stops if such a situation occurs, and returns False.
 If all connections are made without failure, the program will return True.
+
+Nets that lie far apart can be routed at the same time by a number of worker processes. The nets are split into
+batches of consecutive nets whose regions (the area around the start and end, extended by a margin) do not overlap.
+The result is always identical to routing the nets one after another, see A_Star.run_parallel. With the distance
+fields as heuristic (see below) the nets are always routed one after another, since the field of a net depends on
+all nets laid before it, also those far away.
+
+On a sparse grid, A* spends most of its time on points that all have the same priority, since there are many equally
+short paths between two points. Two options reduce the number of points the algorithm has to expand:
+- Ties in priority can be broken in favour of the point closest to the goal, instead of by index pop.
+- Symmetry pruning, which is jump point search adapted to our grid. In open space, where every neighbour of a point
+  can be reached at the same costs, a path only follows the canonical order of directions: up, along x, along y, down.
+  Straight lines through open space are skipped over, so only their end points are put in the queue. Near other nets
+  and gates all directions are still considered, so intersections and collisions are avoided as before.
+Since this algorithm never reconsiders a point once it is in the queue, these options can change the resulting paths.
+
+The greedy heuristic ignores the nets that are already laid, so on a congested grid A* expands large areas in front
+of a wall of other nets before it finds a way around. Instead, the distance fields of the grid can be used as
+heuristic: the number of steps to the goal along segments that are still free, see distance_fields.py. This estimate
+is never higher than the actual costs, but much closer to them, and points from which the goal cannot be reached
+at all are never put in the queue.
+
+By default, the paths are searched with the kernel of flat_a_star.py, which finds exactly the same paths as
+A_Star_Solver with far less work per point. Symmetry pruning and values of pop other than 0 and -1 are only supported
+by A_Star_Solver, which is then used instead. It can also be chosen with kernel="states".
 """
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+from code.classes.grid import Grid
+from code import telemetry
+from code.algorithms.flat_a_star import Flat_A_Star_Solver
+from code.classes.search_workspace import SearchWorkspace
 
 
 class A_Star:
-    def __init__(self, grid, sorting_method, pop, gate_space, display=False):
+    def __init__(self, grid, sorting_method, pop, gate_space, display=False, rng=None, workers=1, region_margin=2,
+                 prune=False, tie_break="pop", heuristic="manhattan", kernel="flat"):
         self.grid = grid
         self.sorting = sorting_method
         self.pop = pop
         self.gate_space = gate_space
         self.display = display
+        self.rng = rng
+        self.workers = workers
+        self.region_margin = region_margin
+        self.prune = prune
+        self.tie_break = tie_break
+        self.heuristic = heuristic
+        self.kernel = kernel
+        self.completed = 0
+
+        # Number of points expanded by the searches of this object
+        self.expanded = 0
+
+        # Number of nets that were routed in parallel, and that had to be routed again one by one
+        self.statistics = {"parallel": 0, "fallbacks": 0}
 
     def run(self):
         """
@@ -46,40 +92,217 @@ class A_Star:
         Stores all paths in the netlist objects, and makes sure the grid object is up to date.
         """
 
-        total = len(self.grid.nets)
-        completed = 0
+        self.completed = 0
 
         # Sort the nets in the given order
-        for net in self.sorting[0](self.grid.nets, descending=self.sorting[1]):
+        nets = self.sorting[0](self.grid.nets, descending=self.sorting[1], rng=self.rng)
+
+        # The distance field of a net depends on the whole grid, so nets in a batch cannot be routed independently
+        if self.workers > 1 and self.heuristic != "field":
+            solved = self.run_parallel(nets)
+        else:
+            solved = self.run_serial(nets)
+
+        if not solved:
+            return False
+
+        # Update grid
+        self.grid.update()
+        return True
 
-            # Retrieve starting and ending point
-            start = net.start
-            end = net.end
+    def run_serial(self, nets):
+        """Lays the paths of the nets one after another."""
 
-            # Make solver object and run algorithm
-            solver = A_Star_Solver(self.grid, net, start, end, self.pop, self.gate_space)
-            if not solver.Solve():
+        for net in nets:
+            if not self.solve_net(net):
                 return False
 
-            # Extract path from solver
-            x, y, z = [], [], []
-            for coordinate in solver.path:
-                x.append(coordinate[0])
-                y.append(coordinate[1])
-                z.append(coordinate[2])
+        return True
 
-            # Store path in net object
-            path = [x, y, z]
-            net.path = path
-            completed += 1
-            if self.display:
-                print(f"Finished {net.start} to {net.end}, {completed}/{total}")
+    def solve_net(self, net):
+        """Lays the path of a single net on the grid. Returns the path if succeeded, False otherwise."""
+
+        # Retrieve starting and ending point
+        start = net.start
+        end = net.end
+
+        # Make solver object and run algorithm
+        solver = make_solver(self.grid, net, start, end, self.pop, self.gate_space, prune=self.prune,
+                             tie_break=self.tie_break, field=self.field(net), kernel=self.kernel)
+        solved = solver.Solve()
+        self.expanded += solver.expanded
+        if not solved:
+            return False
+
+        self.store_path(net, solver.path)
+        return solver.path
+
+    def store_path(self, net, coordinates):
+        """Stores a path, given as list of coordinates, in the net object."""
+
+        # Extract path from solver
+        x, y, z = [], [], []
+        for coordinate in coordinates:
+            x.append(coordinate[0])
+            y.append(coordinate[1])
+            z.append(coordinate[2])
+
+        # Store path in net object
+        path = [x, y, z]
+        net.path = path
+        self.completed += 1
+        if self.display:
+            telemetry.say(f"Finished {net.start} to {net.end}, {self.completed}/{len(self.grid.nets)}")
+        telemetry.emit("net", algorithm="a_star", completed=self.completed, nets=len(self.grid.nets), expanded=self.expanded)
+
+    def field(self, net):
+        """Returns the distance field towards the end of a net if it is used as heuristic, None otherwise."""
+
+        if self.heuristic == "field":
+            return self.grid.distance_fields.field(net.end)
+
+        return None
+
+    def region(self, net):
+        """Returns the lowest and highest (x, y) of the area around a net in which its search should stay."""
+
+        lowest = (max(min(net.start[0], net.end[0]) - self.region_margin, 0),
+                  max(min(net.start[1], net.end[1]) - self.region_margin, 0))
+        highest = (min(max(net.start[0], net.end[0]) + self.region_margin, self.grid.size[0]),
+                   min(max(net.start[1], net.end[1]) + self.region_margin, self.grid.size[1]))
+
+        return lowest, highest
+
+    def make_batches(self, nets):
+        """
+        Splits the nets into batches of consecutive nets, in the given order,
+        in which the regions of the nets do not overlap.
+        """
+
+        batches = []
+        batch = []
+
+        for net in nets:
+            region = self.region(net)
+
+            # Start a new batch if the region overlaps with a region in the current batch
+            if any(regions_overlap(region, other) for other_net, other in batch):
+                batches.append(batch)
+                batch = []
+
+            batch.append((net, region))
+
+        if batch:
+            batches.append(batch)
+
+        return batches
+
+    def run_parallel(self, nets):
+        """
+        Lays the paths of nets whose regions do not overlap at the same time, in worker processes.
+        Each worker searches against a copy of the grid as it was before the batch. A search that leaves the region
+        of its net could have been influenced by the other nets in the batch, so those nets are routed again one by one.
+        Since a search that stays within its region only depends on the grid within that region, the outcome is
+        identical to laying all paths one after another. This also holds for symmetry pruning, which counts looking at
+        a point outside the region as leaving it, but not for the distance fields, see run.
+        """
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            for batch in self.make_batches(nets):
+
+                # A single net is solved right away
+                if len(batch) == 1:
+                    if not self.solve_net(batch[0][0]):
+                        return False
+                    continue
+
+                snapshot = GridSnapshot(self.grid)
+                futures = [executor.submit(solve_in_region, snapshot, net.start, net.end, self.pop, self.gate_space, region,
+                                           self.prune, self.tie_break, self.field(net), self.kernel)
+                           for net, region in batch]
+
+                # Coordinates used by nets that were routed again, which may influence the rest of the batch
+                touched = []
+
+                # Commit results in the original order
+                for (net, region), future in zip(batch, futures):
+                    path, escaped, intersections = future.result()
+
+                    conflict = escaped or any(in_region(coordinate, region) for coordinate in touched)
+                    if path and not conflict:
+                        conflict = any(self.grid.make_segment(path[i], path[i + 1]) in self.grid.wire_segments
+                                       for i in range(len(path) - 1))
+
+                    # Route the net again on the actual grid if the result may differ
+                    if conflict:
+                        self.statistics["fallbacks"] += 1
+                        if not (path := self.solve_net(net)):
+                            return False
+                        touched.extend(path)
+                        continue
+
+                    if not path:
+                        return False
+
+                    self.statistics["parallel"] += 1
+                    self.store_path(net, path)
+                    self.grid.lay_path(net)
+                    net.intersections = intersections
 
-        # Update grid
-        self.grid.update()
         return True
 
 
+def regions_overlap(region, other):
+    """Checks if two regions share any (x, y) coordinate."""
+
+    return all(region[0][i] <= other[1][i] and other[0][i] <= region[1][i] for i in range(2))
+
+
+def in_region(coordinate, region):
+    """Checks if a coordinate lies within a region."""
+
+    return all(region[0][i] <= coordinate[i] <= region[1][i] for i in range(2))
+
+
+class GridSnapshot:
+    """Copy of the parts of a grid the A* solver needs, which can be sent to a worker process."""
+
+    make_segment = Grid.make_segment
+    on_grid = Grid.on_grid
+
+    def __init__(self, grid):
+        self.size = list(grid.size)
+        self.gate_coordinates = set(grid.gate_coordinates)
+        self.coordinates = set(grid.coordinates)
+        self.wire_segments = dict.fromkeys(grid.wire_segments)
+
+        # The arrays of the workspace are only made in the worker process, when a path is searched
+        self.search_workspace = SearchWorkspace(self)
+
+
+def solve_in_region(snapshot, start, goal, pop, gate_space, region, prune=False, tie_break="pop", field=None, kernel="flat"):
+    """
+    Searches a path on a snapshot of the grid in a worker process, and stops as soon as the search leaves its region.
+    Returns the path or False, whether the search left its region and the number of intersections of the path.
+    """
+
+    net = SimpleNamespace(intersections=0)
+    solver = make_solver(snapshot, net, start, goal, pop, gate_space, region, prune, tie_break, field, kernel)
+    path = solver.Solve()
+
+    return path, solver.escaped, net.intersections
+
+
+def make_solver(grid, net, start, goal, pop, gate_space, region=None, prune=False, tie_break="pop", field=None,
+                kernel="flat"):
+    """Returns a solver of the given kernel for a single path, or an A_Star_Solver if the kernel lacks the options."""
+
+    if kernel == "flat" and not prune and pop in (0, -1):
+        return Flat_A_Star_Solver(grid, net, start, goal, pop, gate_space, region, prune, tie_break, field)
+
+    return A_Star_Solver(grid, net, start, goal, pop, gate_space, region, prune, tie_break, field)
+
+
 class PriorityQueue:
     """
     Stores an item, and it's corresponding priority.
@@ -106,9 +329,10 @@ class PriorityQueue:
         except KeyError:
             self.queue[priority + costs] = [item]
 
-    def get(self, pop):
+    def get(self, pop, closest=False):
         """
         Returns item from queue with lowest sum of estimated remaining distance and current costs.
+        If closest is True, ties are broken in favour of the item closest to its goal, otherwise by index pop.
         Deletes item from list afterwards.
         """
 
@@ -121,6 +345,9 @@ class PriorityQueue:
                 lowest_costs = items
 
         # Retrieve and delete item from list
+        if closest:
+            items = self.queue[lowest_costs]
+            pop = min(range(len(items)), key=lambda index: items[index].heuristic)
         best_choice = self.queue[lowest_costs].pop(pop)
 
         # Delete dictionary item if list is empty
@@ -153,8 +380,9 @@ class State(object):
 
 
 class State_Path(State):
-    def __init__(self, grid, net, visitedQueue, costs, value, parent, goal, start=0):
+    def __init__(self, grid, net, visitedQueue, costs, value, parent, goal, start=0, field=None):
         super(State_Path, self).__init__(value, parent, start, goal)
+        self.field = field
         self.heuristic = self.get_distance()
         self.goal = goal
         self.grid = grid
@@ -163,10 +391,16 @@ class State_Path(State):
         self.costs = costs
 
     def get_distance(self):
-        """Returns the estimated distance from current point to goal."""
+        """
+        Returns the estimated distance from current point to goal.
+        If a distance field is given, returns None if the goal cannot be reached from the current point.
+        """
 
         if self.value == self.goal:
             return 0
+        if self.field is not None:
+            distance = int(self.field[self.value])
+            return distance if distance >= 0 else None
         return abs(self.goal[0] - self.value[0]) + abs(self.goal[1] - self.value[1]) + abs(self.goal[2] - self.value[2])
 
     def create_children(self):
@@ -177,12 +411,7 @@ class State_Path(State):
 
             # Find all neighboring point which are still on the grid
             for i in range(3):
-                if self.value[i] == 0:
-                    directions = [1]
-                elif self.value[i] == self.grid.size[i]:
-                    directions = [-1]
-                else:
-                    directions = [-1, 1]
+                directions = [j for j in (-1, 1) if 0 <= self.value[i] + j <= self.grid.size[i]]
 
                 # Make new tuple with coordinate
                 for j in directions:
@@ -201,14 +430,15 @@ class State_Path(State):
                             costs_tmp += 300
 
                         # Create child object
-                        child = State_Path(self.grid, self.net, self.visitedQueue, costs_tmp, val, self, self.goal)
+                        child = State_Path(self.grid, self.net, self.visitedQueue, costs_tmp, val, self, self.goal,
+                                           field=self.field)
                         self.children.append(child)
 
 
 class A_Star_Solver:
     """Lays a single path using the A* algorithm. Returns the path if succeeded, returns False otherwise."""
 
-    def __init__(self, grid, net, start, goal, pop, gate_space):
+    def __init__(self, grid, net, start, goal, pop, gate_space, region=None, prune=False, tie_break="pop", field=None):
         self.path = []
         self.visitedQueue = set()
         self.queue = PriorityQueue()
@@ -219,37 +449,69 @@ class A_Star_Solver:
         self.pop = pop
         self.gate_space = gate_space
 
+        # If a region is given, the search stops as soon as it leaves it
+        self.region = region
+        self.escaped = False
+
+        self.prune = prune
+        self.closest = tie_break == "goal"
+        self.field = field
+        self.expanded = 0
+
+        # Columns above gates which may not be used, since they belong to neither the start nor the goal
+        self.gate_columns = set(gate[:2] for gate in self.grid.gate_coordinates if gate != self.goal and gate != self.start)
+        self.all_gate_columns = set(gate[:2] for gate in self.grid.gate_coordinates)
+
     def Solve(self):
         """Finds and returns solution for current path."""
 
         # Make state object
-        startState = State_Path(self.grid, self.net, self.visitedQueue, 0, self.start, 0, self.goal, self.start)
+        startState = State_Path(self.grid, self.net, self.visitedQueue, 0, self.start, 0, self.goal, self.start, self.field)
         count = 0
 
+        # The goal cannot be reached along free segments at all
+        if startState.heuristic is None:
+            return False
+
         # Put object in queue
         self.queue.put(0, 0, startState)
 
         # Untill queue is empty or path is found
-        while(not self.path and self.queue.size()):
+        while (not self.path and self.queue.size()):
 
             # Get item from queue
-            current_state = self.queue.get(self.pop)
+            current_state = self.queue.get(self.pop, self.closest)
+            self.expanded += 1
 
             # Make children
             current_state.create_children()
             self.visitedQueue.add(current_state.value)
+
+            # In open space, only follow the canonical order of directions
+            pruned = self.prune and current_state.parent and self.is_open(current_state.value)
+            if self.escaped:
+                return False
+
             for child in current_state.children:
 
+                if self.region and not in_region(child.value, self.region):
+                    self.escaped = True
+                    return False
+
+                if pruned and not is_canonical(current_state.parent.value, current_state.value, child.value):
+                    continue
+
+                # Skip over open space in a straight line, without putting every point in the queue
+                if self.prune and child.value not in self.queue.in_queue:
+                    child = self.jump(child)
+                    if self.escaped:
+                        return False
+
                 # Chance of success is higher when gates aren't blocked unnessicarily
-                illegal = False
-                for gate in self.grid.gate_coordinates:
-                    if child.value[:2] == gate[:2] and gate != self.goal and gate != self.start\
-                            and child.value[2] <= self.gate_space:
-                        illegal = True
-                        continue
+                illegal = child.value[:2] in self.gate_columns and child.value[2] <= self.gate_space
 
-                # If child blockes another gate or if child is already in queue, go to next child
-                if illegal or child.value in self.queue.in_queue:
+                # If child blockes another gate, cannot reach the goal or is already in queue, go to next child
+                if illegal or child.heuristic is None or child.value in self.queue.in_queue:
                     continue
 
                 segment = self.grid.make_segment(child.value, child.path[-2])
@@ -280,3 +542,89 @@ class A_Star_Solver:
                     self.queue.put(priority, child.costs, child)
 
         return False
+
+    def jump(self, state):
+        """
+        Follows the direction of a step through open space, until the point where the path may have to turn towards
+        the goal, or until a point that is not open. Returns the state at the end of the jump.
+        The points that are skipped will not be visited again. If the jump would leave the region, the search escapes.
+        """
+
+        rank = direction_rank(state.parent.value, state.value)
+
+        # Steps up are only made to avoid obstacles, so they are never extended
+        if rank == 0:
+            return state
+
+        dimension = rank - 1
+        step = tuple(state.value[i] - state.parent.value[i] for i in range(3))
+
+        while state.value[dimension] != self.goal[dimension] and self.is_open(state.value):
+            value = tuple(state.value[i] + step[i] for i in range(3))
+            if not self.grid.on_grid(value) or value in self.visitedQueue or value in self.queue.in_queue:
+                break
+
+            if self.region and not in_region(value, self.region):
+                self.escaped = True
+                break
+
+            self.visitedQueue.add(state.value)
+            state = State_Path(self.grid, self.net, self.visitedQueue, state.costs + 1, value, state, self.goal,
+                               field=self.field)
+
+        return state
+
+    def is_open(self, value):
+        """
+        Checks if all neighbours of a point on the grid can be reached at the same costs: they are not used by
+        other nets, do not lie in the column above a gate and can be reached through a free segment.
+        In such open space all orders of steps towards the goal are equally expensive, so only one of them is needed.
+        The edge of the grid blocks none of these orders, so points outside the grid are ignored.
+        If a region is given, looking at a neighbour outside of it counts as leaving the region.
+        """
+
+        for i in range(3):
+            for j in (-1, 1):
+                neighbour = list(value)
+                neighbour[i] += j
+                neighbour = tuple(neighbour)
+
+                if not self.grid.on_grid(neighbour):
+                    continue
+
+                if self.region and not in_region(neighbour, self.region):
+                    self.escaped = True
+                    return False
+
+                if neighbour in self.grid.coordinates:
+                    return False
+
+                if neighbour[:2] in self.all_gate_columns and neighbour[2] <= self.gate_space:
+                    return False
+
+                if self.grid.make_segment(value, neighbour) in self.grid.wire_segments:
+                    return False
+
+        return True
+
+
+def is_canonical(parent, value, child):
+    """
+    Checks if a step follows the canonical order of directions: up first, then along x, then along y and down last.
+    A path may keep its direction, or turn into a direction that comes later, but never turn back to an earlier one.
+    """
+
+    return direction_rank(value, child) > direction_rank(parent, value) or \
+        tuple(child[i] - value[i] for i in range(3)) == tuple(value[i] - parent[i] for i in range(3))
+
+
+def direction_rank(start, end):
+    """Returns the position of the direction of a step in the canonical order of directions."""
+
+    if end[2] > start[2]:
+        return 0
+    if end[0] != start[0]:
+        return 1
+    if end[1] != start[1]:
+        return 2
+    return 3
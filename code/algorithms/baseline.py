@@ -29,9 +29,21 @@ actually be set. This probability will never reach 1, so there is always the cha
 usefull, since a greedy algorithm is very unlikely to actually produce a valid solution, since it has no
 way of avoiding collisions or intersections. Hence, this algorithm will be more successful than a greedy
 algorithm, however it is definitely not the most efficient algorithm possible.
+
+When a net cannot be connected, the algorithm does not start over from scratch. Instead, it backtracks locally:
+the most recently laid nets which blocked the failing net are ripped up, and are laid again after the failing net.
+Only when no blocking nets can be found, all paths are removed and the algorithm starts over.
+If a batch size is given, the walks are not made one by one, but in batches (see proposals.py).
+The total number of attempts and the running time are limited, so the algorithm always terminates.
+If no solution is found within these limits, the grid is left empty and run() returns False.
+The number of attempts, failed nets, ripped up nets and restarts are stored in the statistics attribute.
 """
-from copy import deepcopy
+from collections import Counter, deque
 import random
+import time
+from code.algorithms.proposals import propose_paths
+from code.seeding import make_generator
+from code import telemetry
 
 
 class Baseline:
@@ -40,41 +52,116 @@ class Baseline:
     as used in our base case.
     """
 
-    def __init__(self, grid, sorting_method):
+    def __init__(self, grid, sorting_method, max_attempts=1000000, time_limit=None, net_attempts=50000, backtrack_depth=3,
+                 batch_size=None, rng=None):
         self.grid = grid
         self.sorting = sorting_method
+        self.max_attempts = max_attempts
+        self.time_limit = time_limit
+        self.net_attempts = net_attempts
+        self.backtrack_depth = backtrack_depth
+        self.batch_size = batch_size
+        self.rng = rng or random.Random()
+        self.generator = make_generator(self.rng)
+
+        # Nets whose segments blocked the net that is currently being laid
+        self.blockers = Counter()
+
+        self.statistics = {"attempts": 0, "failed nets": 0, "ripped up nets": 0, "restarts": 0, "time": 0}
 
     def run(self):
-        """Runs the algorithm until a solution is found"""
+        """
+        Runs the algorithm until a solution is found, or until the maximum number of attempts
+        or the time limit is reached. Returns True if a solution is found, False otherwise.
+        """
+
+        telemetry.say("Searching for semi random configuration...")
+
+        start_time = time.time()
+        self.grid.clear_paths()
+
+        solved = self.make_connections(start_time)
+        self.statistics["time"] = round(time.time() - start_time, 3)
 
-        print("Searching for semi random configuration...")
+        # Never leave a partial solution behind
+        if not solved:
+            self.grid.clear_paths()
 
-        # Until a solution is found, reset everything and try again
-        while not self.make_connections():
-            self.grid.wire_segments = {}
-            self.grid.intersections = 0
+        return solved
 
-    def make_connections(self):
-        """Connects two points on the grid, and plots the result"""
+    def out_of_budget(self, start_time):
+        """Checks if the maximum number of attempts or the time limit has been reached."""
+
+        if self.statistics["attempts"] > self.max_attempts:
+            return True
+
+        return self.time_limit is not None and time.time() - start_time > self.time_limit
+
+    def make_connections(self, start_time):
+        """
+        Connects all nets one after another. If a net cannot be connected, the last nets
+        that blocked it are ripped up and laid again after the failing net.
+        """
+
+        queue = deque(self.sorting[0](self.grid.nets, descending=self.sorting[1], rng=self.rng))
+
+        # Make walks in batches if a batch size is given
+        if self.batch_size:
+            find_path = self.find_batch_path
+        else:
+            find_path = self.find_path
 
-        for net in self.sorting[0](self.grid.nets, descending=self.sorting[1]):
+        # Nets that are currently laid, in the order they were laid
+        laid_nets = []
+
+        while queue:
+            net = queue.popleft()
             current_attempt = 0
+            self.blockers = Counter()
 
             # Retrieve starting and ending point
             start = net.start
             end = net.end
 
             # Search for path until a valid path is found
-            while isinstance((path_data := self.find_path(start, end, net, current_attempt)), int):
+            while isinstance((path_data := find_path(start, end, net, current_attempt)), int):
                 current_attempt += path_data
+                self.statistics["attempts"] += path_data
 
-                # Give up if it takes too long
-                if current_attempt > 50000:
+                if self.out_of_budget(start_time):
                     return False
 
+                # Give up on this net if it takes too long
+                if current_attempt > self.net_attempts:
+                    break
+
             # If a path is found, retrieve coordinates
-            x, y, z = path_data[:3]
-            net.path = [x, y, z]
+            if not isinstance(path_data, int):
+                x, y, z = path_data[:3]
+                net.path = [x, y, z]
+                laid_nets.append(net)
+                continue
+
+            self.statistics["failed nets"] += 1
+
+            # Rip up the most recently laid nets that blocked the failing net
+            ripped_up = [laid for laid in laid_nets if laid in self.blockers][-self.backtrack_depth:]
+
+            # Start over if the net was not blocked by other nets
+            if not ripped_up:
+                self.statistics["restarts"] += 1
+                self.grid.clear_paths()
+                laid_nets = []
+                queue = deque(self.sorting[0](self.grid.nets, descending=self.sorting[1], rng=self.rng))
+                continue
+
+            for laid in ripped_up:
+                self.grid.remove_path(laid)
+                laid_nets.remove(laid)
+                self.statistics["ripped up nets"] += 1
+
+            # Lay the failing net first, followed by the nets that blocked it
+            queue.extendleft(reversed([net] + ripped_up))
 
         return True
 
@@ -91,7 +178,7 @@ class Baseline:
         max_pathlength = net.minimal_length * 2 + 6
 
         # Temporary values until path is confirmed
-        origin_tmp = deepcopy(origin)
+        origin_tmp = origin
         wire_segments_tmp = {}
         intersections_tmp = 0
         path_tmp = []
@@ -108,7 +195,7 @@ class Baseline:
             path_tmp.append(origin_tmp)
 
             # Try random moves until a legal one is found
-            while not (new_origin := self.find_smartest_step(origin_tmp, destination,  path_tmp)):
+            while not (new_origin := self.find_smartest_step(origin_tmp, destination, path_tmp)):
                 new_attempts += 1
 
                 # Give up after 10 failed attempts to make a single step
@@ -121,8 +208,12 @@ class Baseline:
                 segment = self.grid.make_segment(new_origin, origin_tmp)
 
                 # Check if segment already in use, try again otherwise
-                if segment in self.grid.wire_segments or segment in wire_segments_tmp:
-                    return new_attempts
+                if segment in self.grid.wire_segments:
+                    self.blockers[self.grid.wire_segments[segment]] += 1
+                    return new_attempts + 1
+
+                if segment in wire_segments_tmp:
+                    return new_attempts + 1
 
                 # Add segment to dictionary if it was new
                 wire_segments_tmp[segment] = net
@@ -131,7 +222,7 @@ class Baseline:
                 if new_origin not in self.grid.gate_coordinates:
 
                     # Check if current segment makes an interection
-                    if [segment for segment in self.grid.wire_segments if new_origin in segment]:
+                    if new_origin in self.grid.coordinates:
                         intersections_tmp += 1
 
                 # Set new temporary origin
@@ -156,6 +247,23 @@ class Baseline:
         # Return number of failed attempts if destination was not reached
         return new_attempts + 1
 
+    def find_batch_path(self, origin, destination, net, current_attempt):
+        """
+        Makes a batch of semi random walks between two points at once, and lays the cheapest valid walk.
+        Returns the path if succeeded, otherwise the number of failed walks.
+        """
+
+        proposals = propose_paths(self.grid, net, self.generator, self.batch_size, max_batches=1, blockers=self.blockers)
+        if not (path := next(proposals, None)):
+            return self.batch_size
+
+        # Make everything up to date
+        net.path = path
+        self.grid.lay_path(net)
+
+        x, y, z = path
+        return x, y, z, list(zip(x, y, z))
+
     def find_smartest_step(self, position, destination, path_tmp):
         """
         Calculates step to follow semi random path from current position
@@ -171,7 +279,7 @@ class Baseline:
                      destination[2] - position[2])
 
         # Selects a dimension to move in by a weighted random choice
-        step_in_dimension = random.choices([0, 1, 2], weights=[(abs(i) + 1) for i in direction])[0]
+        step_in_dimension = self.rng.choices([0, 1, 2], weights=[(abs(i) + 1) for i in direction])[0]
 
         # Cannot go down from lowest layer
         if step_in_dimension == 2 and position[2] == 0:
@@ -185,7 +293,7 @@ class Baseline:
 
             # Select direction to make move in by weighted random choice
             weights[prefered] = abs(direction[step_in_dimension]) + 1
-            step_in_direction = random.choices([1, -1], weights=weights)[0]
+            step_in_direction = self.rng.choices([1, -1], weights=weights)[0]
 
         new_position = list(position)
 
@@ -195,9 +303,8 @@ class Baseline:
         new_position = tuple(new_position)
 
         # Check if step is legal
-        if new_position in path_tmp or (
-            new_position in self.grid.gate_coordinates and
-                new_position != destination):
+        if not self.grid.on_grid(new_position) or new_position in path_tmp or (
+                new_position in self.grid.gate_coordinates and new_position != destination):
             return
 
         return new_position
@@ -0,0 +1,162 @@
+"""
+flat_a_star.py
+
+An alternative kernel for the A* solver of A_star.py, which finds exactly the same paths with far less work per point.
+A_Star_Solver makes a State_Path object for every neighbour of every point it expands, with its own copy of the path
+so far, and looks up coordinates as tuples in sets and dictionaries. This kernel works on the numbered points of the
+search workspace of the grid instead (see search_workspace.py):
+- The neighbours of every point are looked up in a table, in the same order in which A_Star_Solver visits them.
+- The costs of entering a point, the segments in use and the columns above the gates are kept up to date by the
+  workspace, so they do not have to be computed again for every net.
+- The costs, parent and generation stamps of every point, and the heap that serves as the queue, are reused for
+  every net. The queue holds (priority, tie break, id) tuples.
+The path is only turned into coordinates once the goal is found.
+
+The priority and the way ties are broken are the same as in A_Star_Solver: ties are broken in order of insertion
+for pop 0, in reverse order for pop -1, or in favour of the point closest to the goal. Other values of pop and
+symmetry pruning are not supported by this kernel, A_Star then uses A_Star_Solver instead.
+"""
+import heapq
+
+
+class Flat_A_Star_Solver:
+    """
+    Lays a single path using the A* algorithm on flat ids. Returns the path if succeeded, returns False otherwise.
+    Takes the same arguments and sets the same attributes as A_Star_Solver, apart from pruning.
+    """
+
+    def __init__(self, grid, net, start, goal, pop, gate_space, region=None, prune=False, tie_break="pop", field=None):
+        if prune or pop not in (0, -1):
+            raise ValueError("The flat A* kernel does not support pruning, and only supports pop 0 and -1.")
+
+        self.path = []
+        self.start = start
+        self.goal = goal
+        self.grid = grid
+        self.net = net
+        self.pop = pop
+        self.gate_space = gate_space
+        self.region = region
+        self.escaped = False
+        self.closest = tie_break == "goal"
+        self.field = field
+        self.expanded = 0
+
+    def Solve(self):
+        """Finds and returns solution for current path."""
+
+        workspace = self.grid.search_workspace
+        generation = workspace.prepare()
+        t = workspace.tables
+        start = t.id(self.start)
+        goal = t.id(self.goal)
+
+        # Estimated distance to the goal from the distance field, otherwise the Manhattan distance is computed
+        distances = workspace.field(self.field) if self.field is not None else None
+
+        # The goal cannot be reached along free segments at all
+        if distances is not None and distances[start] < 0 and start != goal:
+            return False
+
+        # The columns above the start and the goal may be used, so they are cleared during the search
+        illegal = workspace.illegal(self.gate_space)
+        height = t.dimensions[2]
+        columns = [t.id((gate[0], gate[1], 0)) for gate in (self.start, self.goal)]
+        saved = [illegal[column:column + height] for column in columns]
+        for column in columns:
+            illegal[column:column + height] = bytes(height)
+
+        try:
+            return self.search(workspace, generation, start, goal, distances, illegal)
+        finally:
+            for column, values in zip(reversed(columns), reversed(saved)):
+                illegal[column:column + height] = values
+
+    def search(self, workspace, generation, start, goal, distances, illegal):
+        """Runs the search on the workspace, and lays the path if the goal is reached."""
+
+        t = workspace.tables
+        neighbours = t.neighbours
+        entry_costs = workspace.entry_costs
+        blocked = workspace.blocked
+        costs = workspace.costs
+        parents = workspace.parents
+        queued = workspace.queued
+        visited = workspace.visited
+        queue = workspace.heap
+        xs, ys, zs = t.x, t.y, t.z
+        gx, gy, gz = self.goal
+
+        # Ties are broken by the order of insertion, the reverse order, or the distance to the goal
+        closest = self.closest
+        order = -1 if self.pop == -1 and not closest else 1
+        region = self.region
+
+        queue.append((0, 0, 0, start))
+        costs[start] = 0
+        queued[start] = generation
+        count = 0
+
+        while queue:
+            current = heapq.heappop(queue)[3]
+            self.expanded += 1
+            visited[current] = generation
+            current_costs = costs[current]
+
+            for step, child in enumerate(neighbours[current]):
+                if child < 0 or visited[child] == generation:
+                    continue
+
+                if region and not (region[0][0] <= xs[child] <= region[1][0] and region[0][1] <= ys[child] <= region[1][1]):
+                    self.escaped = True
+                    return False
+
+                if child == goal:
+                    distance = 0
+                elif distances is not None:
+                    distance = distances[child]
+                else:
+                    distance = abs(gx - xs[child]) + abs(gy - ys[child]) + abs(gz - zs[child])
+
+                if illegal[child] or distance < 0 or queued[child] == generation:
+                    continue
+
+                # If segment is not already in use
+                if not blocked[current * 6 + step]:
+                    child_costs = current_costs + entry_costs[child]
+
+                    # If path reached destination
+                    if child == goal:
+                        parents[child] = current
+                        return self.finish(workspace, start, child, child_costs)
+
+                    costs[child] = child_costs
+                    parents[child] = current
+                    queued[child] = generation
+                    count += 1
+                    heapq.heappush(queue, (child_costs + distance, distance if closest else 0, order * count, child))
+
+        return False
+
+    def finish(self, workspace, start, goal, goal_costs):
+        """Turns the path to the goal into coordinates, and lays it on the grid."""
+
+        t = workspace.tables
+        ids = [goal]
+        while ids[-1] != start:
+            ids.append(workspace.parents[ids[-1]])
+
+        self.path = [t.coordinates[point] for point in reversed(ids)]
+
+        # Ensure dictionary with wiresegments and set with all used coordinates are up to date
+        for coordinate in range(len(self.path) - 1):
+            segment = self.grid.make_segment(self.path[coordinate + 1], self.path[coordinate])
+
+            self.grid.wire_segments[segment] = self.net
+            self.grid.coordinates.add(segment[0])
+            self.grid.coordinates.add(segment[1])
+            workspace.add_segment(segment)
+
+        # Calculate costs path, assuming no path has a length of >300.
+        self.net.intersections = goal_costs // 300
+        return self.path
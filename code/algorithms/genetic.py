@@ -0,0 +1,185 @@
+"""
+genetic.py
+
+Improves a previously generated solution with a genetic algorithm. Where the hillclimber and simulated annealing
+change a single solution one net at a time, this algorithm keeps a population of solutions, and combines them.
+Each solution is seen as a genome of paths: one path for every net.
+
+The first population consists of the given solution, and variations of it in which a few random nets are
+ripped up and laid again with A* in a random order. Every generation, new solutions are made as follows:
+- Two parents are selected, each being the cheapest of two random solutions in the population (tournament selection)
+- Crossover: the child takes the path of every net from either parent, at random
+- Repair: the paths of the two parents do not fit together everywhere. The paths are laid one by one, and every
+  path that would share a segment with a path that was laid before is left out. These nets are laid again with A*.
+- Mutation: with a small probability, a few random nets are ripped up and laid again with A* as well
+The costs of every child are computed with the usual formula, C = n + 300 * k.
+The cheapest solutions (the elite) always survive, and the rest of the population is replaced by the children.
+
+The children of a generation are independent of each other, so they are made at the same time in a number of
+worker processes. This way many more solutions can be explored in the same amount of time.
+If a gap is given, the algorithm stops as soon as the costs of the best solution exceed the lower bound of the grid
+by no more than that fraction of the costs (see lower_bound.py).
+"""
+from concurrent.futures import ProcessPoolExecutor
+import random
+from code.classes.grid import Grid
+from code.algorithms.A_star import A_Star
+from code.classes.lower_bound import optimality_gap
+from code import telemetry
+from code.cost_trace import CostTrace
+
+
+class Genetic:
+    def __init__(self, grid, generations, update_csv_paths, output, population_size=20, workers=1, rng=None,
+                 gap=None, pop=0, gate_space=2, mutation_rate=0.2, elite=2):
+        self.grid = grid
+        self.generations = generations
+        self.generation = 0
+        self.update_csv_paths = update_csv_paths
+        self.output = output
+        self.population_size = population_size
+        self.workers = workers
+        self.rng = rng or random.Random()
+        self.gap = gap
+        self.mutation_rate = mutation_rate
+        self.elite = elite
+
+        # Everything a worker process needs to make a copy of the empty grid, and to lay paths with A*
+        self.arguments = grid.arguments()
+        self.options = {"pop": pop, "gate_space": gate_space}
+
+        # Population of (costs, paths) tuples, cheapest first
+        self.population = []
+
+        # Costs of the best solution after every generation
+        self.costs = CostTrace()
+
+        self.grid.compute_costs()
+
+    def run(self):
+        """Evolves the population for a number of generations, and lays the best solution on the grid."""
+
+        telemetry.say("Searching for improvements...")
+
+        executor = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+
+        try:
+            # The first population consists of the given solution and mutations of it
+            parent = {key: net.path for key, net in self.grid.nets.items()}
+            self.population = [(self.grid.cost, parent)]
+            self.population += self.breed([(parent, parent)] * (self.population_size - 1), executor, mutate=True)
+            self.population.sort(key=lambda solution: solution[0])
+
+            while self.generation < self.generations:
+
+                # Stop if the costs are close enough to the lower bound
+                best_costs = self.population[0][0]
+                if self.gap is not None and optimality_gap(best_costs, self.grid.compute_lower_bound()) <= self.gap:
+                    print(f"Costs are within {self.gap:.1%} of the lower bound of {self.grid.lower_bound}")
+                    break
+
+                parents = [(self.select(), self.select()) for child in range(self.population_size - self.elite)]
+                children = self.breed(parents, executor)
+
+                # The elite always survives, the rest of the population is replaced by the children
+                self.population = sorted(self.population[:self.elite] + children, key=lambda solution: solution[0])
+
+                if self.population[0][0] < best_costs:
+                    telemetry.say(f"Improvement found: Reduced costs from {best_costs} to {self.population[0][0]}")
+                self.costs.append(self.population[0][0])
+                self.generation += 1
+
+                telemetry.emit("progress", algorithm="genetic", generation=self.generation, cost=self.population[0][0],
+                               moves=self.generation * (self.population_size - self.elite))
+
+        finally:
+            if executor:
+                executor.shutdown()
+
+        # Lay the best solution on the grid
+        for key, path in self.population[0][1].items():
+            self.grid.nets[key].path = path
+        self.grid.compute_costs()
+
+        print(f"Finished after {self.generation} generations. {self.grid.summary()}")
+        telemetry.emit("finished", force=True, algorithm="genetic", generations=self.generation, cost=self.grid.cost,
+                       lower_bound=self.grid.lower_bound)
+
+        if self.update_csv_paths:
+            if self.output:
+                self.grid.to_output(self.grid.cost)
+            else:
+                self.grid.to_csv(self.grid.cost)
+
+        return self.grid.cost
+
+    def select(self):
+        """Returns the paths of the cheapest of two random solutions in the population."""
+
+        return min(self.rng.sample(self.population, min(2, len(self.population))), key=lambda solution: solution[0])[1]
+
+    def breed(self, parents, executor=None, mutate=False):
+        """
+        Makes a child for every pair of parents, in the worker processes if there are any.
+        Returns the children that could be repaired, as (costs, paths) tuples.
+        """
+
+        jobs = [(self.arguments, self.options, a, b, self.rng.getrandbits(64), 1.0 if mutate else self.mutation_rate)
+                for a, b in parents]
+
+        if executor:
+            children = list(executor.map(make_child, *zip(*jobs)))
+        else:
+            children = [make_child(*job) for job in jobs]
+
+        return [child for child in children if child]
+
+
+def make_child(arguments, options, parent_a, parent_b, seed, mutation_rate):
+    """
+    Combines the paths of two parents on a new grid, repairs the collisions with A* and mutates the child.
+    Returns the costs and paths of the child, or None if some net could not be laid again.
+    """
+
+    rng = random.Random(seed)
+    grid = Grid(**arguments)
+
+    # Crossover: take the path of every net from either parent
+    broken = []
+    keys = list(grid.nets)
+    rng.shuffle(keys)
+    for key in keys:
+        net = grid.nets[key]
+        net.path = (parent_a if rng.random() < 0.5 else parent_b)[key]
+
+        # Leave out paths that share a segment with a path laid before
+        if any(grid.make_segment(a, b) in grid.wire_segments for a, b in segments(net.path)):
+            broken.append(net)
+            net.path = []
+            continue
+
+        grid.lay_path(net)
+
+    # Mutation: rip up a few random nets
+    if rng.random() < mutation_rate:
+        laid = [net for net in grid.nets.values() if net.path]
+        for net in rng.sample(laid, min(3, len(laid))):
+            grid.remove_path(net)
+            broken.append(net)
+
+    # Repair: lay the missing nets again with A*, in a random order
+    solver = A_Star(grid, None, **options)
+    rng.shuffle(broken)
+    for net in broken:
+        if not solver.solve_net(net):
+            return None
+
+    grid.compute_costs()
+    return grid.cost, {key: net.path for key, net in grid.nets.items()}
+
+
+def segments(path):
+    """Returns the pairs of consecutive coordinates of a path, given as [x, y, z]."""
+
+    coordinates = list(zip(*path))
+    return zip(coordinates, coordinates[1:])
@@ -16,6 +16,11 @@ or another sorting algorithm can be used to make a custom order in the nets. The
 - Increading estimated number of intersections
 - Decreasing estimated number of intersections
 For further explanation of these algorithms, see sorting.py.
+If a batch size is given, the new paths are not made one step at a time but drawn in batches, see proposals.py.
+If slack is set, the nets are not sorted, but visited from the highest to the lowest slack, and nets that cannot
+be improved any further are skipped (see scheduler.py).
+If a gap is given, the algorithm stops as soon as the costs exceed the lower bound of the grid by no more than
+that fraction of the costs, since little can be gained from there on (see lower_bound.py).
 
 A disadvantage of a Hillclimber algorithm is that it could pursue a local optimum, from which it cannot escape.
 Hence, it can never be known if a hillclimber found the global optimum if there are no improvements are found
@@ -23,13 +28,17 @@ after a number of iterations. This issue can however be solved using Simulated a
 the Simulated annealing algorithm, see simulated_annealing.py.
 """
 import random
-from copy import deepcopy
 import csv
-import matplotlib.pyplot as plt
+from code.algorithms.proposals import propose_paths, SINGLE_ATTEMPTS
+from code.algorithms.scheduler import SlackScheduler
+from code import telemetry
+from code.cost_trace import CostTrace
+from code.seeding import make_generator
 
 
 class Hillclimber:
-    def __init__(self, grid, iterations, update_csv_paths, make_csv_improvements, make_iterative_plot, n, m, sorting_method, output):
+    def __init__(self, grid, iterations, update_csv_paths, make_csv_improvements, make_iterative_plot, n, m, sorting_method,
+                 output, batch_size=None, rng=None, gap=None, slack=False):
         self.grid = grid
         self.iterations = iterations
         self.iteration = 0
@@ -37,42 +46,72 @@ class Hillclimber:
         self.update_csv_paths = update_csv_paths
         self.make_iterative_plot = make_iterative_plot
         self.make_csv_improvements = make_csv_improvements
-        self.costs = []
+        self.costs = CostTrace()
         self.m = f"_{m}"
         self.n = f"_{n}"
         self.grid.compute_costs()
-        self.lowest_costs = deepcopy(self.grid.cost)
+        self.lowest_costs = self.grid.cost
         self.sorting = sorting_method
         self.output = output
+        self.batch_size = batch_size
+        self.rng = rng or random.Random()
+        self.generator = make_generator(self.rng)
+        self.gap = gap
+        self.scheduler = SlackScheduler(self.grid) if slack else None
+
+        # Number of new paths whose costs were computed
+        self.moves = 0
 
     def run(self):
         """Runs over all nets one after another, and tries to find cheaper paths.
         The order in which the nets are investigated is determined in main.py.
         Algorithm stops when the requested number of iterations are completed."""
 
-        print("Searching for improvements...")
+        telemetry.say("Searching for improvements...")
         self.grid.compute_costs
         self.lowest_costs = self.grid.cost
 
         # Run a number of iterations
         while self.iteration < self.iterations:
-            print(f"Iteration {self.iteration}")
+            telemetry.say(f"Iteration {self.iteration}")
 
-            # Sort net in desired order
-            nets = self.sorting[0](self.grid.nets, descending=self.sorting[1])
+            # Stop if the costs are close enough to the lower bound
+            if self.gap is not None and self.grid.gap() <= self.gap:
+                print(f"Costs are within {self.gap:.1%} of the lower bound of {self.grid.lower_bound}")
+                break
+
+            # Sort net in desired order, or visit the nets with the most slack first
+            if self.scheduler:
+                nets = self.scheduler.schedule()
+            else:
+                nets = self.sorting[0](self.grid.nets, descending=self.sorting[1], rng=self.rng)
 
+            visited = 0
             for net in nets:
+                visited += 1
 
                 # Try to make an improvement
+                old_path = net.path
                 self.improve_connection(net)
 
+                if self.scheduler and net.path is not old_path:
+                    self.scheduler.update(net, old_path)
+
+                telemetry.emit("progress", algorithm="hillclimber", iteration=self.iteration, cost=self.grid.cost,
+                               moves=self.moves)
+
             self.iteration += 1
 
-            while len(self.costs) < self.iteration:
-                self.costs.append(self.lowest_costs)
+            if not visited:
+                print("All nets have their minimal length and no intersections")
+                break
+
+            self.costs.append(self.lowest_costs)
 
         self.grid.compute_costs()
-        print(f"Reached max number of iterations. Costs are {self.grid.cost}")
+        print(f"Finished after {self.iteration} iterations. {self.grid.summary()}")
+        telemetry.emit("finished", force=True, algorithm="hillclimber", iterations=self.iteration, cost=self.grid.cost,
+                       lower_bound=self.grid.lower_bound, moves=self.moves)
 
         if self.output:
             self.grid.to_output(self.grid.cost)
@@ -99,18 +138,36 @@ class Hillclimber:
 
         # Make copies so original values aren't lost
         self.grid.compute_costs()
-        best_costs = deepcopy(self.grid.cost)
+
+        # Draw new paths in batches if a batch size is given, but only once single walks failed a number of times,
+        # since a batch is expensive to make when a single walk would have done. The batches hold about as many walks
+        # as there are attempts left, and every attempt after that takes the next walk, until they are used up
+        proposals = None
+        best_costs = self.grid.cost
 
         # Try a number of times before succes becomes unlikely
         for attempt in range(100):
 
-            new_path = self.find_path(origin, destination, net)
+            drawn = self.batch_size and attempt >= SINGLE_ATTEMPTS
+            if drawn:
+                if proposals is None:
+                    proposals = propose_paths(self.grid, net, self.generator, self.batch_size, net.minimal_length * 2 + 10,
+                                              -(-(100 - attempt) // self.batch_size), biased=False)
+                new_path = next(proposals, None)
+            else:
+                new_path = self.find_path(origin, destination, net)
 
             # If path is found, calculate new costs
             if new_path:
-                old_path = deepcopy(net.path)
+                snapshot = self.grid.snapshot()
                 net.path = new_path
                 self.grid.compute_costs()
+                self.moves += 1
+
+                # The walks of a batch come cheapest first, and the costs of the grid change by the costs of the walk,
+                # so once a walk makes the grid more expensive, so will the rest of the walks, which are skipped
+                if drawn and self.grid.cost > best_costs:
+                    proposals = iter(())
 
                 # Allow change of path with no benefit once every 5 attempts
                 if self.attempts_without_improvement % 5 == 0:
@@ -129,7 +186,7 @@ class Hillclimber:
 
                     # Reset if new path is worse
                     else:
-                        net.path = old_path
+                        self.grid.restore(snapshot)
                         self.attempts_without_improvement += 1
 
                 # Only allow changes to decrease the cost 4/5 attempts
@@ -138,7 +195,7 @@ class Hillclimber:
                     # Make change if costs are lower
                     if self.grid.cost < best_costs:
                         self.lowest_costs = self.grid.cost
-                        print(f"Improvement found: Reduced costs from {best_costs} to {self.grid.cost}")
+                        telemetry.say(f"Improvement found: Reduced costs from {best_costs} to {self.grid.cost}")
                         best_costs = self.grid.cost
                         self.attempts_without_improvement = 0
 
@@ -149,7 +206,7 @@ class Hillclimber:
 
                     # Reset if new path is denied
                     else:
-                        net.path = old_path
+                        self.grid.restore(snapshot)
                         self.attempts_without_improvement += 1
 
             # If no path was found at all, register as failed attempt
@@ -173,7 +230,7 @@ class Hillclimber:
         current_attempt = 0
 
         # Temporary values until path is confirmed
-        origin_tmp = deepcopy(origin)
+        origin_tmp = origin
         wire_segments_tmp = {}
         intersections_tmp = 0
         path_tmp = []
@@ -246,16 +303,16 @@ class Hillclimber:
 
         # Cannot go down from the lowest layer
         if position[2] == 0:
-            step_in_direction = random.choices([0, 1, 2], weights=[2, 2, 1])[0]
+            step_in_direction = self.rng.choices([0, 1, 2], weights=[2, 2, 1])[0]
             if step_in_direction == 2:
                 direction = 1
             else:
-                direction = random.choice([-1, 1])
+                direction = self.rng.choice([-1, 1])
 
         # If in middle of grid, all directions are equally likely
         else:
-            step_in_direction = random.choice([0, 1, 2])
-            direction = random.choice([-1, 1])
+            step_in_direction = self.rng.choice([0, 1, 2])
+            direction = self.rng.choice([-1, 1])
 
         new_position = list(position)
 
@@ -266,13 +323,16 @@ class Hillclimber:
 
         # Check if step is legal
         if new_position in path_tmp or (new_position in self.grid.gate_coordinates and new_position != destination) or \
-                (new_position[0] < 0 or new_position[1] < 0 or new_position[0] > self.grid.size[0] or new_position[1] > self.grid.size[1]):
+                not self.grid.on_grid(new_position):
             return
 
         return new_position
 
     def to_csv(self):
-        """Saves the progress of the algorithm in a CSV file. Each iteration is saved with the costs at that time."""
+        """
+        Saves the progress of the algorithm in a CSV file. The recorded iterations are saved with the costs at that time,
+        see cost_trace.py for which iterations are recorded.
+        """
 
         path = f"results/hill_netlist_{self.grid.netlist}"
         with open(f"{path}_{self.n}_{self.m}_intersections_ascending.csv", "w", newline="") as csvfile:
@@ -282,16 +342,20 @@ class Hillclimber:
             writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
             writer.writeheader()
 
-            for i in range(self.iterations):
+            for iteration, cost in zip(*self.costs.samples()):
                 writer.writerow({
-                    "iteration": i + 1, "cost": self.costs[i]
+                    "iteration": iteration, "cost": cost
                 })
 
     def plot(self):
         """Plots hillclimber with iterations on x-axis and costs on y-axis."""
 
+        # Matplotlib is only imported when a plot is made, since importing it takes long
+        import matplotlib.pyplot as plt
+
         plt.figure()
-        plt.plot([i + 1 for i in range(self.iterations)], self.costs)
+        plt.plot(*self.costs.samples())
         plt.xlabel("Iterations")
         plt.ylabel("Costs")
-        plt.savefig(f"results/figures_and_plots/hillclimber_{self.grid.netlist}_I_{self.iterations}_C_{self.lowest_costs}.png")
+        plt.savefig(f"results/figures_and_plots/hillclimber_{self.grid.netlist}_I_{self.iterations}"
+                    f"_C_{self.lowest_costs}.png")
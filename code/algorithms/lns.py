@@ -0,0 +1,183 @@
+"""
+lns.py
+
+Improves a previously generated solution with a large neighbourhood search.
+The hillclimber and simulated annealing change one net at a time, so they get stuck when two or three nets block
+each other: none of them can be moved on its own without making the solution more expensive.
+This algorithm rips up a group of nets at once, and lays them again together.
+
+Every iteration, a group of nets is chosen around an intersection hot spot, which is a coordinate used by more than
+one net. Hot spots used by many nets are chosen more often. The group is either:
+- A cluster: the nets that pass through the hot spot, and the nets they intersect with
+- A window: the nets that pass through a square area around the hot spot, on any layer
+If the solution has no intersections left, the area around the net with the longest detour is chosen instead.
+At most a given number of nets is ripped up.
+
+The paths of the group are removed, and laid again with A* in a number of random orders, where the first order
+is always from short to long. The best result is accepted if it is not more expensive than the original paths,
+otherwise the original paths are restored.
+If a gap is given, the algorithm stops as soon as the costs exceed the lower bound of the grid by no more than
+that fraction of the costs (see lower_bound.py).
+"""
+import random
+from code.algorithms.A_star import A_Star
+from code import telemetry
+from code.cost_trace import CostTrace
+
+
+class LargeNeighbourhoodSearch:
+    def __init__(self, grid, iterations, update_csv_paths, output, rng=None, gap=None, pop=0, gate_space=2,
+                 orders=4, window=2, max_nets=8):
+        self.grid = grid
+        self.iterations = iterations
+        self.iteration = 0
+        self.update_csv_paths = update_csv_paths
+        self.output = output
+        self.rng = rng or random.Random()
+        self.gap = gap
+        self.solver = A_Star(grid, None, pop, gate_space)
+        self.orders = orders
+        self.window = window
+        self.max_nets = max_nets
+
+        # Costs after every iteration
+        self.costs = CostTrace()
+
+        self.grid.compute_costs()
+
+    def run(self):
+        """Rips up and lays again a group of nets every iteration, and keeps the best solution on the grid."""
+
+        telemetry.say("Searching for improvements...")
+
+        while self.iteration < self.iterations:
+
+            # Stop if the costs are close enough to the lower bound
+            if self.gap is not None and self.grid.gap() <= self.gap:
+                print(f"Costs are within {self.gap:.1%} of the lower bound of {self.grid.lower_bound}")
+                break
+
+            self.reroute(self.choose_nets())
+            self.costs.append(self.grid.cost)
+            self.iteration += 1
+
+            telemetry.emit("progress", algorithm="lns", iteration=self.iteration, cost=self.grid.cost, moves=self.iteration)
+
+        self.grid.compute_costs()
+        print(f"Finished after {self.iteration} iterations. {self.grid.summary()}")
+        telemetry.emit("finished", force=True, algorithm="lns", iterations=self.iteration, cost=self.grid.cost,
+                       lower_bound=self.grid.lower_bound)
+
+        if self.update_csv_paths:
+            if self.output:
+                self.grid.to_output(self.grid.cost)
+            else:
+                self.grid.to_csv(self.grid.cost)
+
+        return self.grid.cost
+
+    def nets_per_coordinate(self):
+        """Returns the nets that use every coordinate on the grid, gates excluded."""
+
+        nets = {}
+        for segment, net in self.grid.wire_segments.items():
+            for coordinate in segment:
+                if coordinate not in self.grid.gate_coordinates:
+                    nets.setdefault(coordinate, set()).add(net)
+
+        return nets
+
+    def choose_nets(self):
+        """Chooses a group of nets around an intersection hot spot, or around the net with the longest detour."""
+
+        nets = self.nets_per_coordinate()
+        hot_spots = [coordinate for coordinate, users in nets.items() if len(users) > 1]
+
+        if hot_spots:
+
+            # Hot spots used by more nets are chosen more often
+            weights = [len(nets[coordinate]) - 1 for coordinate in hot_spots]
+            centre = self.rng.choices(hot_spots, weights)[0]
+        else:
+            detour = max(self.grid.nets.values(), key=lambda net: len(net.path[0]) - 1 - net.minimal_length)
+            centre = self.rng.choice(list(zip(*detour.path)))
+
+        if hot_spots and self.rng.random() < 0.5:
+            group = self.cluster(centre, nets)
+        else:
+            group = self.area(centre, nets)
+
+        # Rip up the nets closest to the centre if the group is too large
+        group = sorted(group, key=lambda net: (min(distance(centre, coordinate) for coordinate in zip(*net.path)), net.key))
+        return group[:self.max_nets]
+
+    def cluster(self, centre, nets):
+        """Returns the nets that pass through a coordinate, and the nets they intersect with."""
+
+        group = set(nets[centre])
+        for net in list(group):
+            for coordinate in zip(*net.path):
+                if len(nets.get(coordinate, ())) > 1:
+                    group.update(nets[coordinate])
+
+        return group
+
+    def area(self, centre, nets):
+        """Returns the nets that pass through a square area around a coordinate, on any layer."""
+
+        group = set()
+        for coordinate, users in nets.items():
+            if all(abs(coordinate[i] - centre[i]) <= self.window for i in range(2)):
+                group.update(users)
+
+        return group
+
+    def reroute(self, group):
+        """
+        Removes the paths of a group of nets, and lays them again with A* in a number of orders.
+        Keeps the cheapest result if it is not more expensive than the original paths.
+        """
+
+        original = self.grid.snapshot()
+        original_costs = self.grid.cost
+
+        for net in group:
+            self.grid.remove_path(net)
+        empty = self.grid.snapshot()
+
+        # The first order lays short nets first, the others are random
+        orders = [sorted(group, key=lambda net: net.minimal_length)]
+        for order in range(self.orders - 1):
+            orders.append(self.rng.sample(group, len(group)))
+
+        best_costs = None
+        best_paths = None
+        for order in orders:
+            self.grid.restore(empty)
+
+            if all(self.solver.solve_net(net) for net in order):
+                self.grid.compute_costs()
+                if best_costs is None or self.grid.cost < best_costs:
+                    best_costs = self.grid.cost
+                    best_paths = {net: net.path for net in group}
+
+        # Restore the original paths if no better solution was found
+        if best_costs is None or best_costs > original_costs:
+            self.grid.restore(original)
+            return
+
+        self.grid.restore(empty)
+        for net, path in best_paths.items():
+            net.path = path
+            self.grid.lay_path(net)
+        self.grid.compute_costs()
+
+        if best_costs < original_costs:
+            telemetry.say(f"Improvement found: Reduced costs from {original_costs} to {best_costs} by rerouting "
+                          f"{len(group)} nets")
+
+
+def distance(a, b):
+    """Returns the Manhattan distance between two coordinates."""
+
+    return sum(abs(a[i] - b[i]) for i in range(3))
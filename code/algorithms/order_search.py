@@ -0,0 +1,247 @@
+"""
+order_search.py
+
+Searches for the order of the nets, and the parameters pop and gate space, for which A* finds the cheapest solution.
+The result of A* depends heavily on these choices, so instead of trying them one by one, this algorithm tries many
+of them at once, in a number of worker processes.
+
+The search consists of a number of rounds:
+- In the first round, the nets are ordered by every sorting function in sorting.py, for every combination of pop
+  and gate space that is given.
+- In every following round, the best order found so far is changed a number of times, either by swapping two nets
+  or by moving a net forward, and the new orders are tried with the best combination of pop and gate space.
+
+Trying an order is expensive, so two things are done to save time:
+- A run is aborted as soon as its costs so far, plus the minimal length of the nets that still have to be laid,
+  can no longer beat the best solution found before. Costs are counted as in A*: C = n + 300 * k,
+  where n is the length of the paths and k the number of intersections each net makes with earlier nets.
+- A* lays each net the same way as long as the nets before it are the same, so orders are tried in lexicographic order.
+  After each net, a snapshot of the grid is made. An order starts from the snapshot after the nets it shares with
+  the previous order, so only the nets after this common prefix are laid again.
+
+When the search is done, the best solution is laid on the grid, and the best order and parameters are stored.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import csv
+import random
+from code.classes.grid import Grid
+from code.algorithms.A_star import A_Star
+from code.algorithms import sorting
+
+
+# Sorting functions and their direction, for the first round of the search
+SORTING_METHODS = [
+    (sorting.random_sort, None),
+    (sorting.sort_length, False), (sorting.sort_length, True),
+    (sorting.sort_middle_first, False), (sorting.sort_middle_first, True),
+    (sorting.sort_gate, True), (sorting.sort_gate, False),
+    (sorting.sort_exp_intersections, False), (sorting.sort_exp_intersections, True),
+    (sorting.sort_field_length, False), (sorting.sort_field_length, True)
+]
+
+
+class OrderSearch:
+    def __init__(self, grid, pops=(0,), gate_spaces=(2,), rounds=10, mutations=32, workers=1, rng=None,
+                 prune=False, tie_break="pop", heuristic="manhattan"):
+        self.grid = grid
+        self.pops = pops
+        self.gate_spaces = gate_spaces
+        self.rounds = rounds
+        self.mutations = mutations
+        self.workers = workers
+        self.rng = rng or random.Random()
+        self.options = {"prune": prune, "tie_break": tie_break, "heuristic": heuristic}
+
+        # Everything a worker process needs to make a copy of the empty grid
+        self.arguments = grid.arguments()
+
+        # Best solution found so far
+        self.best_cost = None
+        self.best_order = None
+        self.best_parameters = None
+        self.best_paths = None
+
+        # Orders that were already tried, per combination of pop and gate space
+        self.tried = set()
+
+        self.statistics = {"orders": 0, "aborted": 0, "failed": 0, "routed nets": 0, "reused nets": 0}
+
+    def run(self):
+        """
+        Searches the best order and parameters, and lays the best solution on the grid.
+        Returns True if a solution was found, False otherwise.
+        """
+
+        executor = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+
+        try:
+            self.evaluate(self.initial_candidates(), executor)
+
+            for round in range(self.rounds):
+                if self.best_order is None:
+                    break
+                self.evaluate(self.mutated_candidates(), executor)
+        finally:
+            if executor:
+                executor.shutdown()
+
+        if self.best_order is None:
+            return False
+
+        # Lay the best solution on the grid
+        for key, path in self.best_paths.items():
+            self.grid.nets[key].path = path
+        self.grid.update()
+
+        return True
+
+    def initial_candidates(self):
+        """Returns the orders of all sorting functions, for every combination of pop and gate space."""
+
+        orders = []
+        for method, descending in SORTING_METHODS:
+
+            # Some sorting functions store information in the nets, so every function gets its own grid
+            nets = Grid(**self.arguments).nets
+            orders.append(tuple(net.key for net in method(nets, descending=descending, rng=self.rng)))
+
+        return {(pop, gate_space): orders for pop in self.pops for gate_space in self.gate_spaces}
+
+    def mutated_candidates(self):
+        """Returns a number of small changes to the best order, for the best combination of pop and gate space."""
+
+        orders = []
+        if len(self.best_order) < 2:
+            return {}
+
+        for mutation in range(self.mutations):
+            order = list(self.best_order)
+            i, j = sorted(self.rng.sample(range(len(order)), 2))
+
+            # Either swap two nets, or move a net forward
+            if self.rng.random() < 0.5:
+                order[i], order[j] = order[j], order[i]
+            else:
+                order.insert(i, order.pop(j))
+
+            orders.append(tuple(order))
+
+        return {self.best_parameters: orders}
+
+    def evaluate(self, candidates, executor=None):
+        """
+        Tries the given orders for each combination of pop and gate space, and keeps track of the best solution.
+        The orders are sorted, so orders with the same first nets are tried after one another, and then divided
+        over the workers in consecutive chunks.
+        """
+
+        jobs = []
+        for parameters, orders in candidates.items():
+            orders = sorted(set(order for order in orders if (parameters, order) not in self.tried))
+            self.tried.update((parameters, order) for order in orders)
+            if not orders:
+                continue
+
+            size = -(-len(orders) // self.workers)
+            for start in range(0, len(orders), size):
+                jobs.append((parameters, orders[start:start + size]))
+
+        if executor:
+            futures = [executor.submit(evaluate_orders, self.arguments, *parameters, self.options, orders, self.best_cost)
+                       for parameters, orders in jobs]
+            results = [future.result() for future in futures]
+        else:
+            results = [evaluate_orders(self.arguments, *parameters, self.options, orders, self.best_cost)
+                       for parameters, orders in jobs]
+
+        for (parameters, orders), result in zip(jobs, results):
+            for statistic in self.statistics:
+                self.statistics[statistic] += result[statistic]
+
+            if result["cost"] is not None and (self.best_cost is None or result["cost"] < self.best_cost):
+                self.best_cost = result["cost"]
+                self.best_order = result["order"]
+                self.best_parameters = parameters
+                self.best_paths = result["paths"]
+
+    def to_csv(self, name=""):
+        """Writes a csv file containing the best order of the nets, and the pop and gate space used."""
+
+        if name:
+            name = f"_{name}"
+
+        if self.grid.randomized:
+            add = "random_"
+        else:
+            add = ""
+
+        with open(f"results/{add}order_netlist_{self.grid.netlist}{name}.csv", "w", newline="") as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(["chip_a", "chip_b", "pop", "gate_space"])
+
+            for key in self.best_order:
+                writer.writerow([key[0], key[1], *self.best_parameters])
+
+
+def evaluate_orders(arguments, pop, gate_space, options, orders, bound=None):
+    """
+    Lays the nets with A* in each of the given orders, one order after another on a single grid.
+    Every order starts from the snapshot of the grid after the nets it shares with the previous order. An order is aborted
+    as soon as it cannot beat the bound anymore. Returns a dictionary with the best order that beat the bound,
+    its costs and paths, and the statistics of the runs.
+    """
+
+    grid = Grid(**arguments)
+    solver = A_Star(grid, None, pop, gate_space, **options)
+    result = {"order": None, "cost": None, "paths": None,
+              "orders": 0, "aborted": 0, "failed": 0, "routed nets": 0, "reused nets": 0}
+
+    # Nets currently laid on the grid, and the total costs and a snapshot of the grid after each of them
+    laid = []
+    costs = [0]
+    snapshots = [grid.snapshot()]
+
+    for order in orders:
+        result["orders"] += 1
+
+        # Keep the nets which this order shares with the nets on the grid, and remove the others
+        shared = 0
+        while shared < len(laid) and laid[shared] == order[shared]:
+            shared += 1
+
+        if shared < len(laid):
+            grid.restore(snapshots[shared])
+        laid = laid[:shared]
+        costs = costs[:shared + 1]
+        snapshots = snapshots[:shared + 1]
+        result["reused nets"] += shared
+
+        # Costs of the nets that still have to be laid are at least their minimal length
+        remaining = sum(grid.nets[key].minimal_length for key in order[shared:])
+
+        for key in order[shared:]:
+            if bound is not None and costs[-1] + remaining >= bound:
+                result["aborted"] += 1
+                break
+
+            net = grid.nets[key]
+            path = solver.solve_net(net)
+            result["routed nets"] += 1
+
+            if not path:
+                result["failed"] += 1
+                break
+
+            laid.append(key)
+            costs.append(costs[-1] + len(path) - 1 + 300 * net.intersections)
+            snapshots.append(grid.snapshot())
+            remaining -= net.minimal_length
+
+        else:
+            if bound is None or costs[-1] < bound:
+                bound = costs[-1]
+                result["order"] = order
+                result["cost"] = costs[-1]
+                result["paths"] = {key: [list(dimension) for dimension in grid.nets[key].path] for key in order}
+
+    return result
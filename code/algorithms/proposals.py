@@ -0,0 +1,175 @@
+"""
+proposals.py
+
+Generates semi random paths for a single net in batches, instead of one step at a time.
+The random walkers of the baseline, hillclimber and simulated annealing algorithms draw a single step,
+check if it is legal, and draw the next one. Most of these walks are thrown away in the end, since they
+collide with another net or do not reach their destination in time.
+This module makes a large number of walks at once using NumPy: every step is drawn for all walks in the batch
+simultaneously, and checked against arrays containing the used segments and the gates of the grid.
+Walks that make an illegal step (outside the grid, into another gate or onto a coordinate they already visited)
+will try again, up to 10 times in total, just like the original walkers. Walks that use a segment which is already in
+use are discarded.
+
+Two kinds of walks can be made:
+- Biased, as used by the baseline: the probability to step in a direction scales with the distance to the destination
+- Unbiased, as used by the iterative algorithms: every direction is equally likely
+
+The valid walks are returned lazily, cheapest first within each batch. The costs of a walk are computed
+with the same formula as the costs of the grid: C = n + 300 * k, where n is the length of the walk and k
+the number of coordinates it shares with other nets.
+
+The iterative algorithms first try to improve a net with a number of single walks, which is cheaper when one of them
+succeeds, and only then draw batches, with about as many walks as they have attempts left.
+"""
+import numpy as np
+
+# Number of attempts of the iterative algorithms with single walks, before walks are drawn in batches
+SINGLE_ATTEMPTS = 10
+
+
+def propose_paths(grid, net, generator=None, batch_size=256, max_length=None, max_batches=10, biased=True, blockers=None):
+    """
+    Generates batches of random walks from the start to the end of a net, and yields all valid walks
+    one by one as [x, y, z] lists, cheapest first within each batch. Stops after max_batches batches.
+    If a Counter is given as blockers, it will keep count of the nets that blocked a walk.
+    """
+
+    if generator is None:
+        generator = np.random.default_rng()
+
+    if max_length is None:
+        max_length = net.minimal_length * 2 + 6
+
+    # The path of the net itself may be replaced, so it does not occupy any space
+    used, gates, segments = grid.occupancy(exclude=net)
+    segments = np.stack(segments)
+
+    for batch in range(max_batches):
+        walks, lengths, valid, collisions = random_walks(net.start, net.end, grid.size, gates, segments,
+                                                         generator, batch_size, max_length, biased)
+
+        # Keep count of the nets that made walks fail
+        if blockers is not None:
+            for start, end in collisions:
+                blockers[grid.wire_segments[grid.make_segment(start, end)]] += 1
+
+        # Count coordinates shared with other nets, gates excluded
+        steps = np.arange(walks.shape[1]) <= lengths[:, None]
+        steps[:, 0] = False
+        x, y, z = walks[:, :, 0], walks[:, :, 1], walks[:, :, 2]
+        intersections = (used[x, y, z] & ~gates[x, y, z] & steps).sum(axis=1)
+        costs = lengths + 300 * intersections
+
+        # Return walks cheapest first
+        candidates = np.flatnonzero(valid)
+        for walk in candidates[np.argsort(costs[candidates], kind="stable")]:
+            path = walks[walk, :lengths[walk] + 1]
+            yield [path[:, 0].tolist(), path[:, 1].tolist(), path[:, 2].tolist()]
+
+
+def random_walks(start, goal, size, gates, segments, generator, batch_size, max_length, biased):
+    """
+    Makes a batch of random walks from start to goal, all at once. Returns an array with the coordinates of
+    all walks, the length of each walk, which walks reached the goal and the segments that blocked a walk.
+    """
+
+    upper = np.array(size)
+    start = np.array(start)
+    goal = np.array(goal)
+    rows = np.arange(batch_size)
+
+    # Coordinates are turned into unique numbers, to check if a walk has visited them before
+    factors = np.array([(size[1] + 1) * (size[2] + 1), size[2] + 1, 1])
+
+    positions = np.tile(start, (batch_size, 1))
+    walks = np.zeros((batch_size, max_length + 1, 3), dtype=np.int64)
+    walks[:, 0] = start
+    visited = np.full((batch_size, max_length + 1), -1, dtype=np.int64)
+    visited[:, 0] = start @ factors
+    lengths = np.zeros(batch_size, dtype=np.int64)
+    failures = np.zeros(batch_size, dtype=np.int64)
+    alive = np.ones(batch_size, dtype=bool)
+    reached = (positions == goal).all(axis=1)
+    collisions = []
+
+    # Every iteration a walk either makes a step or fails, and it may fail no more than 10 times
+    for iteration in range(max_length + 11):
+        active = alive & ~reached
+        if not active.any():
+            break
+
+        dimension, direction = draw_steps(positions, goal, generator, biased)
+        candidates = positions.copy()
+        candidates[rows, dimension] += direction
+
+        # Steps outside the grid, into a gate that is not the destination or onto a visited coordinate are illegal
+        inside = np.clip(candidates, 0, upper)
+        outside = (candidates != inside).any(axis=1)
+        at_goal = (candidates == goal).all(axis=1)
+        into_gate = gates[inside[:, 0], inside[:, 1], inside[:, 2]] & ~at_goal
+        ids = inside @ factors
+        revisit = (visited[:, :lengths.max() + 1] == ids[:, None]).any(axis=1)
+
+        illegal = active & (outside | into_gate | revisit)
+        failures += illegal
+        alive &= failures <= 10
+
+        # Discard walks that use a segment which is already in use
+        moving = active & ~illegal
+        lowest = np.minimum(positions, inside)
+        collided = moving & segments[dimension, lowest[:, 0], lowest[:, 1], lowest[:, 2]]
+        for walk in np.flatnonzero(collided):
+            collisions.append((tuple(positions[walk].tolist()), tuple(candidates[walk].tolist())))
+        alive &= ~collided
+        moving &= ~collided
+
+        # Make the step
+        positions[moving] = candidates[moving]
+        lengths[moving] += 1
+        walks[rows[moving], lengths[moving]] = candidates[moving]
+        visited[rows[moving], lengths[moving]] = ids[moving]
+        reached |= moving & at_goal
+
+        # Walks that reached the maximum length without reaching the destination fail
+        alive &= reached | (lengths < max_length)
+
+    return walks, lengths, alive & reached, collisions
+
+
+def draw_steps(positions, goal, generator, biased):
+    """
+    Draws a single step for every walk. Returns the dimension and the direction of each step.
+    Walks on the lowest layer cannot step down.
+    """
+
+    batch_size = len(positions)
+    lowest_layer = positions[:, 2] == 0
+
+    if biased:
+
+        # Probability of a dimension scales with the distance to the goal in that dimension
+        distance = goal - positions
+        weights = np.abs(distance) + 1
+        cumulative = np.cumsum(weights, axis=1)
+        draw = generator.random(batch_size) * cumulative[:, -1]
+        dimension = (cumulative <= draw[:, None]).sum(axis=1)
+
+        # The direction towards the goal has the highest probability
+        remaining = distance[np.arange(batch_size), dimension]
+        prefered = np.where(remaining < 0, -1, 1)
+        towards = generator.random(batch_size) * (np.abs(remaining) + 2) < np.abs(remaining) + 1
+        direction = np.where(towards, prefered, -prefered)
+
+    else:
+
+        # Every dimension is equally likely, except on the lowest layer
+        draw = generator.random(batch_size)
+        dimension = np.where(lowest_layer, np.searchsorted([0.4, 0.8], draw, side="right"), (draw * 3).astype(np.int64))
+        dimension = np.minimum(dimension, 2)
+        direction = generator.choice([-1, 1], size=batch_size)
+
+    # Cannot go down from the lowest layer
+    direction = np.where(lowest_layer & (dimension == 2), 1, direction)
+
+    return dimension, direction
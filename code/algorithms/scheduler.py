@@ -0,0 +1,126 @@
+"""
+scheduler.py
+
+Decides which nets the iterative algorithms try to improve, and in which order.
+Sorting the nets spends as much effort on nets that cannot be improved any further as on the nets that cause most
+of the costs. Instead, the scheduler keeps track of the slack of every net: the costs of a net above its minimum,
+
+    slack = (current length - minimal length) + 300 * (number of coordinates the net shares with other nets)
+
+A net without slack already has the shortest possible length and no intersections, so it is skipped.
+The other nets are visited from the highest slack to the lowest.
+
+The slack of all nets is stored in a heap, together with an index of the nets that use every coordinate.
+When the path of a net changes, only the slack of that net and of the nets sharing a coordinate with its old or
+new path is computed again. Outdated entries in the heap are skipped when they come up.
+"""
+import heapq
+import itertools
+
+
+class SlackScheduler:
+    def __init__(self, grid):
+        self.grid = grid
+
+        # Nets that use every coordinate, gates excluded
+        self.users = {}
+
+        # Current slack of every net, and a heap of (-slack, counter, net) entries
+        self.slack = {}
+        self.heap = []
+        self.counter = itertools.count()
+
+        for net in grid.nets.values():
+            self.add_path(net, net.path)
+
+        for net in grid.nets.values():
+            self.refresh(net)
+
+    def coordinates(self, path):
+        """Returns the coordinates of a path, gates excluded."""
+
+        return set(zip(*path)) - self.grid.gate_coordinates
+
+    def add_path(self, net, path):
+        """Adds the coordinates of a path to the index."""
+
+        for coordinate in self.coordinates(path):
+            self.users.setdefault(coordinate, set()).add(net)
+
+    def remove_path(self, net, path):
+        """Removes the coordinates of a path from the index."""
+
+        for coordinate in self.coordinates(path):
+            self.users[coordinate].discard(net)
+
+    def compute_slack(self, net):
+        """Computes the costs of a net above its minimum."""
+
+        if not net.path:
+            return 0
+
+        intersections = sum(1 for coordinate in self.coordinates(net.path) if len(self.users[coordinate]) > 1)
+        return len(net.path[0]) - 1 - net.minimal_length + 300 * intersections
+
+    def refresh(self, net):
+        """Computes the slack of a net again, and adds it to the heap if it has changed."""
+
+        slack = self.compute_slack(net)
+        if self.slack.get(net) != slack:
+            self.slack[net] = slack
+            heapq.heappush(self.heap, (-slack, next(self.counter), net))
+
+    def update(self, net, old_path):
+        """
+        Updates the index and the slack after the path of a net has changed.
+        Only the slack of the nets sharing a coordinate with the old or new path can have changed.
+        """
+
+        self.remove_path(net, old_path)
+        self.add_path(net, net.path)
+
+        affected = {net}
+        for coordinate in self.coordinates(old_path) | self.coordinates(net.path):
+            affected.update(self.users.get(coordinate, ()))
+
+        for other in affected:
+            self.refresh(other)
+
+    def schedule(self):
+        """
+        Yields every net with slack once, highest slack first.
+        Changes to the slack during the pass are taken into account, so the order can change while it is running.
+        """
+
+        visited = set()
+
+        # Valid entries that were taken from the heap, which are needed again in the next pass
+        taken = {}
+
+        try:
+            while self.heap:
+                entry = heapq.heappop(self.heap)
+                slack, count, net = entry
+
+                # Skip outdated entries, a newer one is in the heap
+                if -slack != self.slack[net]:
+                    continue
+
+                # Skip duplicates of an entry that was taken before
+                previous = taken.get(net)
+                if previous and previous[0] == slack:
+                    continue
+                taken[net] = entry
+
+                # All remaining nets are without slack
+                if slack == 0:
+                    break
+
+                if net not in visited:
+                    visited.add(net)
+                    yield net
+
+        finally:
+            for entry in taken.values():
+                if -entry[0] == self.slack[entry[2]]:
+                    heapq.heappush(self.heap, entry)
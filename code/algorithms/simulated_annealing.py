@@ -5,6 +5,11 @@ This file tries to find an optimum by simulated annealing.
 It should converge to a global optimum as the probability function converges to a Boltzmann distribution.
 
 The starting tenmprature is computed in the main file and is based on the maximal delta that may occur.
+If a batch size is given, the new paths are not made one step at a time but drawn in batches, see proposals.py.
+If slack is set, the nets are not sorted, but visited from the highest to the lowest slack, and nets that cannot
+be improved any further are skipped (see scheduler.py).
+If a gap is given, the algorithm stops as soon as the costs exceed the lower bound of the grid by no more than
+that fraction of the costs (see lower_bound.py).
 
 Contains the class for the simulated annealing process and cooling functions.
 Includes:   - (func) sort_length
@@ -18,10 +23,13 @@ Includes:   - (func) sort_length
 
 import random
 import math
-from copy import deepcopy
 import numpy
 import csv
-import matplotlib.pyplot as plt
+from code.algorithms.proposals import propose_paths, SINGLE_ATTEMPTS
+from code.algorithms.scheduler import SlackScheduler
+from code import telemetry
+from code.cost_trace import CostTrace
+from code.seeding import make_generator
 
 
 def linear_cooling(temprature, cooling_speed=20, t_lower=1):
@@ -68,7 +76,7 @@ def vcf_cooling(temprature, iteration, starting_temprature, t_lower=1):
     """
     Cooling schedule following a VCF model.
     """
-    beta = (starting_temprature - t_lower)/(iteration * starting_temprature * t_lower)
+    beta = (starting_temprature - t_lower) / (iteration * starting_temprature * t_lower)
     temprature = temprature / (1 + beta * temprature)
 
     return temprature
@@ -95,7 +103,8 @@ class SimulatedAnnealing:
     For the cooling function it is important that the function is monotonically decreasing and nonnegative.
     The temprature is then used to compute the probability of acceptance for values worse than its current state.
     """
-    def __init__(self, grid, limit, update_csv_paths, make_csv_improvements, make_iterative_plot, name, n, temperature, sorting_method, output):
+    def __init__(self, grid, limit, update_csv_paths, make_csv_improvements, make_iterative_plot, name, n, temperature,
+                 sorting_method, output, batch_size=None, rng=None, gap=None, slack=False):
         self.grid = grid
         self.limit = limit
         self.iterations = 0
@@ -104,13 +113,20 @@ class SimulatedAnnealing:
 
         self.make_iterative_plot = make_iterative_plot
 
-        self.iterationlist = []
-        self.costs = []
+        self.costs = CostTrace()
         self.name = name
         self.n = n
-        self.lowest_costs = deepcopy(self.grid.cost)
+        self.lowest_costs = self.grid.cost
         self.sorting = sorting_method
         self.output = output
+        self.batch_size = batch_size
+        self.rng = rng or random.Random()
+        self.generator = make_generator(self.rng)
+        self.gap = gap
+        self.scheduler = SlackScheduler(self.grid) if slack else None
+
+        # Number of new paths whose costs were computed
+        self.moves = 0
 
         # Starting temperature and current temperature
         self.Starting_T = temperature
@@ -119,35 +135,53 @@ class SimulatedAnnealing:
     def update_temperature(self):
         """Updates the current temperature."""
 
-        # Check that ensures the temperature only updates when the iteration number has increased
-        if self.iterationlist and self.Current_T > 0:
-            if self.iterationlist[-1] != self.iterations:
-                self.Current_T = linear_cooling(self.Current_T, self.iterations)
-                return self.Current_T
+        # Check that ensures the temperature only updates after the first iteration
+        if self.iterations and self.Current_T > 0:
+            self.Current_T = linear_cooling(self.Current_T, self.iterations)
+            return self.Current_T
 
     def run(self):
         """Keeps the simulated annealing algorithm running until iteration limit reached."""
 
-        print("Searching for improvements...")
+        telemetry.say("Searching for improvements...")
 
         # While iteration limit not reached search for improvements with specific sort function
         while self.iterations < self.limit:
 
-            # print(f"iteration: {self.iterations} and Temprature: {self.Current_T}")
+            # Stop if the costs are close enough to the lower bound
+            if self.gap is not None and self.grid.gap() <= self.gap:
+                print(f"Costs are within {self.gap:.1%} of the lower bound of {self.grid.lower_bound}")
+                break
 
-            nets = self.sorting[0](self.grid.nets, descending=self.sorting[1])
+            # Sort net in desired order, or visit the nets with the most slack first
+            if self.scheduler:
+                nets = self.scheduler.schedule()
+            else:
+                nets = self.sorting[0](self.grid.nets, descending=self.sorting[1], rng=self.rng)
 
+            visited = 0
             for net in nets:
+                visited += 1
+                old_path = net.path
                 self.improve_connection(net)
 
-                self.iterationlist.append(self.iterations)
+                if self.scheduler and net.path is not old_path:
+                    self.scheduler.update(net, old_path)
+
                 self.iterations += 1
+                self.costs.append(self.lowest_costs)
 
-                while len(self.costs) < len(self.iterationlist):
-                    self.costs.append(self.lowest_costs)
+                telemetry.emit("progress", algorithm="simulated_annealing", iteration=self.iterations, cost=self.grid.cost,
+                               temperature=self.Current_T, moves=self.moves)
+
+            if not visited:
+                print("All nets have their minimal length and no intersections")
+                break
 
         self.grid.compute_costs()
-        print(f"Reached max number of iterations. Costs are {self.grid.cost}")
+        print(f"Finished after {self.iterations} iterations. {self.grid.summary()}")
+        telemetry.emit("finished", force=True, algorithm="simulated_annealing", iterations=self.iterations,
+                       cost=self.grid.cost, lower_bound=self.grid.lower_bound, temperature=self.Current_T, moves=self.moves)
 
         # Write to csv
         if self.output:
@@ -175,18 +209,29 @@ class SimulatedAnnealing:
 
         # Make copies so original values aren't lost
         self.grid.compute_costs()
-        best_costs = deepcopy(self.grid.cost)
+
+        # Draw new paths in batches if a batch size is given, but only once single walks failed a number of times,
+        # with about as many walks in the batches as there are attempts left (see hillclimber.py)
+        proposals = None
+        best_costs = self.grid.cost
 
         for attempt in range(50):
             # If path is found, calculate new costs
-            new_path = self.find_path(origin, destination, net)
+            if self.batch_size and attempt >= SINGLE_ATTEMPTS:
+                if proposals is None:
+                    proposals = propose_paths(self.grid, net, self.generator, self.batch_size, net.current_length + 10,
+                                              -(-(50 - attempt) // self.batch_size), biased=False)
+                new_path = next(proposals, None)
+            else:
+                new_path = self.find_path(origin, destination, net)
 
             # new_path = self.run_per_paths(net)
             if new_path:
-                old_path = deepcopy(net.path)
+                snapshot = self.grid.snapshot()
 
                 net.path = new_path
                 self.grid.compute_costs()
+                self.moves += 1
 
                 delta = self.grid.cost - best_costs
 
@@ -194,15 +239,15 @@ class SimulatedAnnealing:
                     if self.Current_T == 0:
                         probability = 0
                     else:
-                        probability = math.exp(-delta/self.Current_T)
+                        probability = math.exp(-delta / self.Current_T)
                 else:
                     probability = 1
-                rand = random.random()
+                rand = self.rng.random()
 
                 if probability > rand:
                     self.lowest_costs = self.grid.cost
-                    print(f"Alternate path found: new costs are {self.grid.cost}")
-                    best_costs = deepcopy(self.grid.cost)
+                    telemetry.say(f"Alternate path found: new costs are {self.grid.cost}")
+                    best_costs = self.grid.cost
                     self.update_temperature()
 
                     # Save data if desired, in desired format
@@ -213,7 +258,7 @@ class SimulatedAnnealing:
                             self.grid.to_csv(self.grid.cost)
                     return
                 else:
-                    net.path = old_path
+                    self.grid.restore(snapshot)
 
                 return
 
@@ -235,7 +280,7 @@ class SimulatedAnnealing:
         current_attempt = 0
 
         # Temporary values until path is confirmed
-        origin_tmp = deepcopy(origin)
+        origin_tmp = origin
         wire_segments_tmp = {}
         intersections_tmp = 0
         path_tmp = []
@@ -310,16 +355,16 @@ class SimulatedAnnealing:
 
         # Cannot go down from the lowest layer
         if position[2] == 0:
-            step_in_direction = random.choices([0, 1, 2], weights=[2, 2, 1])[0]
+            step_in_direction = self.rng.choices([0, 1, 2], weights=[2, 2, 1])[0]
             if step_in_direction == 2:
                 direction = 1
             else:
-                direction = random.choice([-1, 1])
+                direction = self.rng.choice([-1, 1])
 
         # If in middle of grid, all directions are equally likely
         else:
-            step_in_direction = random.choice([0, 1, 2])
-            direction = random.choice([-1, 1])
+            step_in_direction = self.rng.choice([0, 1, 2])
+            direction = self.rng.choice([-1, 1])
 
         new_position = list(position)
 
@@ -329,13 +374,17 @@ class SimulatedAnnealing:
         new_position = tuple(new_position)
 
         # Check if step is legal
-        if new_position in path_tmp or (new_position in self.grid.gate_coordinates and new_position != destination):
+        if new_position in path_tmp or (new_position in self.grid.gate_coordinates and new_position != destination) or \
+                not self.grid.on_grid(new_position):
             return
 
         return new_position
 
     def to_csv(self):
-        """Saves the progress of the algorithm in a CSV file. Each iteration is saved with the costs at that time."""
+        """
+        Saves the progress of the algorithm in a CSV file. The recorded iterations are saved with the costs at that time,
+        see cost_trace.py for which iterations are recorded.
+        """
 
         path = f"results/annealing_netlist_{self.grid.netlist}"
         with open(f"{path}_{self.name}_{self.n}_length(a).csv", "w", newline="") as csvfile:
@@ -345,16 +394,19 @@ class SimulatedAnnealing:
             writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
             writer.writeheader()
 
-            for i in range(len(self.iterationlist)):
+            for iteration, cost in zip(*self.costs.samples()):
                 writer.writerow({
-                    "iteration": i + 1, "cost": self.costs[i]
+                    "iteration": iteration, "cost": cost
                 })
 
     def plot(self):
         """Plots simulated annealing with iterations on x-axis and costs on y-axis."""
 
+        # Matplotlib is only imported when a plot is made, since importing it takes long
+        import matplotlib.pyplot as plt
+
         plt.figure()
-        plt.plot(self.iterationlist, self.costs, label=f"start temp: {self.Starting_T} \xb0C")
+        plt.plot(*self.costs.samples(), label=f"start temp: {self.Starting_T} \xb0C")
         plt.legend()
         plt.xlabel("Iterations")
         plt.ylabel("Costs")
@@ -7,13 +7,14 @@ Includes:   - sort_length
             - sort_middle_first
             - sort_gate
             - sort_exp_intersections
+            - sort_field_length
 """
-from copy import deepcopy
 import random
 import operator
+import math
 
 
-def sort_length(nets, descending=False):
+def sort_length(nets, descending=False, rng=None):
     """
     Sorts net object instances on their distance
     between start- and end coordinates.
@@ -23,17 +24,20 @@ def sort_length(nets, descending=False):
             reverse=descending))
 
 
-def random_sort(nets, descending="None"):
-    """Sorts net object instances in a random order."""
+def random_sort(nets, descending="None", rng=None):
+    """
+    Sorts net object instances in a random order.
+    Uses the given random.Random object, or the global random module if none is given.
+    """
 
     # Load the net values and randomly shuffle its order
     value_list = list(nets.values())
-    random.shuffle(value_list)
+    (rng or random).shuffle(value_list)
 
     return value_list
 
 
-def sort_middle_first(nets, descending=False):
+def sort_middle_first(nets, descending=False, rng=None):
     """
     Sorts net object instances on their position in the grid;
     in the middle or on the outside.
@@ -43,8 +47,8 @@ def sort_middle_first(nets, descending=False):
     a_net = list(nets.values())[0]
     size = a_net.grid.size[:2]
 
-    middle_x = round(size[0]/2)
-    middle_y = round(size[1]/2)
+    middle_x = round(size[0] / 2)
+    middle_y = round(size[1] / 2)
 
     for net in nets.values():
         delta_middle_start = abs(middle_x - net.start[0]) + abs(middle_y - net.start[1])
@@ -59,7 +63,7 @@ def sort_middle_first(nets, descending=False):
             reverse=descending))
 
 
-def sort_gate(nets, descending=True):
+def sort_gate(nets, descending=True, rng=None):
     """
     Sorts net object instances on how many connections a gate has
     with other gates.
@@ -90,7 +94,7 @@ def sort_gate(nets, descending=True):
     return sorted(net_neighbors, key=net_neighbors.get, reverse=descending)
 
 
-def sort_exp_intersections(nets, descending=False):
+def sort_exp_intersections(nets, descending=False, rng=None):
     """
     Sorts net object instances based on how many intersections are expected per net.
     """
@@ -100,10 +104,9 @@ def sort_exp_intersections(nets, descending=False):
         net = nets[key]
 
         # Go over all other nets and compute the dot product with itself and the others one by one
-        other_nets = deepcopy(nets)
-        other_nets.pop(key)
-
-        for other_net in other_nets.values():
+        for other_key, other_net in nets.items():
+            if other_key == key:
+                continue
 
             # p0 = (y3 - y2)(x3 - x0) - (x3 - x2)(y3 - y0)
             p0 = (other_net.end[1] - other_net.start[1]) * (other_net.end[0] - net.start[0]) - \
@@ -129,3 +132,27 @@ def sort_exp_intersections(nets, descending=False):
     return (sorted(nets.values(),
             key=operator.attrgetter('exp_intersections'),
             reverse=descending))
+
+
+def sort_field_length(nets, descending=False, rng=None):
+    """
+    Sorts net object instances on the length of the shortest path between start and end
+    which avoids all segments currently in use, according to the distance fields of the grid.
+    Nets that cannot be laid along free segments at all are considered the longest.
+    """
+
+    # Without nets there is no grid to retrieve
+    if not nets:
+        return []
+
+    # Retrieve the grid from the first net
+    grid = next(iter(nets.values())).grid
+
+    for net in nets.values():
+        distance = grid.distance_fields.distance(net.start, net.end)
+        net.field_length = distance if distance is not None else math.inf
+
+    # Sort the nets
+    return (sorted(nets.values(),
+            key=operator.attrgetter('field_length'),
+            reverse=descending))
@@ -0,0 +1,117 @@
+"""
+distance_fields.py
+
+Computes, for every gate, the number of steps required to reach it from any point on the grid.
+Unlike the Manhattan distance, these distances take the segments used by other nets and the other gates into account.
+A path may never pass through another gate, so gates can be reached, but never passed through.
+
+The distances are computed with a breadth first search over the whole grid at once using NumPy, and stored
+in an array per gate. The columns above gates are not taken into account, since which columns are blocked depends
+on the net that is being laid and on the gate space used by A*. Every step costs at least 1, so the distance is never
+higher than the actual costs of a path, which makes it a suitable heuristic for A* and a realistic estimate of the
+length of a net.
+
+The distances are only computed when they are requested, and kept up to date incrementally:
+- When segments are added to the grid, distances can only increase, so the stored distances remain valid lower bounds.
+  A distance field only becomes outdated if a new segment lies on one of its shortest paths, and it will be recomputed
+  the next time it is requested.
+- When segments are removed from the grid, distances can decrease, so all distance fields are thrown away.
+"""
+import numpy as np
+
+
+class DistanceFields:
+    def __init__(self, grid):
+        self.grid = grid
+
+        # Distance arrays per gate coordinate, where -1 means the gate cannot be reached
+        self.fields = {}
+
+        # Gate coordinates whose distances are lower bounds, but no longer exact
+        self.outdated = set()
+
+        # Segments of the grid at the moment the fields were last brought up to date
+        self.known_segments = set()
+
+    def field(self, gate, exact=True):
+        """
+        Returns the array with distances to the given gate coordinate.
+        If exact is True, an outdated field is computed again, otherwise it is returned as a lower bound.
+        """
+
+        self.synchronize()
+
+        if gate not in self.fields or (exact and gate in self.outdated):
+            self.fields[gate] = self.compute(gate)
+            self.outdated.discard(gate)
+
+        return self.fields[gate]
+
+    def distance(self, start, gate):
+        """Returns the number of steps from a coordinate to a gate, or None if the gate cannot be reached."""
+
+        distance = int(self.field(gate)[start])
+        if distance < 0:
+            return None
+
+        return distance
+
+    def synchronize(self):
+        """Finds the segments that were added to or removed from the grid since the last call, and updates the fields."""
+
+        current = set(self.grid.wire_segments)
+
+        # Distances may have decreased, so nothing can be kept
+        if self.known_segments - current:
+            self.fields = {}
+            self.outdated = set()
+
+        # Distances may have increased, but only for fields in which a new segment is part of a shortest path
+        elif added := current - self.known_segments:
+            start = np.array([segment[0] for segment in added])
+            end = np.array([segment[1] for segment in added])
+
+            for gate, distances in self.fields.items():
+                if gate not in self.outdated:
+                    lengths = distances[start[:, 0], start[:, 1], start[:, 2]], distances[end[:, 0], end[:, 1], end[:, 2]]
+                    if (lengths[0] != lengths[1]).any():
+                        self.outdated.add(gate)
+
+        self.known_segments = current
+
+    def compute(self, gate):
+        """Computes the distances from every point on the grid to a gate with a breadth first search."""
+
+        used, gates, segments = self.grid.occupancy()
+        free = [~segment for segment in segments]
+
+        # Other gates can be reached, but a path cannot continue from there
+        passable = ~gates
+        passable[gate] = True
+
+        distances = np.full(used.shape, -1, dtype=np.int32)
+        distances[gate] = 0
+        frontier = np.zeros(used.shape, dtype=bool)
+        frontier[gate] = True
+
+        step = 0
+        while frontier.any():
+            step += 1
+            expanding = frontier & passable
+            reached = np.zeros(used.shape, dtype=bool)
+
+            for dimension in range(3):
+                lower = [slice(None)] * 3
+                upper = [slice(None)] * 3
+                lower[dimension] = slice(None, -1)
+                upper[dimension] = slice(1, None)
+                lower, upper = tuple(lower), tuple(upper)
+
+                # A segment is stored at its lowest coordinate, and connects it with the next point
+                reached[upper] |= expanding[lower] & free[dimension][lower]
+                reached[lower] |= expanding[upper] & free[dimension][lower]
+
+            frontier = reached & (distances < 0)
+            distances[frontier] = step
+
+        return distances
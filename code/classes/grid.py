@@ -1,18 +1,25 @@
 import csv
-from code.classes import gate, net
-import pandas as pd
-import math
+from code.classes import gate, net, loader, lower_bound
+from code.classes.distance_fields import DistanceFields
+from code.classes.occupancy import Occupancy
+from code.classes.search_workspace import SearchWorkspace
 
 
 class Grid:
-    def __init__(self, chip, netlist, infile=None, randomized=False):
+    def __init__(self, chip, netlist, infile=None, randomized=False, connections=None, gates=None,
+                 layers=8, margin=1, dimensions=None):
 
         self.chip = chip
         self.netlist = netlist
         self.infile = infile
-        self.size = [0, 0, 7]
         self.randomized = randomized
 
+        # Highest coordinate in every dimension, computed from the gates unless dimensions are given
+        self.size = [0, 0, layers - 1]
+        self.layers = layers
+        self.margin = margin
+        self.dimensions = dimensions
+
         self.intersections = 0
 
         self.wire_segments = {}
@@ -24,14 +31,23 @@ class Grid:
 
         self.gate_coordinates = set()
 
+        # Distances from every point to every gate, computed when they are needed
+        self.distance_fields = DistanceFields(self)
+
+        # Arrays the flat A* kernel reuses for every net, made when the first path is searched
+        self.search_workspace = SearchWorkspace(self)
+
+        # Arrays with the occupation of the grid, made the first time they are requested
+        self.occupation = Occupancy(self)
+
         # Dictionary containing all connections: {(startID, endID): Net}
         self.nets = {}
 
-        # Create gate objects
-        self.load_gates()
+        # Create gate objects, from the chip print unless gates are given
+        self.load_gates(gates)
 
-        # Create net objects
-        self.load_nets()
+        # Create net objects, from the netlist file unless connections are given
+        self.load_nets(connections)
 
         # Load previously generated configuration of one is given
         if infile:
@@ -41,36 +57,47 @@ class Grid:
 
         self.theoretical_minimum = 0
 
-    def load_configuration(self):
-        """Loads a previously generated set of nets."""
+        # Lower bound on the costs, which is only computed when it is needed
+        self.lower_bound = None
 
-        # Extract data from csv
-        data = pd.read_csv(self.infile)
-        x = pd.Series.tolist((data['x'].str.split(';')))
-        y = pd.Series.tolist(data['y'].str.split(';'))
-        z = pd.Series.tolist(data['z'].str.split(';'))
+    @classmethod
+    def from_arrays(cls, gates, connections, chip=None, netlist=None):
+        """
+        Makes a grid from gates and nets in memory, without reading any files.
+        Gates are given as (gate_id, x, y) rows and nets as (start_gate_id, end_gate_id) rows,
+        for example as lists of tuples or as NumPy arrays.
+        """
 
-        # Run over all imported nets and change to list of ints
-        for i in range(len(x)):
+        return cls(chip, netlist, connections=connections, gates=gates)
 
-            for j in range(len(x[i])):
-                x[i][j] = int(x[i][j])
-            for j in range(len(y[i])):
-                y[i][j] = int(y[i][j])
-            for j in range(len(z[i])):
-                z[i][j] = int(z[i][j])
+    def arguments(self):
+        """
+        Returns the keyword arguments to make a copy of this grid without any paths,
+        for example in another process, without reading any files.
+        """
 
-            # Extract coordinates of the gates the net connects
-            gate_origin = (x[i][0], y[i][0], 0)
-            gate_destination = (x[i][-1], y[i][-1], 0)
+        return {"chip": self.chip, "netlist": self.netlist, "randomized": self.randomized,
+                "connections": list(self.nets),
+                "gates": [(uid, *gate_object.coordinates[:2]) for uid, gate_object in self.gates.items()],
+                "layers": self.layers, "margin": self.margin, "dimensions": self.dimensions}
 
-            # Extract corresponding net from dictionary
-            for net_object in self.nets.values():
-                if (net_object.start == gate_origin and
-                        net_object.end == gate_destination):
+    def load_configuration(self):
+        """Loads a previously generated set of nets."""
+
+        # Look up nets by the coordinates of the gates they connect
+        nets = {(net_object.start, net_object.end): net_object for net_object in self.nets.values()}
 
-                    # Save path to correct net
-                    net_object.path = [x[i], y[i], z[i]]
+        # Extract data from csv, coordinates are ;-seperated
+        with open(self.infile, newline="") as csvfile:
+            for row in csv.DictReader(csvfile):
+                x = [int(element) for element in row['x'].split(';')]
+                y = [int(element) for element in row['y'].split(';')]
+                z = [int(element) for element in row['z'].split(';')]
+
+                # Save path to the net that connects its first and last gate
+                net_object = nets.get(((x[0], y[0], 0), (x[-1], y[-1], 0)))
+                if net_object:
+                    net_object.path = [x, y, z]
 
         # Update grid
         self.update()
@@ -81,8 +108,9 @@ class Grid:
         to date when a change in the configuration of the grid has been made.
         """
 
-        # Reset dictionary wire segments and number of intersections
+        # Reset dictionary wire segments, used coordinates and number of intersections
         self.wire_segments = {}
+        self.coordinates = set()
         self.intersections = 0
 
         # Run over nets to extract their paths
@@ -102,9 +130,8 @@ class Grid:
                 start = (x[coordinate], y[coordinate], z[coordinate])
                 end = (x[coordinate + 1], y[coordinate + 1], z[coordinate + 1])
 
-                # Check for intersections
-                if [segment for segment in self.wire_segments if end in segment
-                        and end not in self.gate_coordinates]:
+                # Check for intersections, the used coordinates are those of the segments added so far
+                if end in self.coordinates and end not in self.gate_coordinates:
                     self.intersections += 1
 
                 segment = self.make_segment(start, end)
@@ -114,100 +141,163 @@ class Grid:
                 self.coordinates.add(segment[0])
                 self.coordinates.add(segment[1])
 
+    def lay_path(self, net):
+        """Adds all segments of the path of a net to the grid."""
+
+        x, y, z = net.path[0], net.path[1], net.path[2]
+
+        for coordinate in range(len(x) - 1):
+            start = (x[coordinate], y[coordinate], z[coordinate])
+            end = (x[coordinate + 1], y[coordinate + 1], z[coordinate + 1])
+            segment = self.make_segment(start, end)
+
+            self.wire_segments[segment] = net
+            self.coordinates.add(segment[0])
+            self.coordinates.add(segment[1])
+
+    def remove_path(self, net):
+        """
+        Removes all segments of the path of a net from the grid, and resets the path of the net.
+        The number of intersections is not updated, run update() or compute_costs() for that.
+        """
+
+        self.wire_segments = {segment: owner for segment, owner in self.wire_segments.items() if owner is not net}
+        net.path = []
+
+        # Coordinates can be shared by multiple nets, so rebuild them from the remaining segments
+        self.coordinates = set()
+        for segment in self.wire_segments:
+            self.coordinates.add(segment[0])
+            self.coordinates.add(segment[1])
+
+    def clear_paths(self):
+        """Removes all paths from the grid."""
+
+        self.wire_segments = {}
+        self.coordinates = set()
+        self.intersections = 0
+
+        for net_object in self.nets.values():
+            net_object.path = []
+
+    def snapshot(self):
+        """
+        Returns a snapshot of the paths and the occupation of the grid, which can be restored with restore().
+        Paths are never changed in place, only replaced, so they are shared with the snapshot instead of copied.
+        """
+
+        paths = {key: net_object.path for key, net_object in self.nets.items()}
+
+        return dict(self.wire_segments), set(self.coordinates), paths, self.intersections, self.cost
+
+    def restore(self, snapshot):
+        """Restores the paths and the occupation of the grid from a snapshot. A snapshot can be restored more than once."""
+
+        wire_segments, coordinates, paths, self.intersections, self.cost = snapshot
+        self.wire_segments = dict(wire_segments)
+        self.coordinates = set(coordinates)
+
+        for key, path in paths.items():
+            self.nets[key].path = path
+
+    def occupancy(self, exclude=None):
+        """
+        Returns NumPy arrays describing the occupation of the grid: a boolean array of used coordinates,
+        a boolean array of gate coordinates and a list with a boolean array of used segments per dimension.
+        A segment is indexed by its lowest coordinate. The segments of the net given by exclude are left out.
+        The arrays are kept up to date incrementally, see occupancy.py.
+        """
+
+        return self.occupation.arrays(exclude)
+
     def make_segment(self, start, end):
         """
         Saves two coordinates as a tuple, and ensure two identical segments are
         never stored in reverse order (a, b VS b, a).
         """
 
-        if ((math.sqrt(sum(i**2 for i in end))) >= (math.sqrt(sum(i**2 for i in start)))):
+        # Compare the squared distances to the origin, which are in the same order as the distances
+        if end[0] ** 2 + end[1] ** 2 + end[2] ** 2 >= start[0] ** 2 + start[1] ** 2 + start[2] ** 2:
             return (start, end)
         else:
             return (end, start)
 
-    def load_gates(self):
+    def load_gates(self, gates=None):
         """
         Reads requested file containing the location of the gates,
         and extracts their id's and coordinates.
         Creates gate object for each row.
+        If a list of (gate_id, x, y) tuples is given, those gates are used instead of the file.
         """
 
-        with open(f"data/chip_{self.chip}/print_{self.chip}.csv", 'r') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-
-                # Extract information
-                uid, x, y = int(row['chip']), int(row['x']), int(row['y'])
+        if gates is None:
+            gates = loader.load_print(self.chip)
 
-                self.gate_coordinates.add((x, y, 0))
+        for uid, x, y in gates:
+            uid, x, y = int(uid), int(x), int(y)
 
-                # Find the size of the grid
-                if x > self.size[0]:
-                    self.size[0] = x + 1
+            self.gate_coordinates.add((x, y, 0))
 
-                if y > self.size[1]:
-                    self.size[1] = y + 1
+            # Make object and add to dictionary
+            gate_object = gate.Gate(uid, x, y, 0)
+            self.gates[uid] = gate_object
 
-                # Make object and add to dictionary
-                gate_object = gate.Gate(uid, x, y, 0)
-                self.gates[uid] = gate_object
+        self.compute_size()
 
-    def load_nets(self):
+    def compute_size(self):
         """
-        Reads requested file containing the requested nets,
-        and extracts their starting and ending coordinates.
-        Creates gate object for each row.
+        Sets the highest coordinate of the grid in every dimension. Unless the dimensions are given,
+        the grid reaches the number of points given by the margin beyond the outermost gates.
         """
 
-        if self.randomized:
-            add = "random/"
-        else:
-            add = ""
+        max_x = max([coordinate[0] for coordinate in self.gate_coordinates], default=0)
+        max_y = max([coordinate[1] for coordinate in self.gate_coordinates], default=0)
 
-        with open(f"data/chip_{self.chip}/{add}netlist_{self.netlist}.csv") as file:
-            reader = csv.DictReader(file)
+        if self.layers < 1:
+            raise ValueError("A grid needs at least 1 layer.")
 
-            for row in reader:
+        if self.dimensions:
+            if self.dimensions[0] < max_x or self.dimensions[1] < max_y:
+                raise ValueError(f"Dimensions {self.dimensions} are too small for gates up to ({max_x}, {max_y}).")
+            self.size = [self.dimensions[0], self.dimensions[1], self.layers - 1]
+        else:
+            self.size = [max_x + self.margin, max_y + self.margin, self.layers - 1]
 
-                # Extract coordinates
-                start_gate_id, end_gate_id = (int(row['chip_a']),
-                                              int(row['chip_b']))
+    def on_grid(self, coordinate):
+        """Checks if a coordinate lies within the grid."""
 
-                # Retrieve gate objects corresponding with coordinates
-                start_gate = self.gates[start_gate_id]
-                end_gate = self.gates[end_gate_id]
+        return all(0 <= coordinate[i] <= self.size[i] for i in range(3))
 
-                # Make net object
-                net_object = net.Net(start_gate.coordinates, end_gate.coordinates,  self)
+    def load_nets(self, connections=None):
+        """
+        Reads requested file containing the requested nets,
+        and extracts their starting and ending coordinates.
+        Creates gate object for each row.
+        If a list of (start_gate_id, end_gate_id) tuples is given, those nets are used instead of the file.
+        """
 
-                # Create unique key per net
-                key = (start_gate_id, end_gate_id)
-                net_object.key = key
+        if connections is None:
+            connections = loader.load_netlist(self.chip, self.netlist, self.randomized)
 
-                # Store net in dictionary with unique key
-                self.nets[key] = net_object
+        for start_gate_id, end_gate_id in connections:
+            start_gate_id, end_gate_id = int(start_gate_id), int(end_gate_id)
 
-    def to_csv(self, number=None, name=""):
-        """Writes a csv file that contains all paths in the grid."""
+            # Retrieve gate objects corresponding with coordinates
+            start_gate = self.gates[start_gate_id]
+            end_gate = self.gates[end_gate_id]
 
-        nets = {}
-        x = {}
-        y = {}
-        z = {}
+            # Make net object
+            net_object = net.Net(start_gate.coordinates, end_gate.coordinates, self)
 
-        # Run over nets
-        for item in self.nets:
+            # Create unique key per net
+            key = (start_gate_id, end_gate_id)
+            net_object.key = key
 
-            # Extract list for coordinate in each dimension
-            x_path = [str(element) for element in self.nets[item].path[0]]
-            y_path = [str(element) for element in self.nets[item].path[1]]
-            z_path = [str(element) for element in self.nets[item].path[2]]
+            # Store net in dictionary with unique key
+            self.nets[key] = net_object
 
-            # Make individual coordinates ;-seperated
-            x[item] = ";".join(x_path)
-            y[item] = ";".join(y_path)
-            z[item] = ";".join(z_path)
-            nets[item] = item
+    def to_csv(self, number=None, name=""):
+        """Writes a csv file that contains all paths in the grid."""
 
         # Ensure correct file is created/modified
         if number:
@@ -225,9 +315,14 @@ class Grid:
         else:
             add = ""
 
-        # Save dataframe to csv
-        df = pd.DataFrame({'net': nets, 'x': x, 'y': y, 'z': z})
-        df.to_csv(f"results/{add}paths_netlist_{self.netlist}{name}{string}.csv", index=False)
+        # Save paths to csv
+        with open(f"results/{add}paths_netlist_{self.netlist}{name}{string}.csv", "w", newline="") as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(["net", "x", "y", "z"])
+
+            # Write a row per net, with individual coordinates ;-seperated
+            for item, net_object in self.nets.items():
+                writer.writerow([item, *(";".join(str(element) for element in path) for path in net_object.path)])
 
     def compute_costs(self):
         """Calculates total cost of the current configuration."""
@@ -242,6 +337,34 @@ class Grid:
         for net_object in self.nets.values():
             self.theoretical_minimum += net_object.minimal_length
 
+    def compute_lower_bound(self, lp=True):
+        """
+        Calculates a lower bound on the costs of any solution, which takes the ports of busy gates into account.
+        The bound only depends on the netlist, so it is calculated the first time only.
+        See lower_bound.py for further explanation.
+        """
+
+        if self.lower_bound is None:
+            self.lower_bound = lower_bound.lower_bound(self, lp)
+
+        return self.lower_bound
+
+    def gap(self):
+        """Returns the fraction by which the current costs may exceed the optimum at most."""
+
+        return lower_bound.optimality_gap(self.cost, self.compute_lower_bound())
+
+    def summary(self):
+        """
+        Describes the costs, followed by the lower bound and the gap if the bound has been calculated already.
+        The bound takes a linear program, so it is not calculated just to be printed.
+        """
+
+        if self.lower_bound is None:
+            return f"Costs are {self.cost}"
+
+        return f"Costs are {self.cost}, lower bound is {self.lower_bound} (gap {self.gap():.1%})"
+
     def to_output(self, number=None, name=""):
 
         # Ensure correct file is created/modified
@@ -271,20 +394,20 @@ class Grid:
             writer.writeheader()
 
             # Write all values for the gates and paths conform the format
-            for net in self.nets:
-                net_id_text = f"-{net[0]},{net[1]}"
+            for key in self.nets:
+                net_id_text = f"-{key[0]},{key[1]}"
                 net_path_text = []
 
-                for item in range(len(self.nets[net].path[0])):
-                    path_tuple = (self.nets[net].path[0][item], self.nets[net].path[1][item], self.nets[net].path[2][item])
+                for item in range(len(self.nets[key].path[0])):
+                    path_tuple = (self.nets[key].path[0][item], self.nets[key].path[1][item], self.nets[key].path[2][item])
                     net_path_text.append(path_tuple)
 
                 writer.writerow({
                     "net": net_id_text, "wires": net_path_text
-                    })
+                })
 
             # Write final values in csv
             self.compute_costs()
             writer.writerow({
-                    "net": f"chip_{self.chip}_net_{self.netlist}", "wires": self.cost
-                    })
+                "net": f"chip_{self.chip}_net_{self.netlist}", "wires": self.cost
+            })
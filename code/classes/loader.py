@@ -0,0 +1,63 @@
+"""
+loader.py
+
+Reads the chip prints and netlists from the data directory.
+A chip print never changes while the program runs, so each print is parsed only once per process and kept in memory.
+Grids can be made from these cached prints, or from gates and nets that are not stored in the data directory
+at all, such as randomly generated netlists. This way a large number of grids can be made without reading any files.
+"""
+import csv
+from functools import lru_cache
+
+
+def chip_of(netlist):
+    """Returns the number of the chip a netlist belongs to."""
+
+    return int((netlist - 1) / 3)
+
+
+@lru_cache(maxsize=None)
+def load_print(chip):
+    """
+    Reads the print of a chip, and returns a tuple of (gate_id, x, y) tuples.
+    The print is read from disk only the first time it is requested.
+    """
+
+    gates = []
+    with open(f"data/chip_{chip}/print_{chip}.csv", 'r') as file:
+        reader = csv.DictReader(file)
+        for row in reader:
+            gates.append((int(row['chip']), int(row['x']), int(row['y'])))
+
+    return tuple(gates)
+
+
+def load_netlist(chip, netlist, randomized=False):
+    """
+    Reads a netlist, and returns a tuple of (start_gate_id, end_gate_id) tuples.
+    Random netlists can be overwritten while the program runs, so only the original netlists are kept in memory.
+    """
+
+    if randomized:
+        return read_netlist(f"data/chip_{chip}/random/netlist_{netlist}.csv")
+
+    return cached_netlist(f"data/chip_{chip}/netlist_{netlist}.csv")
+
+
+@lru_cache(maxsize=None)
+def cached_netlist(filename):
+    """Reads a netlist once per process."""
+
+    return read_netlist(filename)
+
+
+def read_netlist(filename):
+    """Reads a netlist file, and returns a tuple of (start_gate_id, end_gate_id) tuples."""
+
+    connections = []
+    with open(filename) as file:
+        reader = csv.DictReader(file)
+        for row in reader:
+            connections.append((int(row['chip_a']), int(row['chip_b'])))
+
+    return tuple(connections)
@@ -0,0 +1,187 @@
+"""
+lower_bound.py
+
+Computes a lower bound on the costs of any solution of a netlist, which is used to report how far a solution
+is from the optimum at most, and to stop the iterative algorithms once they are close enough.
+
+The simplest bound is the sum of the Manhattan distances of all nets (see Grid.compute_minimum).
+It assumes every net can leave and enter its gates in the direction of the other gate, which is not true for busy gates.
+A gate has at most 5 ports: 4 neighbours on the lowest layer and 1 above it. Every net uses one port at both of its
+gates, and no two nets can use the same port, since segments may not be shared. A port is only useful to a net if
+it leads towards the other gate. A net that uses any other port makes a detour, which makes it at least 2 steps
+longer than its Manhattan distance. In particular, a gate with more nets than free neighbours on the lowest layer
+forces at least one net to escape upwards, and back down again.
+
+Two bounds are computed from these ports:
+- The port bound: for every gate separately, the nets are assigned to ports such that as few nets as possible use a
+  port which does not lead to the other gate. Each of those costs at least 1 step (half of a detour, since the other
+  half may be made at the other gate).
+- The LP bound: a linear program that assigns the nets to ports at both gates at once, where a net costs 2 steps
+  if it uses a port that does not lead to the other gate at either of its gates. Since the assignment is relaxed
+  to fractions, its optimum is never higher than the costs of the best actual assignment.
+Intersections are not taken into account, so the bound is never higher than the costs of the optimal solution.
+"""
+import math
+import numpy as np
+
+
+# Cost of a port which cannot be used by a net
+UNAVAILABLE = 10 ** 6
+
+
+def lower_bound(grid, lp=True):
+    """
+    Returns a lower bound on the costs of any solution of the netlist of a grid,
+    or math.inf if some gate has fewer ports than nets, in which case the netlist cannot be solved.
+    """
+
+    minimum = sum(net.minimal_length for net in grid.nets.values())
+    ports = gate_ports(grid)
+
+    detours = port_bound(grid, ports)
+    if detours is None:
+        return math.inf
+
+    if lp:
+        detours = max(detours, lp_bound(grid, ports))
+
+    return minimum + detours
+
+
+def optimality_gap(cost, bound):
+    """Returns the fraction of the costs of a solution by which it may exceed the optimum at most."""
+
+    if not cost:
+        return 0.0
+
+    return (cost - bound) / cost
+
+
+def gate_ports(grid):
+    """
+    Returns the ports of every gate coordinate, as a list of (direction, neighbour) tuples,
+    where the direction is a step (dx, dy, dz) and the neighbour the coordinate it leads to.
+    """
+
+    ports = {}
+    for gate in grid.gate_coordinates:
+        ports[gate] = []
+
+        for direction in [(-1, 0, 0), (1, 0, 0), (0, -1, 0), (0, 1, 0), (0, 0, 1)]:
+            neighbour = tuple(gate[i] + direction[i] for i in range(3))
+            if grid.on_grid(neighbour):
+                ports[gate].append((direction, neighbour))
+
+    return ports
+
+
+def port_costs(grid, net, gate, ports):
+    """
+    Returns the costs of every port of a gate for a net: 0 if the port leads towards the other gate of the net,
+    1 if the net has to make a detour, and UNAVAILABLE if the port leads into another gate.
+    """
+
+    other = net.end if gate == net.start else net.start
+    costs = []
+
+    for direction, neighbour in ports[gate]:
+        if neighbour in grid.gate_coordinates and neighbour != other:
+            costs.append(UNAVAILABLE)
+        elif any(direction[i] and direction[i] * (other[i] - gate[i]) > 0 for i in range(3)):
+            costs.append(0)
+        else:
+            costs.append(1)
+
+    return costs
+
+
+def gate_nets(grid):
+    """Returns the nets that are connected to every gate coordinate."""
+
+    nets = {gate: [] for gate in grid.gate_coordinates}
+    for net in grid.nets.values():
+        nets[net.start].append(net)
+        nets[net.end].append(net)
+
+    return nets
+
+
+def port_bound(grid, ports):
+    """
+    Assigns the nets to the ports of every gate separately, with as few detours as possible.
+    Returns the number of steps the detours cost at least, or None if the nets do not fit.
+    """
+
+    # SciPy is only imported when a bound is computed, since importing it takes long
+    from scipy.optimize import linear_sum_assignment
+
+    detours = 0
+    for gate, nets in gate_nets(grid).items():
+        if not nets:
+            continue
+        if len(nets) > len(ports[gate]):
+            return None
+
+        costs = np.array([port_costs(grid, net, gate, ports) for net in nets])
+        rows, columns = linear_sum_assignment(costs)
+        assigned = costs[rows, columns]
+        if (assigned >= UNAVAILABLE).any():
+            return None
+
+        detours += int(assigned.sum())
+
+    # Every detour makes a path 2 steps longer, so the total is even
+    return detours + detours % 2
+
+
+def lp_bound(grid, ports):
+    """
+    Solves the relaxed assignment of all nets to the ports at both of their gates, where a net that uses a port
+    which does not lead to the other gate at either gate costs 2 steps. Returns the number of steps the detours
+    cost at least, or 0 if the linear program cannot be solved.
+    """
+
+    from scipy import sparse
+    from scipy.optimize import linprog
+
+    nets = list(grid.nets.values())
+
+    # Variables are the fraction of a net that uses a port at one of its gates, followed by the detour of each net
+    variables = []
+    for number, net in enumerate(nets):
+        for gate in (net.start, net.end):
+            for port, cost in enumerate(port_costs(grid, net, gate, ports)):
+                if cost < UNAVAILABLE:
+                    variables.append((number, gate, port, cost))
+
+    num_ports = len(variables)
+    num_variables = num_ports + len(nets)
+
+    # Every net uses exactly one port at both of its gates
+    ends = {}
+    for index, (number, gate, port, cost) in enumerate(variables):
+        ends.setdefault((number, gate), []).append(index)
+    equality = sparse.lil_matrix((len(ends), num_variables))
+    for row, indices in enumerate(ends.values()):
+        equality[row, indices] = 1
+
+    # Every port is used by at most one net, and a net makes a detour if it uses a bad port at either of its gates
+    used = {}
+    for index, (number, gate, port, cost) in enumerate(variables):
+        used.setdefault((gate, port), []).append(index)
+    upper = sparse.lil_matrix((len(used) + len(ends), num_variables))
+    for row, indices in enumerate(used.values()):
+        upper[row, indices] = 1
+    for row, ((number, gate), indices) in enumerate(ends.items(), start=len(used)):
+        upper[row, [index for index in indices if variables[index][3]]] = 1
+        upper[row, num_ports + number] = -1
+
+    objective = np.concatenate([np.zeros(num_ports), np.full(len(nets), 2)])
+    result = linprog(objective, A_ub=upper.tocsr(), b_ub=np.concatenate([np.ones(len(used)), np.zeros(len(ends))]),
+                     A_eq=equality.tocsr(), b_eq=np.ones(len(ends)), bounds=(0, 1), method="highs")
+
+    if not result.success:
+        return 0
+
+    # The costs of the actual detours are even, and never lower than the optimum of the relaxation
+    return 2 * math.ceil(result.fun / 2 - 1e-9)
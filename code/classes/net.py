@@ -9,6 +9,6 @@ class Net:
         self.path = []
         self.total_distance_middle = 0
         self.exp_intersections = 0
+        self.field_length = 0
         self.key = ()
         self.intersection = 0
-
@@ -0,0 +1,106 @@
+"""
+occupancy.py
+
+Keeps NumPy arrays describing the occupation of the grid, which the batched random walks (see proposals.py) and
+the distance fields (see distance_fields.py) check their steps against:
+- The number of segments at every coordinate.
+- The gate coordinates.
+- The used segments per dimension, stored at their lowest coordinate.
+
+Filling these arrays means running over all segments of the grid, which used to be done for every net every time
+walks were drawn. Instead, the arrays are made once and kept up to date with the segments of the grid, in the same
+way as the search workspace (see search_workspace.py): removing segments replaces the dictionary of segments of the
+grid, and adding them changes it in place, so the segments that were added or removed since the last time are found
+by comparing the keys of the dictionary with the segments known to be laid.
+"""
+import numpy as np
+
+
+class Occupancy:
+    def __init__(self, grid):
+        self.grid = grid
+        self.shape = None
+
+        # Dictionary of segments of the grid, and the segments in it, at the last synchronisation
+        self.segments = None
+        self.known = set()
+
+    def arrays(self, exclude=None):
+        """
+        Returns a boolean array of used coordinates, a boolean array of gate coordinates and a list with a boolean
+        array of used segments per dimension. The segments of the net given by exclude are left out.
+        The arrays are copies, so they stay the same when paths are laid or removed afterwards.
+        """
+
+        self.synchronize()
+
+        uses = self.uses.copy()
+        segments = self.used_segments.copy()
+
+        if exclude is not None and exclude.path:
+            x, y, z = exclude.path
+            for coordinate in range(len(x) - 1):
+                start = (x[coordinate], y[coordinate], z[coordinate])
+                end = (x[coordinate + 1], y[coordinate + 1], z[coordinate + 1])
+
+                if self.grid.wire_segments.get(self.grid.make_segment(start, end)) is exclude:
+                    uses[start] -= 1
+                    uses[end] -= 1
+                    dimension, lowest = position(start, end)
+                    segments[dimension][lowest] = False
+
+        return uses > 0, self.gates.copy(), list(segments)
+
+    def allocate(self):
+        """Makes all arrays for the current size of the grid."""
+
+        self.shape = (self.grid.size[0] + 1, self.grid.size[1] + 1, self.grid.size[2] + 1)
+        self.uses = np.zeros(self.shape, dtype=np.int32)
+        self.used_segments = np.zeros((3, *self.shape), dtype=bool)
+
+        self.gates = np.zeros(self.shape, dtype=bool)
+        for coordinate in self.grid.gate_coordinates:
+            self.gates[coordinate] = True
+
+        self.segments = None
+        self.known = set()
+
+    def synchronize(self):
+        """Processes the segments that were added to or removed from the grid since the last call."""
+
+        if self.shape != tuple(size + 1 for size in self.grid.size):
+            self.allocate()
+
+        segments = self.grid.wire_segments
+        if segments is self.segments and len(segments) == len(self.known):
+            return
+
+        removed = self.known - segments.keys()
+        added = segments.keys() - self.known
+
+        for segment in removed:
+            self.mark(segment, -1)
+        for segment in added:
+            self.mark(segment, 1)
+
+        self.known -= removed
+        self.known |= added
+        self.segments = segments
+
+    def mark(self, segment, change):
+        """Adds (change 1) or removes (change -1) a segment to or from the arrays."""
+
+        start, end = segment
+        self.uses[start] += change
+        self.uses[end] += change
+
+        dimension, lowest = position(start, end)
+        self.used_segments[dimension][lowest] = change > 0
+
+
+def position(start, end):
+    """Returns the dimension in which a segment lies, and its lowest coordinate."""
+
+    for dimension in range(3):
+        if start[dimension] != end[dimension]:
+            return dimension, start if start[dimension] < end[dimension] else end
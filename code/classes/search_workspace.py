@@ -0,0 +1,200 @@
+"""
+search_workspace.py
+
+Holds everything the flat A* kernel (see flat_a_star.py) needs to search a path on a grid, so that searching the
+paths of all nets one after another allocates almost nothing after the first net.
+The points of the grid are numbered: point (x, y, z) gets the id (x * Y + y) * Z + z, where X, Y and Z are the
+number of points in each dimension.
+
+Tables that only depend on the size of the grid are made once per size, and shared by all grids of that size:
+- The coordinates of every id.
+- The ids of the neighbours of every id, in the order in which A_Star_Solver visits them: along x, along y and along
+  z, each first down and then up. A neighbour off the grid has id -1.
+
+The workspace of a grid keeps the following arrays, which are made the first time a path is searched:
+- The costs of entering every point: 1, or 301 if the point is used by a net and is not a gate.
+- The segments in use, per point and direction, at index id * 6 + direction.
+- Per gate space, the points in the columns above the gates that may not be used.
+- The distance field towards the last goal, as a list. Only one is kept, so the workspace does not grow with the
+  number of gates.
+- The costs and parent of every point during a search, and two generation stamps: the search in which the point was
+  last put in the queue, and the search in which it was last visited. Every search gets a new generation, so these
+  arrays never have to be cleared.
+- The heap that serves as the queue, which is emptied and reused by every search.
+
+The occupation is kept up to date with the segments of the grid. The grid only ever adds segments to its dictionary
+of segments in place; removing segments replaces the dictionary. So if the dictionary is the same object and has as many
+segments as before, nothing has changed. Otherwise only the segments that were added or removed are processed.
+The kernel itself reports the segments of every path it lays, so routing the nets one after another never needs this.
+"""
+import numpy as np
+
+
+class Tables:
+    """Tables that only depend on the size of the grid."""
+
+    def __init__(self, size):
+        self.dimensions = (size[0] + 1, size[1] + 1, size[2] + 1)
+        X, Y, Z = self.dimensions
+        self.num_points = X * Y * Z
+
+        # Coordinates of every id
+        x, y, z = np.meshgrid(np.arange(X), np.arange(Y), np.arange(Z), indexing="ij")
+        x, y, z = x.ravel(), y.ravel(), z.ravel()
+        self.x, self.y, self.z = x.tolist(), y.tolist(), z.tolist()
+        self.coordinates = list(zip(self.x, self.y, self.z))
+
+        # Id of every neighbour, in the order of A_Star_Solver, or -1 if it lies off the grid
+        ids = np.arange(self.num_points)
+        neighbours = np.full((self.num_points, 6), -1, dtype=np.int64)
+        for direction, (values, limit, offset) in enumerate([(x, X, -Y * Z), (x, X, Y * Z), (y, Y, -Z), (y, Y, Z),
+                                                            (z, Z, -1), (z, Z, 1)]):
+            step = 1 if offset > 0 else -1
+            inside = (values + step >= 0) & (values + step < limit)
+            neighbours[inside, direction] = ids[inside] + offset
+        self.neighbours = neighbours.tolist()
+
+    def id(self, coordinate):
+        """Returns the id of a coordinate."""
+
+        return (coordinate[0] * self.dimensions[1] + coordinate[1]) * self.dimensions[2] + coordinate[2]
+
+
+# Tables per grid size
+tables = {}
+
+
+def get_tables(size):
+    """Returns the tables for a grid of the given size, and makes them the first time."""
+
+    key = tuple(size)
+    if key not in tables:
+        tables[key] = Tables(size)
+
+    return tables[key]
+
+
+def direction(a, b):
+    """Returns the direction of the step between two neighbouring coordinates, in the order of the neighbour table."""
+
+    for i in range(3):
+        if a[i] != b[i]:
+            return 2 * i + (b[i] > a[i])
+
+
+class SearchWorkspace:
+    def __init__(self, grid):
+        self.grid = grid
+        self.tables = None
+        self.generation = 0
+
+        # Dictionary of segments of the grid, and the segments in it, at the last synchronisation
+        self.segments = None
+        self.known = set()
+
+    def prepare(self):
+        """
+        Makes the arrays the first time or when the size of the grid has changed, brings the occupation up to date and
+        empties the heap. Returns the generation of the new search.
+        """
+
+        if self.tables is None or self.tables.dimensions != tuple(size + 1 for size in self.grid.size):
+            self.allocate()
+
+        self.synchronize()
+        self.heap.clear()
+        self.generation += 1
+
+        return self.generation
+
+    def allocate(self):
+        """Makes all arrays for the current size of the grid."""
+
+        self.tables = get_tables(self.grid.size)
+        num_points = self.tables.num_points
+
+        self.gates = bytearray(num_points)
+        for gate in self.grid.gate_coordinates:
+            self.gates[self.tables.id(gate)] = 1
+
+        # Occupation of the grid: the number of segments at every point, the costs of entering it and the used segments
+        self.uses = [0] * num_points
+        self.entry_costs = [1] * num_points
+        self.blocked = bytearray(num_points * 6)
+        self.illegal_points = {}
+
+        # Arrays of a search
+        self.costs = [0] * num_points
+        self.parents = [0] * num_points
+        self.queued = [0] * num_points
+        self.visited = [0] * num_points
+        self.heap = []
+
+        # Distance field of the last goal as a list, with the array it was made from
+        self.field_source = None
+        self.field_list = None
+
+        self.segments = None
+        self.known = set()
+
+    def synchronize(self):
+        """Processes the segments that were added to or removed from the grid since the last call."""
+
+        segments = self.grid.wire_segments
+        if segments is self.segments and len(segments) == len(self.known):
+            return
+
+        removed = self.known - segments.keys()
+        added = segments.keys() - self.known
+
+        for segment in removed:
+            self.mark(segment, -1)
+        for segment in added:
+            self.mark(segment, 1)
+
+        self.known -= removed
+        self.known |= added
+        self.segments = segments
+
+    def add_segment(self, segment):
+        """Adds a segment the kernel has laid on the grid."""
+
+        if segment not in self.known:
+            self.mark(segment, 1)
+            self.known.add(segment)
+
+    def mark(self, segment, change):
+        """Adds (change 1) or removes (change -1) a segment to or from the occupation."""
+
+        a, b = segment
+        self.blocked[self.tables.id(a) * 6 + direction(a, b)] = change > 0
+        self.blocked[self.tables.id(b) * 6 + direction(b, a)] = change > 0
+
+        for point in (self.tables.id(a), self.tables.id(b)):
+            self.uses[point] += change
+            self.entry_costs[point] = 301 if self.uses[point] and not self.gates[point] else 1
+
+    def illegal(self, gate_space):
+        """Returns for every id whether it lies in the column above a gate, up to the gate space."""
+
+        if gate_space not in self.illegal_points:
+            height = max(0, min(gate_space, self.tables.dimensions[2] - 1) + 1)
+            illegal = bytearray(self.tables.num_points)
+            for gate in self.grid.gate_coordinates:
+                column = self.tables.id((gate[0], gate[1], 0))
+                illegal[column:column + height] = bytes([1]) * height
+            self.illegal_points[gate_space] = illegal
+
+        return self.illegal_points[gate_space]
+
+    def field(self, field):
+        """
+        Returns a distance field as a list indexed by id, where -1 means the gate cannot be reached.
+        The list is made again only if another field is passed than the last time.
+        """
+
+        if field is not self.field_source:
+            self.field_list = np.asarray(field).ravel().tolist()
+            self.field_source = field
+
+        return self.field_list
@@ -0,0 +1,62 @@
+"""
+cost_trace.py
+
+Records the costs of an iterative algorithm after every iteration, to write them to a csv file or plot the
+convergence afterwards, in a fixed amount of memory. Keeping every value in a list makes long runs with millions of
+moves use ever more memory, while a plot of the convergence needs only a few thousand points.
+
+The trace consists of two parts:
+- The most recent values, in a ring buffer of fixed size, so the end of a run is known in full detail.
+- Samples of the whole run at logarithmically spaced iterations: every iteration at the start, when the costs drop
+  fast, and ever fewer later on. Every next sample is taken a fixed fraction later than the previous one, so the
+  number of samples only grows with the logarithm of the number of iterations.
+Both parts are stored in arrays of integers.
+"""
+from array import array
+import numpy as np
+
+
+class CostTrace:
+    def __init__(self, recent=1024, resolution=64):
+        self.count = 0
+
+        # Ring buffer of the most recent iterations and their costs
+        self.recent_iterations = array("q", bytes(8 * recent))
+        self.recent_costs = array("q", bytes(8 * recent))
+
+        # Samples of the whole run, about resolution samples every time the number of iterations grows by a factor e
+        self.resolution = resolution
+        self.next_sample = 1
+        self.sample_iterations = array("q")
+        self.sample_costs = array("q")
+
+    def __len__(self):
+        return self.count
+
+    def append(self, cost):
+        """Records the costs after the next iteration."""
+
+        self.count += 1
+
+        position = self.count % len(self.recent_costs)
+        self.recent_iterations[position] = self.count
+        self.recent_costs[position] = cost
+
+        if self.count >= self.next_sample:
+            self.sample_iterations.append(self.count)
+            self.sample_costs.append(cost)
+            self.next_sample = self.count + 1 + self.count // self.resolution
+
+    def samples(self):
+        """Returns the recorded iterations and their costs as two arrays, ordered by iteration."""
+
+        recent_iterations = np.frombuffer(self.recent_iterations, dtype=np.int64)
+        recent_costs = np.frombuffer(self.recent_costs, dtype=np.int64)
+        recent = recent_iterations > 0
+
+        iterations = np.concatenate([np.frombuffer(self.sample_iterations, dtype=np.int64), recent_iterations[recent]])
+        costs = np.concatenate([np.frombuffer(self.sample_costs, dtype=np.int64), recent_costs[recent]])
+
+        # Remove iterations that are both sampled and recent
+        iterations, unique = np.unique(iterations, return_index=True)
+        return iterations, costs[unique]
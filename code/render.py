@@ -0,0 +1,151 @@
+"""
+render.py
+
+Renders many solutions to image files at once, for example for reports, without opening a window or a browser.
+Solutions are either the csv files of a netlist in a directory, or the solutions in a SolutionPool.
+Every solution is rendered as a png thumbnail with matplotlib, and/or as an html file with plotly
+(see visualize.py).
+
+Rendering is done in a number of worker processes, which use the non-interactive Agg backend of matplotlib.
+Every worker makes the grid of the chip once, and only changes the paths on it for every solution it renders.
+A manifest in the output directory holds a hash of the content of every rendered solution, together with the
+render options. A solution that has not changed since it was rendered is skipped, so rendering a directory again
+only renders the new and changed solutions.
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import glob
+import hashlib
+import json
+import os
+from code.classes.grid import Grid
+from code.visualize import matplotlib_figure, plotly_figure
+
+
+# Grid of the worker process, which is reused for every solution it renders
+worker_grid = None
+
+
+def directory_solutions(directory, netlist, randomized=False):
+    """
+    Returns the csv files of the solutions of a netlist in a directory, as (name, filename, hash) tuples.
+    The hash is computed from the content of the file.
+    """
+
+    add = "random_" if randomized else ""
+    solutions = []
+
+    for filename in sorted(glob.glob(os.path.join(directory, f"{add}paths_netlist_{netlist}_*.csv"))):
+        with open(filename, "rb") as csvfile:
+            digest = hashlib.sha1(csvfile.read()).hexdigest()
+
+        solutions.append((os.path.splitext(os.path.basename(filename))[0], filename, digest))
+
+    return solutions
+
+
+def pool_solutions(pool):
+    """Returns the solutions in a SolutionPool as (name, paths, hash) tuples, cheapest first."""
+
+    solutions = []
+    for costs, identity, paths in pool.solutions:
+        content = json.dumps(sorted((list(key), path) for key, path in paths.items()), separators=(",", ":"))
+        digest = hashlib.sha1(content.encode()).hexdigest()
+        solutions.append((f"solution_C_{costs}_{digest[:8]}", paths, digest))
+
+    return solutions
+
+
+def render_batch(arguments, solutions, directory, formats=("png",), workers=1, legend=False, dpi=80):
+    """
+    Renders solutions of the grid given by arguments (see Grid.arguments) to a directory, in worker processes.
+    Solutions are given as (name, source, hash) tuples, where the source is a csv file or a dictionary of paths.
+    Formats can be png and html. Solutions that have not changed since they were rendered are skipped.
+    Returns the names of the rendered solutions.
+    """
+
+    os.makedirs(directory, exist_ok=True)
+    manifest_file = os.path.join(directory, "manifest.json")
+
+    manifest = {}
+    if os.path.exists(manifest_file):
+        with open(manifest_file) as file:
+            manifest = json.load(file)
+
+    # Skip solutions that were rendered before with the same content and options
+    options = repr((sorted(formats), legend, dpi))
+    jobs = []
+    for name, source, digest in solutions:
+        key = hashlib.sha1(f"{digest}{options}".encode()).hexdigest()
+        if manifest.get(name) == key and all(os.path.exists(os.path.join(directory, f"{name}.{extension}"))
+                                             for extension in formats):
+            continue
+        jobs.append((name, source, key))
+
+    print(f"Rendering {len(jobs)} of {len(solutions)} solutions to {directory}")
+    rendered = []
+
+    # Also a single worker runs in its own process, so the backend of this process is not changed
+    with ProcessPoolExecutor(max_workers=max(1, workers), initializer=start_worker, initargs=(arguments,)) as executor:
+        futures = {executor.submit(render_solution, name, source, directory, formats, legend, dpi): (name, key)
+                   for name, source, key in jobs}
+
+        try:
+            for future in as_completed(futures):
+                name, key = futures[future]
+                try:
+                    future.result()
+                except Exception as error:
+                    print(f"Could not render {name}: {error}")
+                    continue
+
+                manifest[name] = key
+                rendered.append(name)
+
+        finally:
+            with open(manifest_file, "w") as file:
+                json.dump(manifest, file, indent=1, sort_keys=True)
+
+    return rendered
+
+
+def start_worker(arguments):
+    """Makes the grid of a worker process, and switches matplotlib to a backend without windows."""
+
+    global worker_grid
+
+    import matplotlib
+    matplotlib.use("Agg")
+
+    worker_grid = Grid(**arguments)
+
+
+def render_solution(name, source, directory, formats, legend, dpi):
+    """Lays a solution on the grid of the worker process, and renders it to the given formats."""
+
+    grid = worker_grid
+    for net in grid.nets.values():
+        net.path = []
+
+    if isinstance(source, str):
+        grid.infile = source
+        grid.load_configuration()
+    else:
+        for key, path in source.items():
+            grid.nets[key].path = path
+
+    grid.compute_costs()
+
+    if "png" in formats:
+        import matplotlib.pyplot as plt
+
+        figure = matplotlib_figure(grid, legend)
+        figure.axes[0].set_title(f"{name} (C = {grid.cost})")
+        figure.savefig(os.path.join(directory, f"{name}.png"), dpi=dpi, bbox_inches="tight")
+        plt.close(figure)
+
+    if "html" in formats:
+
+        # The plotly library is loaded from the internet when the file is opened, which keeps the files small
+        figure = plotly_figure(grid)
+        figure.update_layout(title=f"{name} (C = {grid.cost})")
+        figure.write_html(os.path.join(directory, f"{name}.html"), include_plotlyjs="cdn")
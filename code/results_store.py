@@ -0,0 +1,109 @@
+"""
+results_store.py
+
+Stores the results of many runs in a single SQLite database, instead of a separate csv file for every run.
+Every run is appended as a single row as soon as it is finished, containing the netlist, the algorithm, the sorting
+method, the seed, the costs and the paths of all nets. The paths are stored as a compressed blob, so a database with
+thousands of runs stays small, and a run can be loaded back into a grid at any time.
+
+The database has an index on netlist and costs, so the best solutions of a netlist can be found quickly,
+for example to be improved by the hillclimber or simulated annealing. An improved solution is stored with the number
+of the solution it improves, and the id of its run if that was taken from the database. Databases made before these
+columns existed get them when they are opened.
+"""
+import json
+import sqlite3
+import time
+import zlib
+
+
+class ResultsStore:
+    def __init__(self, filename="results/results.db"):
+        self.filename = filename
+        self.connection = sqlite3.connect(filename)
+
+        # Write ahead logging makes appending a run cheap, even while the database is being read
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY,
+                netlist INTEGER NOT NULL,
+                randomized INTEGER NOT NULL,
+                algorithm TEXT,
+                sorting TEXT,
+                seed TEXT,
+                run INTEGER,
+                cost INTEGER NOT NULL,
+                created REAL NOT NULL,
+                paths BLOB NOT NULL,
+                solution INTEGER,
+                source INTEGER
+            )""")
+
+        # Add the columns of improved solutions to older databases
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(runs)")}
+        for column in ("solution", "source"):
+            if column not in columns:
+                self.connection.execute(f"ALTER TABLE runs ADD COLUMN {column} INTEGER")
+
+        self.connection.execute("CREATE INDEX IF NOT EXISTS runs_netlist_cost ON runs (netlist, randomized, cost)")
+        self.connection.commit()
+
+    def add_run(self, grid, algorithm=None, sorting=None, seed=None, run=None, solution=None, source=None):
+        """
+        Appends the solution on a grid as a new run, and returns its id. The costs of the grid must be up to date.
+        For an improved solution, solution is the number of the solution that was improved, and source the id of its run
+        if it was taken from the database.
+        """
+
+        cursor = self.connection.execute(
+            "INSERT INTO runs (netlist, randomized, algorithm, sorting, seed, run, cost, created, paths, solution, source) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (grid.netlist, int(grid.randomized), algorithm, sorting, None if seed is None else str(seed), run,
+             grid.cost, time.time(), encode_paths(grid), solution, source))
+        self.connection.commit()
+
+        return cursor.lastrowid
+
+    def best(self, netlist, n=1, randomized=False):
+        """Returns the ids and costs of the n cheapest runs of a netlist, cheapest first."""
+
+        return self.connection.execute(
+            "SELECT id, cost FROM runs WHERE netlist = ? AND randomized = ? ORDER BY cost, id LIMIT ?",
+            (netlist, int(randomized), n)).fetchall()
+
+    def load_paths(self, run_id):
+        """Returns the paths of a run as a dictionary {(start_gate_id, end_gate_id): [x, y, z]}."""
+
+        row = self.connection.execute("SELECT paths FROM runs WHERE id = ?", (run_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"There is no run with id {run_id} in {self.filename}.")
+
+        return decode_paths(row[0])
+
+    def load_into(self, grid, run_id):
+        """Lays the paths of a run on a grid of the same netlist."""
+
+        for key, path in self.load_paths(run_id).items():
+            grid.nets[key].path = path
+
+        grid.update()
+
+    def close(self):
+        """Closes the connection with the database."""
+
+        self.connection.close()
+
+
+def encode_paths(grid):
+    """Turns the paths of all nets of a grid into a compressed blob."""
+
+    paths = [[key[0], key[1], *net.path] for key, net in grid.nets.items()]
+
+    return zlib.compress(json.dumps(paths, separators=(",", ":")).encode())
+
+
+def decode_paths(blob):
+    """Turns a compressed blob back into a dictionary {(start_gate_id, end_gate_id): [x, y, z]}."""
+
+    return {(start, end): [x, y, z] for start, end, x, y, z in json.loads(zlib.decompress(blob))}
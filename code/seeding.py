@@ -0,0 +1,37 @@
+"""
+seeding.py
+
+Creates reproducible and independent random number generators for all algorithms.
+A single seed is turned into a NumPy SeedSequence, which spawns a child sequence for every run.
+Each run gets its own random.Random object made from its child sequence, which is passed to every algorithm
+and sorting function used in that run. Algorithms that need a NumPy Generator derive it from this object,
+so one seed determines the outcome of all runs, while the runs remain statistically independent.
+If no seed is given, a random seed is drawn, which is printed so a run can always be repeated.
+"""
+import random
+import numpy as np
+
+
+def make_seed_sequence(seed=None):
+    """Returns a SeedSequence for the given seed, or for a random seed if none is given."""
+
+    return np.random.SeedSequence(seed)
+
+
+def spawn_rngs(sequence, n):
+    """Spawns n independent random.Random objects from a SeedSequence, one for every run."""
+
+    return [make_rng(child) for child in sequence.spawn(n)]
+
+
+def make_rng(sequence):
+    """Makes a random.Random object from a SeedSequence."""
+
+    state = sequence.generate_state(4, dtype=np.uint64)
+    return random.Random(int.from_bytes(state.tobytes(), "little"))
+
+
+def make_generator(rng):
+    """Derives a NumPy Generator from a random.Random object, for the parts of an algorithm that use NumPy."""
+
+    return np.random.default_rng(rng.getrandbits(128))
@@ -0,0 +1,71 @@
+"""
+solution_pool.py
+
+Keeps the best solutions found by the constructive algorithms in memory, so they can be improved right away
+by the iterative algorithms, without writing them to a csv file and reading them back in.
+
+The pool holds at most a given number of solutions, cheapest first. Different runs often find exactly the same
+solution, for example A* with a fixed order of the nets, so every solution is identified by a hash of the set
+of paths of its nets. A solution that is already in the pool is not added again, so the iterative algorithms
+always start from distinct solutions.
+"""
+import bisect
+
+
+class SolutionPool:
+    def __init__(self, capacity=10):
+        self.capacity = capacity
+
+        # Solutions as (costs, identity, paths) tuples, cheapest first, and their costs to search in
+        self.solutions = []
+        self.costs = []
+        self.identities = set()
+
+    def __len__(self):
+        return len(self.solutions)
+
+    def add(self, grid):
+        """
+        Adds the solution on a grid to the pool, if it is cheap enough and not in the pool yet.
+        The costs of the grid must be up to date. Returns True if the solution was added.
+        """
+
+        identity = path_set_hash(grid)
+        if identity in self.identities:
+            return False
+
+        # Only keep the cheapest solutions
+        if len(self.solutions) >= self.capacity and grid.cost >= self.solutions[-1][0]:
+            return False
+
+        # Paths are never changed in place, only replaced, so they can be shared with the grid
+        paths = {key: net.path for key, net in grid.nets.items()}
+        position = bisect.bisect_right(self.costs, grid.cost)
+        self.solutions.insert(position, (grid.cost, identity, paths))
+        self.costs.insert(position, grid.cost)
+        self.identities.add(identity)
+
+        if len(self.solutions) > self.capacity:
+            self.identities.remove(self.solutions.pop()[1])
+            self.costs.pop()
+
+        return True
+
+    def best(self, n=1):
+        """Returns the costs of the n cheapest solutions in the pool, cheapest first."""
+
+        return [solution[0] for solution in self.solutions[:n]]
+
+    def load_into(self, grid, index=0):
+        """Lays the paths of a solution on a grid of the same netlist, where index 0 is the cheapest solution."""
+
+        for key, path in self.solutions[index][2].items():
+            grid.nets[key].path = path
+
+        grid.update()
+
+
+def path_set_hash(grid):
+    """Returns a hash of the set of paths of all nets of a grid, which identifies a solution."""
+
+    return hash(frozenset((key, tuple(map(tuple, net.path))) for key, net in grid.nets.items()))
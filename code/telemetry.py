@@ -0,0 +1,160 @@
+"""
+telemetry.py
+
+Reports the progress of long runs as a stream of events, instead of printing a line for every iteration.
+Every event is written as a single line of JSON to a file, with a timestamp, the number of seconds since the start
+of the run, the kind of event and its values, for example:
+
+    {"time": 1700000000.1, "elapsed": 12.5, "event": "progress", "algorithm": "hillclimber", "cost": 812, ...}
+
+Such a file can be followed while the run is going on, and read by other tools to monitor many runs at once or to
+plot the convergence of an algorithm, without parsing any text.
+
+The algorithms may emit an event as often as they like, since events of the same kind are dropped if the previous
+one was written less than a given interval ago. Events that must never be dropped, such as the end of a run, are
+forced. If an event has a number of moves, the number of moves per second since the previous event of the same
+kind is added. Events are written by a separate thread, so the algorithms never wait for the file.
+
+Worker processes that are forked while a channel is open, such as those of the parallel A* algorithm, do not have
+this thread, since threads do not survive a fork. A forked process opens the file again and writes its own events
+directly, with the id of the process added, so they are not lost in a queue that is never written. Worker processes
+that are started instead of forked import this module again, and their events are not written.
+
+In quiet mode, the progress messages of the algorithms are not printed, only their results.
+The algorithms use the module functions emit and say, which use the channel set by configure.
+"""
+import json
+import math
+import os
+import queue
+import threading
+import time
+
+
+class Telemetry:
+    def __init__(self, filename=None, interval=1.0, quiet=False):
+        self.filename = filename
+        self.interval = interval
+        self.quiet = quiet
+        self.start = time.time()
+        self.pid = os.getpid()
+
+        # Time, and number of moves, of the last written event of every kind
+        self.last = {}
+        self.moves = {}
+
+        self.file = None
+        self.thread = None
+        if filename:
+            self.file = open(filename, "a")
+            self.queue = queue.SimpleQueue()
+            self.thread = threading.Thread(target=self.write, daemon=True)
+            self.thread.start()
+
+    def emit(self, event, force=False, **values):
+        """Writes an event with the given values, unless an event of the same kind was written too recently."""
+
+        if not self.file:
+            return
+
+        now = time.time()
+        if not force and now - self.last.get(event, -math.inf) < self.interval:
+            return
+
+        record = {"time": now, "elapsed": round(now - self.start, 3), "event": event, **values}
+
+        # Number of moves per second since the previous event of the same kind
+        if "moves" in values:
+            previous_time, previous_moves = self.moves.get(event, (self.start, 0))
+            if now > previous_time:
+                record["moves_per_second"] = round((values["moves"] - previous_moves) / (now - previous_time), 1)
+            self.moves[event] = (now, values["moves"])
+
+        self.last[event] = now
+
+        # A forked process writes its events itself, see after_fork
+        if self.thread:
+            self.queue.put(record)
+        else:
+            record["pid"] = self.pid
+            self.file.write(json.dumps(record) + "\n")
+
+    def say(self, text):
+        """Prints a progress message, unless in quiet mode."""
+
+        if not self.quiet:
+            print(text)
+
+    def write(self):
+        """Writes the events in the queue to the file, until the channel is closed."""
+
+        while True:
+            record = self.queue.get()
+            if record is None:
+                break
+
+            self.file.write(json.dumps(record) + "\n")
+
+            # Flush once the queue is empty, so the file can be followed
+            if self.queue.empty():
+                self.file.flush()
+
+    def after_fork(self):
+        """Opens the file again in a forked process, which writes every event directly, since it has no writer thread."""
+
+        if not self.file or self.pid == os.getpid():
+            return
+
+        # The file of the parent process is kept, but never written or closed, so the events in its buffer, which the
+        # parent process writes itself, are not written twice
+        self.inherited = self.file
+        self.file = open(self.filename, "a", buffering=1)
+        self.thread = None
+        self.queue = None
+        self.pid = os.getpid()
+
+    def close(self):
+        """Writes the remaining events and closes the file."""
+
+        if self.thread:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+        if self.file:
+            self.file.close()
+            self.file = None
+
+
+# Channel the algorithms report to, which only prints until it is configured
+channel = Telemetry()
+
+
+def configure(filename=None, interval=1.0, quiet=False):
+    """Replaces the channel the algorithms report to, and returns it."""
+
+    global channel
+
+    channel.close()
+    channel = Telemetry(filename, interval, quiet)
+    return channel
+
+
+def after_fork():
+    """Lets the current channel write the events of a forked process, see Telemetry.after_fork."""
+
+    channel.after_fork()
+
+
+os.register_at_fork(after_in_child=after_fork)
+
+
+def emit(event, force=False, **values):
+    """Writes an event to the current channel, see Telemetry.emit."""
+
+    channel.emit(event, force, **values)
+
+
+def say(text):
+    """Prints a progress message, unless the current channel is in quiet mode."""
+
+    channel.say(text)
@@ -1,57 +1,61 @@
-import matplotlib.pyplot as plt
+"""
+visualize.py
+
+Makes 3D visualizations of a chip with matplotlib or plotly. These libraries take long to import, so they are
+only imported by the function that uses them, and not when this module is imported.
+"""
 import re
-import plotly.graph_objects as go
-import pandas as pd
 
 
-def visualize_plotly(chip):
+def visualize_plotly(chip, max_traces=100):
     """
     Makes a 3D visualization of the chip object instance in plotly.
     The visualization opens in your browser.
     It is possible to select paths you want to see by double clicking the legend.
     """
 
-    # Make df out of gates to plot
-    df_gates = pd.DataFrame(index=['x', 'y', 'z'])
+    plotly_figure(chip, max_traces).show()
 
-    for keys, values in chip.gates.items():
-        df_gates[keys] = values.coordinates[0], values.coordinates[1], values.coordinates[2]
 
-    df_gates = df_gates.transpose()
+def plotly_figure(chip, max_traces=100):
+    """
+    Makes a plotly figure of the gates and paths of the chip object instance.
+    Every net gets its own trace, so it can be selected in the legend. Drawing many traces is slow in the browser,
+    so if there are more than max_traces nets, all paths are drawn as a single trace, coloured by net,
+    with gaps between the paths.
+    """
 
-    # Create a df for every path in the netlist and store it in a dict
-    path_df_dict = {}
+    import numpy as np
+    import plotly.graph_objects as go
 
-    for keys in chip.nets.keys():
-        path_df_dict[keys] = pd.DataFrame(columns=['x', 'y', 'z'])
+    # Gate coordinates as columns
+    gates = np.array([gate.coordinates for gate in chip.gates.values()]).reshape(-1, 3).T
+    traces = [go.Scatter3d(x=gates[0], y=gates[1], z=gates[2], mode='markers', showlegend=False)]
 
-    for keys, values in chip.nets.items():
-        df = path_df_dict[keys]
-        for i in range(len(values.path[0])):
-            df.loc[i] = [values.path[0][i], values.path[1][i], values.path[2][i]]
+    nets = [(key, net.path) for key, net in chip.nets.items() if net.path]
+
+    if len(nets) <= max_traces:
+        for key, path in nets:
+            traces.append(go.Scatter3d(x=path[0], y=path[1], z=path[2], name=str(key), mode='lines',
+                                       line=dict(width=5)))
+    else:
 
-    # Plot gates and paths and show it in users browser
-    fig = go.Figure()
+        # Paths are separated by a NaN, which plotly draws as a gap
+        lengths = np.array([len(path[0]) + 1 for key, path in nets])
+        coordinates = np.full((3, lengths.sum()), np.nan)
+        ends = np.cumsum(lengths)
+        for (key, path), end, length in zip(nets, ends, lengths):
+            coordinates[:, end - length:end - 1] = path
 
-    fig = go.Figure(data=[go.Scatter3d(
-        x=df_gates['x'],
-        y=df_gates['y'],
-        z=df_gates['z'],
-        mode='markers',
-        showlegend=False
-        )])
+        traces.append(go.Scatter3d(x=coordinates[0], y=coordinates[1], z=coordinates[2], mode='lines',
+                                   line=dict(width=5, color=np.repeat(np.arange(len(nets)), lengths),
+                                             colorscale='Turbo'),
+                                   connectgaps=False, showlegend=False))
 
-    for i in path_df_dict:
-        label = str(i)
-        fig = fig.add_trace(go.Scatter3d(x=path_df_dict[i]["x"],
-                                         y=path_df_dict[i]["y"],
-                                         z=path_df_dict[i]['z'],
-                                         name=label,
-                                         mode='lines'))
-        fig.update_traces(line=dict(width=5))
+    fig = go.Figure(data=traces)
+    fig.update_layout(scene=dict(zaxis=dict(nticks=chip.size[2], range=[-1, chip.size[2]])))
 
-    fig.update_layout(scene=dict(zaxis=dict(nticks=7, range=[-1, 7])))
-    fig.show()
+    return fig
 
 
 def visualize_matplotlib(chip, legend):
@@ -61,18 +65,41 @@ def visualize_matplotlib(chip, legend):
     results directory under figures_and_plots.
     """
 
+    import matplotlib.pyplot as plt
+
+    matplotlib_figure(chip, legend)
+
+    # Filter inputfilename
+    pattern = "_(.*?).csv"
+    substring = re.search(pattern, chip.infile)
+
+    # If regex could filter the filename correctly use, else use inputfilename
+    if substring:
+        substring = substring.group(1)
+        plt.savefig(f"results/figures_and_plots/fig_{substring}.png", bbox_inches="tight")
+    else:
+        plt.savefig(f"results/figures_and_plots/fig_{chip.infile}.png")
+
+    plt.show()
+
+
+def matplotlib_figure(chip, legend=False):
+    """Makes a matplotlib figure of the gates and paths of the chip object instance, and returns it."""
+
+    import matplotlib.pyplot as plt
+
     # Get maximum x,y values for x,y axis size
     max_x = chip.size[0]
     max_y = chip.size[1]
 
-    plt.figure()
-    ax = plt.axes(projection="3d")
+    figure = plt.figure()
+    ax = figure.add_subplot(projection="3d")
 
     ax.set_title("3D Visual Chips&Circuits")
 
     # Get all gate coordinates and make them visible in plot
-    for gate in chip.gates.values():
-        ax.scatter3D(gate.coordinates[0], gate.coordinates[1], gate.coordinates[2], c="black")
+    gates = [gate.coordinates for gate in chip.gates.values()]
+    ax.scatter3D(*zip(*gates), c="black")
 
     # Plot all net routes solutions of the chip object instance
     for net in chip.nets.values():
@@ -85,21 +112,10 @@ def visualize_matplotlib(chip, legend):
 
     ax.set_xlim(0, max_x)
     ax.set_ylim(0, max_y)
-    ax.set_zlim(0, 7)
+    ax.set_zlim(0, chip.size[2])
 
     # If user wants a legend, show it correctly
     if legend is True:
         ax.legend(chip.nets.keys(), title='Nets', prop={'size': 7}, bbox_to_anchor=(1.1, 1), ncol=3, loc='upper left')
 
-    # Filter inputfilename
-    pattern = "_(.*?).csv"
-    substring = re.search(pattern, chip.infile)
-
-    # If regex could filter the filename correctly use, else use inputfilename
-    if substring:
-        substring = substring.group(1)
-        plt.savefig(f"results/figures_and_plots/fig_{substring}.png", bbox_inches="tight")
-    else:
-        plt.savefig(f"results/figures_and_plots/fig_{chip.infile}.png")
-
-    plt.show()
+    return figure
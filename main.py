@@ -16,32 +16,49 @@ Our structure of solving this problem is as follows:
     - Find a base solution that is as close to the global optimum as possible
     - Improve that base solution by use of an itterative algorithm in order to obtain the global/local optimum
 
-Findings: the best results were obtained by using sorting by length ascending, using A* as base algortihm and optimizing with a hillclimber.
+Findings: the best results were obtained by using sorting by length ascending, using A* as base algortihm and optimizing
+with a hillclimber.
 
-Usage: python3 main.py netlistnummer (-h) (-c naam algoritme) (-i naam algoritme) (-vis) (-leg) (-plotly) (-iter N) (-n N) (-m N verbeteringen) (-file bestandsnaam) (-pop indexnummer) (-gs lagen) (-random netlistnummer)
+Usage: python3 main.py netlistnummer (-h) (-c naam algoritme) (-i naam algoritme) (-vis) (-leg) (-plotly) (-iter N)
+       (-n N) (-m N verbeteringen) (-file bestandsnaam) (-pop indexnummer) (-gs lagen) (-random netlistnummer)
+       (-time seconden) (-batch N) (-seed N) (-layers N) (-margin N) (-dims X Y) (-workers N) (-prune) (-tie pop/goal)
+       (-heuristic manhattan/field) (-rounds N) (-search_pop N N) (-search_gs N N) (-gap fractie) (-db bestandsnaam)
+       (-population N) (-group N) (-slack) (-render) (-formats png/html) (-telemetry bestandsnaam) (-interval seconden)
+       (-quiet) (-kernel flat/states)
 
 Powered by Chiptuners
 """
 
-from copy import deepcopy
 import csv
 import code.classes.grid as grid
+from code.classes import loader
 from code.algorithms import baseline as base
 from code.algorithms import hillclimber as climber
 from code.algorithms import A_star as star
-from code.visualize import *
+from code.algorithms import order_search as order
 from code.algorithms import simulated_annealing as sim
-from code.algorithms.sorting import *
+from code.algorithms import genetic as gen
+from code.algorithms import lns
+from code.algorithms.sorting import random_sort, sort_length, sort_middle_first, sort_gate, sort_exp_intersections
+from code.algorithms.sorting import sort_field_length
+from code.seeding import make_seed_sequence, spawn_rngs
+from code.results_store import ResultsStore
+from code.solution_pool import SolutionPool
+from code import telemetry
 import argparse
+import os
 import sys
 
 
-def log_simulation(N, netlist, constructive_algorithm, sorting_method, randomized, pop, gate_space, output):
+def log_simulation(N, netlist, constructive_algorithm, sorting_method, randomized, pop, gate_space, output, time_limit=None,
+                   batch_size=None, seed_sequence=None, grid_options=None, workers=1, prune=False, tie_break="pop",
+                   heuristic="manhattan", search_options=None, store=None, pool=None, kernel="flat", gap=None):
     """
     Takes the amount of runs, netlist number, type of algorithm and sorting algorithm as input.
     Runs the given algorithm a number of times, creating a set of solutions. Set N to 1 if a single solution suffices.
     Saves the results in a CSV file, where each row represents the results of a single run,
-    and each columns stores the costs. The algorithms to choose from are baseline and A*. A* can be combined
+    and each columns stores the costs. The algorithms to choose from are baseline, A* and the order search,
+    which tries many orders and parameters for A* at once, set by search_options. A* can be combined
     with one of the following sorting algorithms:
     - Random
     - Decreasing path length
@@ -52,11 +69,19 @@ def log_simulation(N, netlist, constructive_algorithm, sorting_method, randomize
     - Number of connections gate ascending
     - Increading estimated number of intersections
     - Decreasing estimated number of intersections
-    See baseline.py, a_star.py and sorting.py for further explanation of the algorithms.
+    - Increasing or decreasing length of the shortest free path
+    See baseline.py, a_star.py, order_search.py and sorting.py for further explanation of the algorithms.
+    Every run gets its own random number generator, spawned from the given seed sequence.
+    The dimensions of the grid can be set with grid_options, see Grid for the possible options.
+    If a ResultsStore is given, the paths of every run are appended to its database instead of written to a csv file.
+    If a SolutionPool is given, every solution is offered to it as well.
+    The kernel sets which search A* uses, see a_star.py.
+    The lower bound and the gap are only printed after every run if a gap is given, since the bound takes a linear program.
     """
 
     # Calculate chip number from netlist number
-    chip_nr = int((netlist - 1) / 3)
+    chip_nr = loader.chip_of(netlist)
+    grid_options = grid_options or {}
 
     if randomized:
         add = "random_"
@@ -73,48 +98,81 @@ def log_simulation(N, netlist, constructive_algorithm, sorting_method, randomize
         writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
         writer.writeheader()
         costs = []
+        rngs = spawn_rngs(seed_sequence or make_seed_sequence(), N)
 
         # Run N simulations and log each run in a new row
         for n in range(1, N + 1):
+            rng = rngs[n - 1]
 
             # Make grid
-            chip = grid.Grid(chip_nr, netlist, randomized=randomized)
+            chip = grid.Grid(chip_nr, netlist, randomized=randomized, **grid_options)
 
             # Run desired algorithm
             if constructive_algorithm == "baseline":
-                baseline = base.Baseline(chip, sorting_method)
-                baseline.run()
+                baseline = base.Baseline(chip, sorting_method, time_limit=time_limit, batch_size=batch_size, rng=rng)
+                solved = baseline.run()
+                print(f"Baseline statistics: {baseline.statistics}")
+                if not solved:
+                    print(f"Netlist {netlist} cannot be solved using the baseline within the given number of attempts and "
+                          "time limit.")
+                    return
             elif constructive_algorithm == "a_star":
-                solver = star.A_Star(chip, sorting_method, pop, gate_space, display=True)
+                solver = star.A_Star(chip, sorting_method, pop, gate_space, display=True, rng=rng, workers=workers,
+                                     prune=prune, tie_break=tie_break, heuristic=heuristic, kernel=kernel)
                 if not solver.run():
-                    print(f"Netlist {netlist} cannot be solved using A* with the current combination of sorting algorithm, gate_space and pop.")
+                    print(f"Netlist {netlist} cannot be solved using A* with the current combination of sorting algorithm, "
+                          "gate_space and pop.")
+                    return
+            elif constructive_algorithm == "order_search":
+                search = order.OrderSearch(chip, rng=rng, workers=workers, prune=prune, tie_break=tie_break,
+                                           heuristic=heuristic, **(search_options or {}))
+                if not search.run():
+                    print(f"Netlist {netlist} cannot be solved using A* with any of the orders and parameters that were "
+                          "tried.")
                     return
+                search.to_csv(name=n)
+                print(f"Order search statistics: {search.statistics}")
+                print(f"Best parameters: pop = {search.best_parameters[0]}, gate space = {search.best_parameters[1]}")
 
             # Compute costs of the grid
             chip.compute_costs()
 
-            # Save path data to csv
-            if output:
+            # Save path data to the database or to csv
+            if store:
+                store.add_run(chip, constructive_algorithm, sorting_method[0].__name__,
+                              seed_sequence.entropy if seed_sequence else None, n)
+            elif output:
                 chip.to_output()
             else:
                 chip.to_csv(name=n)
 
+            if pool is not None:
+                pool.add(chip)
+
             # Save row in CSV
             costs.append(chip.cost)
             writer.writerow({
-                    "simulation": n, "cost": chip.cost
-                    })
+                "simulation": n, "cost": chip.cost
+            })
 
-            print(f"Completed run {n}: C = {chip.cost}")
+            if gap is not None:
+                chip.compute_lower_bound()
+                print(f"Completed run {n}: C = {chip.cost}, lower bound = {chip.lower_bound} (gap {chip.gap():.1%})")
+            else:
+                print(f"Completed run {n}: C = {chip.cost}")
+            telemetry.emit("run", force=True, algorithm=constructive_algorithm, run=n, cost=chip.cost,
+                           lower_bound=chip.lower_bound)
 
         # Make row with average results
-        average_costs = sum(costs)/N
+        average_costs = sum(costs) / N
         writer.writerow({
             "simulation": "Avg costs", "cost": average_costs
         })
 
 
-def improve(netlist, specific_file, algorithm, update_csv_paths, make_csv_improvements, make_iterative_plot, iterations, N, N_improvements, sorting_method, randomized, output):
+def improve(netlist, specific_file, algorithm, update_csv_paths, make_csv_improvements, make_iterative_plot, iterations, N,
+            N_improvements, sorting_method, randomized, output, batch_size=None, seed_sequence=None, grid_options=None,
+            gap=None, store=None, pool=None, genetic_options=None, lns_options=None, slack=False, results=None):
     """
     Loads N previously generated solutions, and tries to make improvements during a given number of iterations.
     There is also the option to start over after the algorithm is finished, since the algorithm could
@@ -122,8 +180,9 @@ def improve(netlist, specific_file, algorithm, update_csv_paths, make_csv_improv
     If update_csv_paths is set to True, every new solution will be saved into a CSV file.
     If make_csv_improvements is set to True, a CSV file will be created for all runs, storing the costs
     against the iteration so the development of the costs over time can be investigated.
-    The algorithms to choose from are Hillclimber and Simulated Annealing,
-    which both can use one of the following sorting algorithms:
+    The algorithms to choose from are Hillclimber, Simulated Annealing, a genetic algorithm, which
+    is set by genetic_options, and a large neighbourhood search, which is set by lns_options. Hillclimber and Simulated
+    Annealing both can use one of the following sorting algorithms:
     - Random
     - Decreasing path length
     - Increading path length
@@ -133,18 +192,42 @@ def improve(netlist, specific_file, algorithm, update_csv_paths, make_csv_improv
     - Number of connections gate ascending
     - Increading estimated number of intersections
     - Decreasing estimated number of intersections
-    For further explanation of the algorithms, see simulated_annealing.py, hillclimber.py and sorting.py.
+    - Increasing or decreasing length of the shortest free path
+    For further explanation of the algorithms, see simulated_annealing.py, hillclimber.py, genetic.py, lns.py and sorting.py.
+    Every run gets its own random number generator, spawned from the given seed sequence.
+    The dimensions of the grid can be set with grid_options, see Grid for the possible options.
+    If a gap is given, the algorithms stop once the costs are within that fraction of the lower bound.
+    If slack is set, Hillclimber and Simulated Annealing visit the nets with the most slack first, instead of sorting them.
+    If a ResultsStore is given, the N cheapest solutions in its database are improved instead of the csv files,
+    and every improved solution is appended to the database.
+    If a SolutionPool is given, the N cheapest solutions in the pool are improved instead, without reading any files.
+    If a SolutionPool is given as results, every improved solution is added to it, for example to be rendered.
     Returns a list of costs.
     """
 
+    grid_options = grid_options or {}
+
     if randomized:
         add = "random_"
     else:
         add = ""
 
-    for i in range(1, N+1):
+    rngs = spawn_rngs(seed_sequence or make_seed_sequence(), N * N_improvements)
+
+    # Find the cheapest solutions in the pool or in the database
+    if pool is not None:
+        N = min(N, len(pool))
+        print(f"Improving {N} solutions from the pool with costs {pool.best(N)}")
+    elif store:
+        runs = store.best(netlist, N, randomized)
+        if len(runs) < N:
+            print(f"Error message: the database contains only {len(runs)} solutions of netlist {netlist}.")
+            return
+
+    for i in range(1, N + 1):
 
         for j in range(1, N_improvements + 1):
+            rng = rngs[(i - 1) * N_improvements + j - 1]
 
             # Open specific set of paths if desired
             add_string = ""
@@ -159,14 +242,23 @@ def improve(netlist, specific_file, algorithm, update_csv_paths, make_csv_improv
 
             # Open file
             inputfile = f"results/{add}paths_netlist_{netlist}{add_string}.csv"
-            chip_nr = int((netlist - 1) / 3)
+            chip_nr = loader.chip_of(netlist)
 
             # Load paths into grid
-            chip = grid.Grid(chip_nr, netlist, infile=inputfile, randomized=randomized)
+            if pool is not None:
+                chip = grid.Grid(chip_nr, netlist, randomized=randomized, **grid_options)
+                pool.load_into(chip, i - 1)
+            elif store:
+                chip = grid.Grid(chip_nr, netlist, randomized=randomized, **grid_options)
+                store.load_into(chip, runs[i - 1][0])
+            else:
+                chip = grid.Grid(chip_nr, netlist, infile=inputfile, randomized=randomized, **grid_options)
 
             # Run hillclimber algorithm with a number of iterations
             if algorithm == "hillclimber":
-                hillclimber = climber.Hillclimber(chip, iterations, update_csv_paths, make_csv_improvements, make_iterative_plot, i, j, sorting_method, output)
+                hillclimber = climber.Hillclimber(chip, iterations, update_csv_paths, make_csv_improvements,
+                                                  make_iterative_plot, i, j, sorting_method, output, batch_size, rng, gap,
+                                                  slack)
                 hillclimber.run()
 
             elif algorithm == "simulated_annealing":
@@ -174,14 +266,38 @@ def improve(netlist, specific_file, algorithm, update_csv_paths, make_csv_improv
                 chip.compute_costs()
 
                 temperature = 10000
-                start_cost = deepcopy(chip.cost)
-                simanneal = sim.SimulatedAnnealing(chip, iterations, update_csv_paths, make_csv_improvements, make_iterative_plot, i, j, temperature, sorting_method, output)
+                start_cost = chip.cost
+                simanneal = sim.SimulatedAnnealing(chip, iterations, update_csv_paths, make_csv_improvements,
+                                                   make_iterative_plot, i, j, temperature, sorting_method, output,
+                                                   batch_size, rng, gap, slack)
 
                 simanneal.run()
                 print(f"{start_cost}")
 
+            elif algorithm == "genetic":
+                genetic = gen.Genetic(chip, iterations, update_csv_paths, output, rng=rng, gap=gap,
+                                      **(genetic_options or {}))
+                genetic.run()
+
+            elif algorithm == "lns":
+                search = lns.LargeNeighbourhoodSearch(chip, iterations, update_csv_paths, output, rng=rng, gap=gap,
+                                                      **(lns_options or {}))
+                search.run()
+
+            # Keep the improved solution, and append it to the database
+            chip.compute_costs()
+            if results is not None:
+                results.add(chip)
 
-def visualize_three_dimensional(netlist, specific_file, legend, randomized, matplotlib, plotly):
+            if store:
+
+                # Only the hillclimber and simulated annealing sort the nets
+                sorting = sorting_method[0].__name__ if algorithm in ("hillclimber", "simulated_annealing") else None
+                source = runs[i - 1][0] if pool is None else None
+                store.add_run(chip, algorithm, sorting, seed_sequence.entropy if seed_sequence else None, j, i, source)
+
+
+def visualize_three_dimensional(netlist, specific_file, legend, randomized, matplotlib, plotly, grid_options=None):
     """
     Takes a csv file containing previously generates paths of a given netlist,
     and create a 3-dimensional plot to visualize them.
@@ -194,12 +310,14 @@ def visualize_three_dimensional(netlist, specific_file, legend, randomized, matp
 
     # Open file
     inputfile = f"results/{add}paths_netlist_{netlist}_{specific_file}.csv"
-    chip_nr = int((netlist - 1) / 3)
+    chip_nr = loader.chip_of(netlist)
 
     # Load paths into grid
-    chip = grid.Grid(chip_nr, netlist, inputfile, randomized)
+    chip = grid.Grid(chip_nr, netlist, inputfile, randomized, **(grid_options or {}))
+
+    # Make visualization, the plotting libraries are only imported when they are needed
+    from code.visualize import visualize_matplotlib, visualize_plotly
 
-    # Make visualization
     if matplotlib is True:
         visualize_matplotlib(chip, legend)
 
@@ -207,45 +325,78 @@ def visualize_three_dimensional(netlist, specific_file, legend, randomized, matp
         visualize_plotly(chip)
 
 
+def render(netlist, randomized, formats, workers=1, legend=False, grid_options=None, pool=None):
+    """
+    Renders all solutions of a netlist in the results directory, or the solutions in the pool if one is given
+    (the improved solutions of this run, see improve),
+    to png and/or html files in results/figures_and_plots/renders, without opening any windows.
+    Solutions that have not changed since they were rendered before are skipped, see render.py.
+    """
+
+    from code import render as renderer
+
+    if randomized:
+        add = "random_"
+    else:
+        add = ""
+
+    chip = grid.Grid(loader.chip_of(netlist), netlist, randomized=randomized, **(grid_options or {}))
+
+    if pool is not None:
+        solutions = renderer.pool_solutions(pool)
+    else:
+        solutions = renderer.directory_solutions("results", netlist, randomized)
+
+    renderer.render_batch(chip.arguments(), solutions, f"results/figures_and_plots/renders/{add}netlist_{netlist}", formats,
+                          workers, legend)
+
+
 if __name__ == "__main__":
 
     # Make it possible to accept closely related arguments with dictionaries
     # Calls sorting function based on args given
     function_map = {
-        'random': [random_sort, None], "r": [random_sort, None], "rand": [random_sort, None], 
-	 "willekeurig": [random_sort, None],
+        'random': [random_sort, None], "r": [random_sort, None], "rand": [random_sort, None],
+        "willekeurig": [random_sort, None],
 
-        'length_d': [sort_length, True], 'length d': [sort_length, True], 'd length': [sort_length, True], 
-	 'length descending': [sort_length, True], 'descending length': [sort_length, True], 
+        'length_d': [sort_length, True], 'length d': [sort_length, True], 'd length': [sort_length, True],
+        'length descending': [sort_length, True], 'descending length': [sort_length, True],
         'length_descending': [sort_length, True], "descending_length": [sort_length, True],
 
-        'length_a': [sort_length, False], 'length a': [sort_length, False], 'a length': [sort_length, False], 
-	'length ascending': [sort_length, False], 'ascending length': [sort_length, False], 
-        'length_ascending': [sort_length, False], "ascending_length": [sort_length, False], 
-	 "length": [sort_length, False],
+        'length_a': [sort_length, False], 'length a': [sort_length, False], 'a length': [sort_length, False],
+        'length ascending': [sort_length, False], 'ascending length': [sort_length, False],
+        'length_ascending': [sort_length, False], "ascending_length": [sort_length, False],
+        "length": [sort_length, False],
 
         'middle': [sort_middle_first, False], 'outside': [sort_middle_first, True],
 
-        'gate_d': [sort_gate, True], 'gates_d': [sort_gate, True], 'gates d': [sort_gate, True], 
-	'gate d': [sort_gate, True], 'd_gate': [sort_gate, True], 'd gate': [sort_gate, True], 
-	'gate_descending': [sort_gate, True], 'descending_gate': [sort_gate, True], 
-	'gate descending': [sort_gate, True], 'descending gate': [sort_gate, True],
+        'gate_d': [sort_gate, True], 'gates_d': [sort_gate, True], 'gates d': [sort_gate, True],
+        'gate d': [sort_gate, True], 'd_gate': [sort_gate, True], 'd gate': [sort_gate, True],
+        'gate_descending': [sort_gate, True], 'descending_gate': [sort_gate, True],
+        'gate descending': [sort_gate, True], 'descending gate': [sort_gate, True],
 
-        'gate_a': [sort_gate, False], 'gates_a': [sort_gate, False], 'gates a': [sort_gate, False], 
-	'gate': [sort_gate, False], 'gate a': [sort_gate, False], 'a_gate': [sort_gate, False], 
-	'a gate': [sort_gate, False], 'gate_ascending': [sort_gate, False], 'ascending_gate': [sort_gate, False],
+        'gate_a': [sort_gate, False], 'gates_a': [sort_gate, False], 'gates a': [sort_gate, False],
+        'gate': [sort_gate, False], 'gate a': [sort_gate, False], 'a_gate': [sort_gate, False],
+        'a gate': [sort_gate, False], 'gate_ascending': [sort_gate, False], 'ascending_gate': [sort_gate, False],
         'ascending gate': [sort_gate, False], 'gate ascending': [sort_gate, False], 'gates': [sort_gate, False],
 
-        'intersections_d': [sort_exp_intersections, True], 'intersections d': [sort_exp_intersections, True], 																	
-	'd intersections': [sort_exp_intersections, True], 'd_intersections': [sort_exp_intersections, True], 												
-	'intersection_d': [sort_exp_intersections, True], 'intersections_descending': [sort_exp_intersections, True], 
-	'descending_intersections': [sort_exp_intersections, True],  'intersection d': [sort_exp_intersections, True],
+        'intersections_d': [sort_exp_intersections, True], 'intersections d': [sort_exp_intersections, True],
+        'd intersections': [sort_exp_intersections, True], 'd_intersections': [sort_exp_intersections, True],
+        'intersection_d': [sort_exp_intersections, True], 'intersections_descending': [sort_exp_intersections, True],
+        'descending_intersections': [sort_exp_intersections, True], 'intersection d': [sort_exp_intersections, True],
+
+        'intersections_a': [sort_exp_intersections, False], 'intersections a': [sort_exp_intersections, False],
+        'a intersections': [sort_exp_intersections, False], 'a_intersections': [sort_exp_intersections, False],
+        'intersections_ascending': [sort_exp_intersections, False],
+        'ascending_intersections': [sort_exp_intersections, False],
+        'intersections': [sort_exp_intersections, False], 'intersection': [sort_exp_intersections, False],
+        'intersection a': [sort_exp_intersections, False], 'intersection_a': [sort_exp_intersections, False],
+
+        'field_a': [sort_field_length, False], 'field a': [sort_field_length, False], 'field': [sort_field_length, False],
+        'field_ascending': [sort_field_length, False], 'field ascending': [sort_field_length, False],
 
-        'intersections_a': [sort_exp_intersections, False], 'intersections a': [sort_exp_intersections, False], 
-	'a intersections': [sort_exp_intersections, False], 'a_intersections': [sort_exp_intersections, False], 
-	'intersections_ascending': [sort_exp_intersections, False], 'ascending_intersections': [sort_exp_intersections, False],
-        'intersections': [sort_exp_intersections, False], 'intersection': [sort_exp_intersections, False], 
-	'intersection a': [sort_exp_intersections, False], 'intersection_a': [sort_exp_intersections, False]
+        'field_d': [sort_field_length, True], 'field d': [sort_field_length, True],
+        'field_descending': [sort_field_length, True], 'field descending': [sort_field_length, True]
     }
 
     possible_entries = {
@@ -253,34 +404,116 @@ if __name__ == "__main__":
 
         "a": "a_star", "star": "a_star", "a star": "a_star", "a*": "a_star", "a-star": "a_star", "a_star": "a_star",
 
-        "h": "hillclimber", "hill": "hillclimber", "hillc": "hillclimber", "hillclimb": "hillclimber", "climber": "hillclimber", "climb": "hillclimber", "hc": "hillclimber",
-        "hillclimber": "hillclimber",
+        "o": "order_search", "order": "order_search", "search": "order_search", "order search": "order_search",
+        "order_search": "order_search",
 
-        "sa": "simulated_annealing", "s": "simulated_annealing", "sim": "simulated_annealing", "sim_a": "simulated_annealing", "sim a": "simulated_annealing",
-        "sima": "simulated_annealing", "simulated_annealing": "simulated_annealing",
+        "h": "hillclimber", "hill": "hillclimber", "hillc": "hillclimber", "hillclimb": "hillclimber",
+        "climber": "hillclimber", "climb": "hillclimber", "hc": "hillclimber", "hillclimber": "hillclimber",
+
+        "sa": "simulated_annealing", "s": "simulated_annealing", "sim": "simulated_annealing",
+        "sim_a": "simulated_annealing", "sim a": "simulated_annealing", "sima": "simulated_annealing",
+        "simulated_annealing": "simulated_annealing",
+
+        "l": "lns", "lns": "lns", "large neighbourhood search": "lns", "neighbourhood": "lns",
+
+        "g": "genetic", "ga": "genetic", "gen": "genetic", "genetic": "genetic", "genetic algorithm": "genetic",
     }
 
-    parser = argparse.ArgumentParser(description='Find the most efficient solution for a network of points to be connected without collisions')
+    parser = argparse.ArgumentParser(description='Find the most efficient solution for a network of points to be connected '
+                                                 'without collisions')
     parser.add_argument("netlist", type=int, help="Netlist to be solved")
 
-    parser.add_argument("-c", type=str, default=None, dest="algorithm", nargs="+", help="Algorithm to be used. Pick either baseline or a_star.")
-    parser.add_argument("-i", type=str, default=None, dest="improving_algorithm", nargs="+", help="Algorithm to be used to improve existing solutions. Pick either hillclimber or simulated annealing.")
-    parser.add_argument("-sort_c", type=str, default="length_a", dest="sorting_c", nargs="+", help="In which order must the netlists be ordered for the basis algorithm? When no order is given (ascending or descending), ascending is chosen.")
-    parser.add_argument("-sort_i", type=str, default="length_a", dest="sorting_i", nargs="+", help="In which order must the netlists be ordered for the iterative algorithm? When no order is given (ascending or descending), ascending is chosen.")
+    parser.add_argument("-c", type=str, default=None, dest="algorithm", nargs="+",
+                        help="Algorithm to be used. Pick either baseline, a_star or order_search.")
+    parser.add_argument("-i", type=str, default=None, dest="improving_algorithm", nargs="+",
+                        help="Algorithm to be used to improve existing solutions. Pick hillclimber, simulated annealing, "
+                             "genetic or lns.")
+    parser.add_argument("-sort_c", type=str, default="length_a", dest="sorting_c", nargs="+",
+                        help="In which order must the netlists be ordered for the basis algorithm? When no order is given "
+                             "(ascending or descending), ascending is chosen.")
+    parser.add_argument("-sort_i", type=str, default="length_a", dest="sorting_i", nargs="+",
+                        help="In which order must the netlists be ordered for the iterative algorithm? When no order is "
+                             "given (ascending or descending), ascending is chosen.")
 
     parser.add_argument("-vis", "--visualize", action='store_true', help="Renders a 3D plot of the grid with all its paths.")
     parser.add_argument("-leg", "--legend", action='store_true', help="Renders a legend for 3D plot.")
-    parser.add_argument("-plotly", action='store_true', help="Renders a 3D plot of the grid with all its paths in your browser with plotly.")
+    parser.add_argument("-plotly", action='store_true',
+                        help="Renders a 3D plot of the grid with all its paths in your browser with plotly.")
 
-    parser.add_argument("-iter", type=int, default=1000, dest="iterations", help="Number of iterations used by an improving algorithm.")
+    parser.add_argument("-iter", type=int, default=1000, dest="iterations",
+                        help="Number of iterations used by an improving algorithm.")
     parser.add_argument("-n", type=int, default=1, dest="N", help="number of solutions generated")
-    parser.add_argument("-m", type=int, default=1, dest="N_improvements", help="number of improved solutions made for every prefound solution")
-    parser.add_argument("-file", type=str, default="1", dest="specific_file", help="Specific file to be improved or plotted. If file is paths_netlist_4_C_19655, use -file C_19655. If file is paths_netlist_1_3, use -file 3.")
-
-    parser.add_argument("-pop", type=int, default=0, dest="pop", help="Index at which item will be popped in A* algorithm when multiple states have the same priority.")
-    parser.add_argument("-gs", type=int, default=2, dest="gate_space", help="Minimal height above a gate which will remain free of passing nets, so the gate is not unnecessarily blocked by other nets.")
-    parser.add_argument("-random", "--randomized", action='store_true', help="Load random netlists instead of the originals.")
+    parser.add_argument("-m", type=int, default=1, dest="N_improvements",
+                        help="number of improved solutions made for every prefound solution")
+    parser.add_argument("-file", type=str, default="1", dest="specific_file",
+                        help="Specific file to be improved or plotted. If file is paths_netlist_4_C_19655, use -file "
+                             "C_19655. If file is paths_netlist_1_3, use -file 3.")
+
+    parser.add_argument("-pop", type=int, default=0, dest="pop",
+                        help="Index at which item will be popped in A* algorithm when multiple states have the same "
+                             "priority.")
+    parser.add_argument("-gs", type=int, default=2, dest="gate_space",
+                        help="Minimal height above a gate which will remain free of passing nets, so the gate is not "
+                             "unnecessarily blocked by other nets.")
+    parser.add_argument("-random", "--randomized", action='store_true',
+                        help="Load random netlists instead of the originals.")
     parser.add_argument("-output", action='store_true', help="Save data in another output.")
+    parser.add_argument("-batch", type=int, default=None, dest="batch_size",
+                        help="Number of random walks drawn at once by the baseline, hillclimber and simulated annealing.")
+    parser.add_argument("-seed", type=int, default=None, dest="seed",
+                        help="Seed of the random number generators, so runs can be reproduced.")
+    parser.add_argument("-layers", type=int, default=8, dest="layers", help="Number of layers of the grid.")
+    parser.add_argument("-margin", type=int, default=1, dest="margin",
+                        help="Number of points the grid reaches beyond the outermost gates.")
+    parser.add_argument("-dims", type=int, default=None, nargs=2, dest="dimensions",
+                        help="Highest x and y coordinate of the grid. Overrides the margin.")
+    parser.add_argument("-workers", type=int, default=1, dest="workers",
+                        help="Number of worker processes A* uses to route nets that lie far apart at the same time, or the "
+                             "order search uses to try orders.")
+    parser.add_argument("-prune", action='store_true',
+                        help="Skips over open space in A*, instead of expanding every point with the same priority.")
+    parser.add_argument("-tie", type=str, default="pop", choices=["pop", "goal"], dest="tie_break",
+                        help="How A* breaks ties in priority: by index pop, or in favour of the point closest to the goal.")
+    parser.add_argument("-heuristic", type=str, default="manhattan", choices=["manhattan", "field"], dest="heuristic",
+                        help="Heuristic of A*: the greedy distance, or the distance along free segments from the distance "
+                             "fields of the grid.")
+    parser.add_argument("-rounds", type=int, default=10, dest="rounds",
+                        help="Number of rounds in which the order search changes the best order found so far.")
+    parser.add_argument("-search_pop", type=int, default=None, nargs="+", dest="search_pops",
+                        help="Values of pop the order search tries. Leave empty to use only -pop.")
+    parser.add_argument("-search_gs", type=int, default=None, nargs="+", dest="search_gate_spaces",
+                        help="Values of the gate space the order search tries. Leave empty to use only -gs.")
+    parser.add_argument("-gap", type=float, default=None, dest="gap",
+                        help="Improving algorithms stop once the costs exceed the lower bound by no more than this fraction "
+                             "of the costs.")
+    parser.add_argument("-db", type=str, default=None, dest="database",
+                        help="SQLite database in which all solutions are stored, instead of a csv file per solution. "
+                             "Improving algorithms then start from the cheapest solutions in it.")
+    parser.add_argument("-population", type=int, default=20, dest="population_size",
+                        help="Number of solutions in the population of the genetic algorithm. The number of generations is "
+                             "given by -iter.")
+    parser.add_argument("-group", type=int, default=8, dest="group_size",
+                        help="Maximum number of nets the large neighbourhood search rips up and lays again at once.")
+    parser.add_argument("-slack", action='store_true',
+                        help="Hillclimber and simulated annealing visit the nets with the highest costs above their minimum "
+                             "first, and skip nets that cannot be improved.")
+    parser.add_argument("-render", action='store_true',
+                        help="Renders all solutions of the netlist in the results directory, or the solutions found in this "
+                             "run, to image files without opening any windows.")
+    parser.add_argument("-formats", type=str, default=["png"], nargs="+", choices=["png", "html"], dest="formats",
+                        help="Formats -render renders to: png thumbnails with matplotlib and/or html files with plotly.")
+    parser.add_argument("-telemetry", type=str, default=None, dest="telemetry",
+                        help="File to which the progress of the algorithms is written as JSON lines, with timestamps, "
+                             "costs, temperature, moves per second and expanded points.")
+    parser.add_argument("-interval", type=float, default=1.0, dest="interval",
+                        help="Minimal number of seconds between two telemetry events of the same kind.")
+    parser.add_argument("-quiet", action='store_true',
+                        help="Does not print the progress of the algorithms, only their results.")
+    parser.add_argument("-kernel", type=str, default="flat", choices=["flat", "states"], dest="kernel",
+                        help="Search kernel of A*: flat arrays of point ids, or the original state objects. Both find the "
+                             "same paths.")
+    parser.add_argument("-time", type=float, default=None, dest="time_limit",
+                        help="Maximum number of seconds the baseline may search for a single solution.")
 
     # Parse the command line arguments
     args = parser.parse_args()
@@ -289,8 +522,29 @@ if __name__ == "__main__":
     if len(sys.argv) < 3:
         print("Error message: You are missing some required arguments. Did you specify which algorithm you wanted to use?")
 
-    if args.netlist < 1 or args.netlist > 9:
-        print("Error message: See data directory! Enter a netlist between 1 and 9.")
+    if args.netlist < 1 or args.netlist > 9 and not os.path.exists(f"data/chip_{loader.chip_of(args.netlist)}"):
+        print("Error message: See data directory! Enter a netlist between 1 and 9, or make a synthetic chip with "
+              "make_chips.py.")
+
+    # Spawn independent random number generators for the constructive and the improving algorithms
+    seed_sequence = make_seed_sequence(args.seed)
+    construct_sequence, improve_sequence = seed_sequence.spawn(2)
+    print(f"Seed: {seed_sequence.entropy}")
+
+    telemetry.configure(args.telemetry, args.interval, args.quiet)
+
+    grid_options = {"layers": args.layers, "margin": args.margin, "dimensions": args.dimensions}
+    store = ResultsStore(args.database) if args.database else None
+
+    # Solutions of the constructive algorithm are improved right away, if both are given, and the improved solutions
+    # are kept to be rendered
+    pool = SolutionPool(args.N) if args.algorithm and args.improving_algorithm else None
+    improved = SolutionPool(args.N * args.N_improvements) if pool is not None else None
+    genetic_options = {"population_size": args.population_size, "workers": args.workers, "pop": args.pop,
+                       "gate_space": args.gate_space}
+    lns_options = {"pop": args.pop, "gate_space": args.gate_space, "max_nets": args.group_size}
+    search_options = {"rounds": args.rounds, "pops": args.search_pops or [args.pop],
+                      "gate_spaces": args.search_gate_spaces or [args.gate_space]}
 
     if args.algorithm:
 
@@ -302,7 +556,10 @@ if __name__ == "__main__":
         args.algorithm.lower()
         args.sorting_c.lower()
 
-        log_simulation(args.N, args.netlist, possible_entries[args.algorithm], function_map[args.sorting_c], args.randomized, args.pop, args.gate_space, args.output)
+        log_simulation(args.N, args.netlist, possible_entries[args.algorithm], function_map[args.sorting_c], args.randomized,
+                       args.pop, args.gate_space, args.output, args.time_limit, args.batch_size, construct_sequence,
+                       grid_options, args.workers, args.prune, args.tie_break, args.heuristic, search_options, store, pool,
+                       args.kernel, args.gap)
 
     if args.improving_algorithm:
 
@@ -323,7 +580,17 @@ if __name__ == "__main__":
 
         # Plots the progress of Hillclimber or Simulated annealing as costs vs iteration
         make_iterative_plot = False
-        improve(args.netlist, args.specific_file, possible_entries[args.improving_algorithm], update_csv_paths, make_csv_improvements, make_iterative_plot, args.iterations, args.N, args.N_improvements, function_map[args.sorting_i], args.randomized, args.output)
+        improve(args.netlist, args.specific_file, possible_entries[args.improving_algorithm], update_csv_paths,
+                make_csv_improvements, make_iterative_plot, args.iterations, args.N, args.N_improvements,
+                function_map[args.sorting_i], args.randomized, args.output, args.batch_size, improve_sequence, grid_options,
+                args.gap, store, pool, genetic_options, lns_options, args.slack, improved)
 
     if args.visualize or args.plotly:
-        visualize_three_dimensional(args.netlist, args.specific_file, args.legend, args.randomized, args.visualize, args.plotly)
+        visualize_three_dimensional(args.netlist, args.specific_file, args.legend, args.randomized, args.visualize,
+                                    args.plotly, grid_options)
+
+    if args.render:
+        render(args.netlist, args.randomized, args.formats, args.workers, args.legend, grid_options, improved)
+
+    # Write the remaining telemetry events
+    telemetry.channel.close()
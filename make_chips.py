@@ -0,0 +1,154 @@
+"""
+make_chips.py
+
+Creates a synthetic chip of arbitrary size, with one or more netlists, so the algorithms can be tested on
+chips that are much larger than the ones in the data directory.
+The size of the chip is determined by the number of gates and the gate density, which is the fraction of the
+points on the lowest layer that host a gate. The gates are placed randomly, never on the border of the grid.
+
+The netlists are generated according to the following criteria:
+- A gate cannot make a connection with itself
+- Each net in a netlist is unique. If path a to b already exists, neither a to b nor b to a can be added to the netlist.
+- A gate makes no more connections than the maximum degree, which can be no more than 5 (see analyse_netlist.py)
+- If a locality is given, a gate is more likely to be connected with gates close by. The probability of a connection
+  decreases exponentially with the distance between the gates, where the locality is the typical distance.
+
+The chip and its netlists can either be used in memory, for example with Grid.from_arrays, or be stored in the
+data directory. A chip with number c is stored as data/chip_c/print_c.csv, and its netlists get the numbers
+3c + 1 up to 3c + 3, just like the original chips. They can then be solved with main.py like any other netlist.
+"""
+
+
+import argparse
+import csv
+import math
+import os
+import random
+import numpy as np
+from code.seeding import make_generator
+
+
+def random_print(num_gates, density=0.2, rng=None):
+    """
+    Places a number of gates randomly on a grid, which is just large enough for the given gate density.
+    Returns a list of (gate_id, x, y) tuples.
+    """
+
+    rng = rng or random.Random()
+
+    # Find the size of the area in which the gates may be placed
+    area = math.ceil(num_gates / density)
+    width = math.ceil(math.sqrt(area))
+    height = math.ceil(area / width)
+
+    # Choose unique locations, leaving the border of the grid free
+    locations = rng.sample(range(width * height), num_gates)
+
+    return [(uid + 1, location % width + 1, location // width + 1) for uid, location in enumerate(locations)]
+
+
+def random_netlist(gates, num_nets, locality=None, max_degree=5, rng=None):
+    """
+    Creates a random netlist conform to the criteria for the given gates.
+    Returns a list of (start_gate_id, end_gate_id) tuples.
+    """
+
+    if max_degree > 5:
+        raise ValueError("A gate can make no more than 5 connections.")
+
+    if num_nets > len(gates) * max_degree // 2:
+        raise ValueError(f"{len(gates)} gates with at most {max_degree} connections cannot make {num_nets} nets.")
+
+    generator = make_generator(rng or random.Random())
+
+    ids = np.array([gate[0] for gate in gates])
+    coordinates = np.array([gate[1:] for gate in gates])
+    degree = np.zeros(len(gates), dtype=np.int64)
+
+    nets = []
+    unique = set()
+    failures = 0
+    while len(nets) < num_nets:
+
+        # Choose a starting gate that still has room for a connection
+        available = np.flatnonzero(degree < max_degree)
+        start = generator.choice(available)
+
+        # Choose an ending gate, preferably close by if a locality is given
+        candidates = available[available != start]
+        if not len(candidates):
+            raise ValueError("Could not find enough gates with room for a connection, try a lower number of nets.")
+
+        if locality:
+            distance = np.abs(coordinates[candidates] - coordinates[start]).sum(axis=1)
+            weights = np.exp(-(distance - distance.min()) / locality)
+            end = generator.choice(candidates, p=weights / weights.sum())
+        else:
+            end = generator.choice(candidates)
+
+        # Ensure each net is unique
+        net = (int(ids[start]), int(ids[end]))
+        if net in unique or net[::-1] in unique:
+            failures += 1
+            if failures > 100 * num_nets:
+                raise ValueError("Could not find enough unique nets, try a lower number of nets or a larger locality.")
+            continue
+
+        unique.add(net)
+        nets.append(net)
+        degree[start] += 1
+        degree[end] += 1
+
+    return nets
+
+
+def save_chip(chip, gates, netlists):
+    """Stores a print and its netlists in the data directory, numbered as the original chips."""
+
+    os.makedirs(f"data/chip_{chip}/random", exist_ok=True)
+
+    with open(f"data/chip_{chip}/print_{chip}.csv", "w", newline="") as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(["chip", "x", "y"])
+        writer.writerows(gates)
+
+    for number, nets in enumerate(netlists):
+        with open(f"data/chip_{chip}/netlist_{3 * chip + number + 1}.csv", "w", newline="") as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(["chip_a", "chip_b"])
+            writer.writerows(nets)
+
+
+def main(chip, num_gates, num_nets, density=0.2, locality=None, max_degree=5, num_netlists=1, rng=None):
+    """Creates a synthetic chip with a number of netlists, and stores it in the data directory."""
+
+    if chip < 3:
+        raise ValueError("Chips 0 to 2 are the original chips and cannot be overwritten.")
+
+    rng = rng or random.Random()
+    gates = random_print(num_gates, density, rng)
+    netlists = [random_netlist(gates, num_nets, locality, max_degree, rng) for number in range(num_netlists)]
+
+    save_chip(chip, gates, netlists)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Make a synthetic chip with random netlists')
+    parser.add_argument("chip", type=int, help="Number of the chip to be made, must be at least 3")
+    parser.add_argument("-gates", type=int, default=1000, dest="num_gates", help="Number of gates on the chip")
+    parser.add_argument("-nets", type=int, default=1500, dest="num_nets", help="Number of nets in each netlist")
+    parser.add_argument("-density", type=float, default=0.2, dest="density",
+                        help="Fraction of the lowest layer that hosts a gate")
+    parser.add_argument("-locality", type=float, default=None, dest="locality",
+                        help="Typical distance between connected gates. Leave empty for uniformly random nets.")
+    parser.add_argument("-degree", type=int, default=5, dest="max_degree",
+                        help="Maximum number of connections per gate, at most 5")
+    parser.add_argument("-netlists", type=int, default=1, choices=[1, 2, 3], dest="num_netlists",
+                        help="Number of netlists to be made")
+    parser.add_argument("-seed", type=int, default=None, dest="seed", help="Seed of the random number generator.")
+
+    # Parse the command line arguments
+    args = parser.parse_args()
+
+    main(args.chip, args.num_gates, args.num_nets, args.density, args.locality, args.max_degree, args.num_netlists,
+         random.Random(args.seed))
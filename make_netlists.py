@@ -14,62 +14,63 @@ For the random netlists, there are a few criteria:
 import csv
 import random
 import argparse
+from code.classes import loader
 
 
 def load_gates(chip):
-    """
-    Reads requested file containing the location of the gates,
-    and extracts their id's and coordinates.
-    Creates gate object for each row.
-    """
-
-    num_gates = 0
+    """Returns the number of gates on the print of a chip."""
 
-    with open(f"data/chip_{chip}/print_{chip}.csv", 'r') as file:
-        reader = csv.DictReader(file)
-        for row in reader:
-            num_gates += 1
-    return num_gates
+    return len(loader.load_print(chip))
 
 
 def load_nets(netlist, chip):
+    """Returns the number of nets in the original netlist."""
+
+    return len(loader.load_netlist(chip, netlist))
+
+
+def random_netlist(num_gates, num_nets, rng=None):
     """
-    Reads requested file containing the requested nets,
-    and extracts their starting and ending coordinates.
-    Creates gate object for each row.
+    Creates a random netlist conform to the criteria, without storing it.
+    Returns a list of (start_gate_id, end_gate_id) tuples.
+    Uses the given random.Random object, or the global random module if none is given.
     """
 
-    num_nets = 0
-    with open(f"data/chip_{chip}/netlist_{netlist}.csv") as file:
-        reader = csv.DictReader(file)
-        for row in reader:
-            num_nets += 1
+    rng = rng or random
 
-    return num_nets
+    nets = []
+    unique = set()
+    while len(nets) < num_nets:
+        gates = [i + 1 for i in range(num_gates)]
+        start = rng.choice(gates)
+
+        # Ensure gate does not connect with itself
+        gates.remove(start)
+        end = rng.choice(gates)
 
+        # Ensure each net is unique
+        if (start, end) not in unique and (end, start) not in unique:
+            unique.add((start, end))
+            nets.append((start, end))
 
-def main(netlist):
+    return nets
+
+
+def main(netlist, rng=None):
+    """
+    Creates a random netlist equivalent of the given netlist, and stores it in the random folder of its chip.
+    Uses the given random.Random object, or the global random module if none is given.
+    """
 
     # Calculate chip number from netlist number
-    chip = int((netlist - 1) / 3)
+    chip = loader.chip_of(netlist)
 
     # Extract number of gates and nets
     num_gates = load_gates(chip)
     num_nets = load_nets(netlist, chip)
 
     # Creates random netlist conform to the criteria
-    nets = set()
-    while len(nets) < num_nets:
-        gates = [i + 1 for i in range(num_gates)]
-        start = random.choice(gates)
-
-        # Ensure gate does not connect with itself
-        gates.remove(start)
-        end = random.choice(gates)
-
-        # Ensure each net is unique
-        if (start, end) not in nets and (end, start) not in nets:
-            nets.add((start, end))
+    nets = random_netlist(num_gates, num_nets, rng)
 
     # Save netlist to CSV
     with open(f"data/chip_{chip}/random/netlist_{netlist}.csv", "w", newline="") as csvfile:
@@ -89,8 +90,9 @@ def main(netlist):
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Make a new netlist')
     parser.add_argument("netlist", type=int, help="Netlist to be remade")
+    parser.add_argument("-seed", type=int, default=None, dest="seed", help="Seed of the random number generator.")
 
     # Parse the command line arguments
     args = parser.parse_args()
 
-    main(args.netlist)
+    main(args.netlist, random.Random(args.seed))
@@ -0,0 +1,45 @@
+"""
+test_render.py
+
+Solves a small netlist with main.py in a separate process, improves the solution and renders it, and checks that the
+rendered solution is the improved one instead of the solution of the constructive algorithm. The run takes place in a
+temporary directory with a link to the data, so no results are written to the repository.
+"""
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ARGUMENTS = ["1", "-c", "a_star", "-i", "genetic", "-iter", "3", "-seed", "2", "-render"]
+
+
+class TestRender(unittest.TestCase):
+    def test_renders_improved_solution(self):
+        with tempfile.TemporaryDirectory() as directory:
+            os.symlink(os.path.join(ROOT, "data"), os.path.join(directory, "data"))
+            os.mkdir(os.path.join(directory, "results"))
+
+            # The repository comes first, so the code package is found before the code module of the standard library
+            environment = dict(os.environ, PYTHONPATH=ROOT, MPLBACKEND="Agg")
+
+            result = subprocess.run([sys.executable, os.path.join(ROOT, "main.py"), *ARGUMENTS], cwd=directory,
+                                    env=environment, capture_output=True, text=True)
+            self.assertEqual(result.returncode, 0, result.stderr)
+
+            renders = os.listdir(os.path.join(directory, "results", "figures_and_plots", "renders", "netlist_1"))
+
+        # The costs of the improved solution are printed at the end of the genetic algorithm
+        improved = re.findall(r"Costs are (\d+)", result.stdout)[-1]
+        rendered = [name for name in renders if name.endswith(".png")]
+
+        self.assertEqual(len(rendered), 1, renders)
+        message = f"Rendered {rendered[0]}, but the solution was improved to costs {improved}"
+        self.assertTrue(rendered[0].startswith(f"solution_C_{improved}_"), message)
+
+
+if __name__ == "__main__":
+    unittest.main()
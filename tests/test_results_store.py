@@ -0,0 +1,61 @@
+"""
+test_results_store.py
+
+Solves and improves a small netlist with main.py in a separate process, and checks the runs in the database: an
+improved run has no sorting method if the algorithm does not sort the nets, and refers to the run it improved.
+Also checks that a database without the columns of improved runs gets them when it is opened.
+"""
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import unittest
+from code.results_store import ResultsStore
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestResultsStore(unittest.TestCase):
+    def test_improved_runs(self):
+        with tempfile.TemporaryDirectory() as directory:
+            os.symlink(os.path.join(ROOT, "data"), os.path.join(directory, "data"))
+            os.mkdir(os.path.join(directory, "results"))
+
+            # The repository comes first, so the code package is found before the code module of the standard library
+            environment = dict(os.environ, PYTHONPATH=ROOT)
+
+            for arguments in (["-c", "a_star", "-n", "2"], ["-i", "genetic", "-iter", "2", "-n", "2", "-m", "2"]):
+                result = subprocess.run([sys.executable, os.path.join(ROOT, "main.py"), "1", *arguments, "-seed", "2",
+                                         "-db", "results.db"], cwd=directory, env=environment, capture_output=True,
+                                        text=True)
+                self.assertEqual(result.returncode, 0, result.stderr)
+
+            connection = sqlite3.connect(os.path.join(directory, "results.db"))
+            constructed = connection.execute("SELECT id, cost FROM runs WHERE algorithm = 'a_star' ORDER BY cost, id")
+            sources = [row[0] for row in constructed]
+            improved = connection.execute(
+                "SELECT sorting, run, solution, source FROM runs WHERE algorithm = 'genetic' ORDER BY id").fetchall()
+            connection.close()
+
+        self.assertEqual(improved, [(None, j, i, sources[i - 1]) for i in (1, 2) for j in (1, 2)])
+
+    def test_older_database(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "results.db")
+            connection = sqlite3.connect(filename)
+            connection.execute("CREATE TABLE runs (id INTEGER PRIMARY KEY, netlist INTEGER NOT NULL, randomized "
+                               "INTEGER NOT NULL, algorithm TEXT, sorting TEXT, seed TEXT, run INTEGER, cost INTEGER NOT "
+                               "NULL, created REAL NOT NULL, paths BLOB NOT NULL)")
+            connection.commit()
+            connection.close()
+
+            store = ResultsStore(filename)
+            columns = [row[1] for row in store.connection.execute("PRAGMA table_info(runs)")]
+            store.close()
+
+        self.assertEqual(columns[-2:], ["solution", "source"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+"""
+test_startup.py
+
+Solves a small netlist with main.py in a separate process, and checks that the libraries that are only needed for
+plotting, reading old results or computing the lower bound are not imported. The time of the run itself, including
+the imports of main.py but not the start of the interpreter, is measured in the process, and must stay within a
+generous budget that can be changed with the environment variable STARTUP_BUDGET, for example on slow machines.
+The run takes place in a temporary directory with a link to the data, so no results are written to the repository.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Libraries that a plain run of A* should not import
+HEAVY_MODULES = ["matplotlib", "plotly", "pandas", "scipy"]
+
+# Time in seconds a plain run of A* on netlist 1 may take, which is about 0.2 seconds on a normal machine
+BUDGET = float(os.environ.get("STARTUP_BUDGET", 5.0))
+
+SCRIPT = f"""
+import runpy, sys, time
+sys.argv = ["main.py", "1", "-c", "a_star"]
+start = time.perf_counter()
+runpy.run_path({os.path.join(ROOT, "main.py")!r}, run_name="__main__")
+duration = time.perf_counter() - start
+print(",".join(module for module in {HEAVY_MODULES!r} if module in sys.modules))
+print(duration)
+"""
+
+
+class TestStartup(unittest.TestCase):
+    def test_solve_imports_and_time(self):
+        with tempfile.TemporaryDirectory() as directory:
+            os.symlink(os.path.join(ROOT, "data"), os.path.join(directory, "data"))
+            os.mkdir(os.path.join(directory, "results"))
+
+            # The repository comes first, so the code package is found before the code module of the standard library
+            environment = dict(os.environ, PYTHONPATH=ROOT)
+
+            result = subprocess.run([sys.executable, "-c", SCRIPT], cwd=directory, env=environment,
+                                    capture_output=True, text=True)
+
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertIn("Completed run 1", result.stdout)
+
+        imported, duration = result.stdout.splitlines()[-2:]
+        self.assertEqual(imported, "", f"A plain run imported {imported}")
+        message = f"A plain run took {float(duration):.2f}s, set STARTUP_BUDGET to allow more"
+        self.assertLess(float(duration), BUDGET, message)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+"""
+test_telemetry.py
+
+Checks that the events emitted in forked worker processes are written to the telemetry file, together with the
+events of the main process.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import json
+import multiprocessing
+import os
+import tempfile
+import unittest
+from code import telemetry
+
+
+def work(number):
+    """Emits an event in a worker process."""
+
+    telemetry.emit("work", force=True, number=number)
+    return os.getpid()
+
+
+class TestTelemetry(unittest.TestCase):
+    def test_forked_workers(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "telemetry.jsonl")
+            telemetry.configure(filename)
+
+            try:
+                telemetry.emit("start", force=True)
+                context = multiprocessing.get_context("fork")
+                with ProcessPoolExecutor(max_workers=2, mp_context=context) as executor:
+                    pids = set(executor.map(work, range(8)))
+                telemetry.emit("end", force=True)
+            finally:
+                telemetry.configure()
+
+            with open(filename) as file:
+                records = [json.loads(line) for line in file]
+
+        self.assertEqual([record["event"] for record in records if "pid" not in record], ["start", "end"])
+        self.assertEqual(sorted(record["number"] for record in records if record["event"] == "work"), list(range(8)))
+        self.assertEqual({record["pid"] for record in records if record["event"] == "work"}, pids)
+
+
+if __name__ == "__main__":
+    unittest.main()